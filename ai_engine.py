@@ -6,8 +6,18 @@ Two-model routing:
   - Sonnet: Customer conversations (quality matters)
   - Haiku: Classification, follow-ups (cost matters)
 """
+import hashlib
 import json
+import logging
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from database import get_cached_questions, store_cached_questions
+
+logger = logging.getLogger("etsai.ai")
 
 AI_MODEL_SMART = "claude-sonnet-4-5-20250929"
 AI_MODEL_CHEAP = "claude-haiku-4-5-20251001"
@@ -16,19 +26,122 @@ AI_COSTS = {
     AI_MODEL_CHEAP: {"input": 0.80, "output": 4.00},
     AI_MODEL_SMART: {"input": 3.00, "output": 15.00},
 }
+# Prompt caching: writes bill at 1.25x the input rate, reads at 0.1x
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
+# --- Anthropic HTTP client settings ---
+AI_TIMEOUT = float(os.environ.get("ANTHROPIC_TIMEOUT", "60"))
+AI_CONNECT_TIMEOUT = float(os.environ.get("ANTHROPIC_CONNECT_TIMEOUT", "5"))
+AI_MAX_RETRIES = int(os.environ.get("ANTHROPIC_MAX_RETRIES", "2"))
+AI_MAX_CONNECTIONS = int(os.environ.get("ANTHROPIC_MAX_CONNECTIONS", "20"))
+AI_KEEPALIVE_EXPIRY = float(os.environ.get("ANTHROPIC_KEEPALIVE_EXPIRY", "30"))
+
+# --- Local spec extraction (simple buyer turns skip Sonnet) ---
+LOCAL_EXTRACTION_ENABLED = os.environ.get("ETSAI_LOCAL_EXTRACTION", "1") != "0"
+# How a locally extracted turn is answered: "haiku" (natural reply) or "template"
+LOCAL_EXTRACTION_REPLY = os.environ.get("ETSAI_LOCAL_EXTRACTION_REPLY", "haiku")
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Clients inherited from a pre-fork parent. Kept referenced so they are never
+# garbage-collected (and their sockets closed) inside a worker.
+_inherited_clients = []
+
+
+def get_client(api_key=None):
+    """Process-wide Anthropic client (one per API key).
+    Keeps pooled keep-alive HTTPS connections so calls skip the TLS handshake.
+    """
+    import anthropic
+    import httpx
+
+    api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not set")
+
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = anthropic.Anthropic(
+                    api_key=api_key,
+                    timeout=httpx.Timeout(AI_TIMEOUT, connect=AI_CONNECT_TIMEOUT),
+                    max_retries=AI_MAX_RETRIES,
+                    http_client=anthropic.DefaultHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=AI_MAX_CONNECTIONS,
+                            max_keepalive_connections=AI_MAX_CONNECTIONS,
+                            keepalive_expiry=AI_KEEPALIVE_EXPIRY,
+                        ),
+                    ),
+                )
+                _clients[api_key] = client
+    return client
+
+
+def _reset_clients_after_fork():
+    """Each forked gunicorn worker opens its own connections."""
+    global _clients, _clients_lock
+    _inherited_clients.extend(_clients.values())
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+class ClaudeReply(tuple):
+    """call_claude's result: unpacks as (text, cost, input_tokens, output_tokens)
+    and carries the full usage record as .usage (see _usage)."""
+
+    def __new__(cls, text, usage):
+        reply = super().__new__(cls, (text, usage["cost"], usage["input_tokens"],
+                                      usage["output_tokens"]))
+        reply.usage = usage
+        return reply
 
 
 def call_claude(prompt, model=None, max_tokens=500, system=None):
-    """Call Claude API. Returns (text, cost, input_tokens, output_tokens)."""
-    import anthropic
+    """Call Claude API. Returns a ClaudeReply: (text, cost, input_tokens, output_tokens)
+    with the usage record on .usage."""
+    return ClaudeReply(*call_claude_with_usage(prompt, model, max_tokens, system))
 
+
+def call_claude_with_usage(prompt, model=None, max_tokens=500, system=None):
+    """Like call_claude, but returns (text, usage) where usage is the full record:
+    model, token counts (incl. prompt cache), cost, latency_ms and retries.
+    `system` may be a string or a list of content blocks with cache_control breakpoints.
+    """
     model = model or AI_MODEL_SMART
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY not set")
+    started = time.monotonic()
+    raw = get_client().messages.with_raw_response.create(
+        **_message_kwargs(prompt, model, max_tokens, system))
+    response = raw.parse()
+    usage = _usage(model, response.usage, started, getattr(raw, "retries_taken", 0))
+    return response.content[0].text.strip(), usage
+
+
+def stream_claude(prompt, model=None, max_tokens=500, system=None):
+    """Stream a Claude reply. Yields ("text", delta) as tokens arrive, then
+    ("done", (text, usage)) — call_claude_with_usage's return value.
+    latency_ms covers the whole stream; the SDK doesn't report retries for streams.
+    """
+    model = model or AI_MODEL_SMART
+    kwargs = _message_kwargs(prompt, model, max_tokens, system)
+
+    started = time.monotonic()
+    with get_client().messages.stream(**kwargs) as stream:
+        for delta in stream.text_stream:
+            yield "text", delta
+        response = stream.get_final_message()
+
+    yield "done", (response.content[0].text.strip(), _usage(model, response.usage, started))
 
-    client = anthropic.Anthropic(api_key=api_key)
 
+def _message_kwargs(prompt, model, max_tokens, system):
     kwargs = {
         "model": model,
         "max_tokens": max_tokens,
@@ -36,15 +149,38 @@ def call_claude(prompt, model=None, max_tokens=500, system=None):
     }
     if system:
         kwargs["system"] = system
+    return kwargs
 
-    response = client.messages.create(**kwargs)
 
-    inp = response.usage.input_tokens
-    out = response.usage.output_tokens
+def _usage(model, usage, started=None, retries=0):
+    """Usage record for one response: token counts, dollar cost (pricing cache
+    writes/reads), wall-clock latency since `started` and SDK retries taken."""
+    inp = usage.input_tokens
+    out = usage.output_tokens
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
     rates = AI_COSTS.get(model, {"input": 3.00, "output": 15.00})
-    cost = (inp * rates["input"] + out * rates["output"]) / 1_000_000
+    cost = (inp * rates["input"]
+            + cache_write * rates["input"] * CACHE_WRITE_MULTIPLIER
+            + cache_read * rates["input"] * CACHE_READ_MULTIPLIER
+            + out * rates["output"]) / 1_000_000
+    return {
+        "model": model,
+        "input_tokens": inp,
+        "output_tokens": out,
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": cache_write,
+        "cost": cost,
+        "latency_ms": int((time.monotonic() - started) * 1000) if started else 0,
+        "retries": retries or 0,
+    }
+
 
-    return response.content[0].text.strip(), cost, inp, out
+def empty_usage(model):
+    """Zero-cost usage record for work answered without an API call."""
+    return {"model": model, "input_tokens": 0, "output_tokens": 0,
+            "cache_read_tokens": 0, "cache_write_tokens": 0, "cost": 0.0,
+            "latency_ms": 0, "retries": 0}
 
 
 def generate_greeting(product_title, questions, buyer_name=None, seller_notes=None):
@@ -90,111 +226,99 @@ Write a SHORT, friendly first message that:
 
 Just write the message. No subject line, no signature block."""
 
-    text, cost, inp, out = call_claude(prompt, AI_MODEL_SMART, max_tokens=400)
-    return {"response": text, "cost": cost, "input_tokens": inp, "output_tokens": out}
+    text, usage = call_claude_with_usage(prompt, AI_MODEL_SMART, max_tokens=400)
+    return {"response": text, "cost": usage["cost"], "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"], "usage": usage}
 
 
 def process_buyer_message(buyer_message, product_title, questions, collected_specs,
-                          conversation_history, buyer_name=None, seller_notes=None):
+                          conversation_history, buyer_name=None, seller_notes=None,
+                          question_version=None):
     """
     Core AI turn. Extracts specs AND generates response in one call.
+    question_version identifies the question set (e.g. the order's product snapshot)
+    so its compiled schema is reused across turns.
     Returns: {response, specs_extracted, is_complete, needs_clarification, should_escalate, cost}
     """
     # Check escalation triggers first (free, no API call)
+    escalated = _escalation_result(buyer_message, conversation_history)
+    if escalated:
+        return escalated
+
+    schema = compile_questions(questions, question_version)
+    system, turn_text = _build_buyer_prompt(buyer_message, product_title, schema,
+                                            collected_specs, conversation_history, seller_notes)
+    local = _local_turn(buyer_message, product_title, schema, collected_specs,
+                        conversation_history, system, turn_text)
+    if local:
+        return local
+    raw_text, usage = call_claude_with_usage(turn_text, AI_MODEL_SMART, max_tokens=600,
+                                             system=system)
+    return _parse_buyer_reply(raw_text, schema, usage)
+
+
+def stream_buyer_message(buyer_message, product_title, questions, collected_specs,
+                         conversation_history, buyer_name=None, seller_notes=None,
+                         question_version=None):
+    """
+    Streaming variant of process_buyer_message.
+    Yields ("text", delta) as the reply text arrives, then ("result", result) with the
+    same dict process_buyer_message returns — specs are parsed and validated at the end.
+    """
+    escalated = _escalation_result(buyer_message, conversation_history)
+    if escalated:
+        yield "text", escalated["response"]
+        yield "result", escalated
+        return
+
+    schema = compile_questions(questions, question_version)
+    system, turn_text = _build_buyer_prompt(buyer_message, product_title, schema,
+                                            collected_specs, conversation_history, seller_notes)
+    local = _local_turn(buyer_message, product_title, schema, collected_specs,
+                        conversation_history, system, turn_text)
+    if local:
+        yield "text", local["response"]
+        yield "result", local
+        return
+
+    reply = _ReplyFieldStream()
+    for kind, payload in stream_claude(turn_text, AI_MODEL_SMART, max_tokens=600, system=system):
+        if kind == "text":
+            delta = reply.feed(payload)
+            if delta:
+                yield "text", delta
+        else:
+            raw_text, usage = payload
+    yield "result", _parse_buyer_reply(raw_text, schema, usage)
+
+
+def _escalation_result(buyer_message, conversation_history):
+    """Canned hand-off result if the message trips an escalation trigger, else None."""
     escalation = check_escalation(buyer_message, conversation_history)
-    if escalation["should_escalate"]:
-        return {
-            "response": (
-                "Thanks for your patience! I want to make sure you're taken care of properly, "
-                "so I'm going to have a team member follow up with you directly. "
-                "They'll be in touch shortly!"
-            ),
-            "specs_extracted": {},
-            "is_complete": False,
-            "needs_clarification": [],
-            "should_escalate": True,
-            "escalation_reason": escalation["reason"],
-            "cost": 0.0,
-        }
-
-    # Build context
-    missing_req = [q for q in questions if q.get("required") and
-                   not collected_specs.get(q["field_name"])]
-    missing_opt = [q for q in questions if not q.get("required") and
-                   not collected_specs.get(q["field_name"])]
-
-    hist_text = ""
-    for msg in conversation_history[-10:]:
-        role = "SELLER" if msg.get("direction") == "outbound" else "BUYER"
-        hist_text += f"{role}: {msg['content']}\n"
-
-    got_text = ""
-    for field, value in collected_specs.items():
-        if value:
-            got_text += f"  - {field}: {value}\n"
-
-    needed_text = ""
-    for q in missing_req:
-        opts = f" (Options: {', '.join(q['options'])})" if q.get("options") else ""
-        needed_text += f"  - {q['field_name']}: {q['question']}{opts}\n"
-
-    optional_text = ""
-    for q in missing_opt:
-        opts = f" (Options: {', '.join(q['options'])})" if q.get("options") else ""
-        optional_text += f"  - {q['field_name']}: {q['question']}{opts}\n"
-
-    # Build constraint info from structured fields (no more regex parsing)
-    constraint_text = ""
-    for q in questions:
-        constraints = []
-        if q.get("options"):
-            constraints.append(f"Valid options: {', '.join(q['options'])}")
-        if q.get("max_length"):
-            constraints.append(f"Maximum {q['max_length']} characters")
-        if q.get("min_length"):
-            constraints.append(f"Minimum {q['min_length']} characters")
-        if q.get("validation_type"):
-            constraints.append(f"Type: {q['validation_type']}")
-        if q.get("example"):
-            constraints.append(f"Example: {q['example']}")
-        if constraints:
-            constraint_text += f"  - {q['field_name']}: {'; '.join(constraints)}\n"
-
-    # Seller notes context
-    seller_context = ""
-    if seller_notes:
-        seller_context = f"""
-SELLER NOTES (what the seller can/can't do, capabilities, materials, preferences):
-{seller_notes}
-"""
+    if not escalation["should_escalate"]:
+        return None
+    return {
+        "response": (
+            "Thanks for your patience! I want to make sure you're taken care of properly, "
+            "so I'm going to have a team member follow up with you directly. "
+            "They'll be in touch shortly!"
+        ),
+        "specs_extracted": {},
+        "is_complete": False,
+        "needs_clarification": [],
+        "should_escalate": True,
+        "escalation_reason": escalation["reason"],
+        "cost": 0.0,
+        "usage": empty_usage("escalation"),
+    }
 
-    # Determine conversation phase
-    all_required_fields = [q for q in questions if q.get("required")]
-    collected_required = [q for q in all_required_fields if collected_specs.get(q["field_name"])]
-    awaiting_confirmation = len(collected_required) == len(all_required_fields) and len(all_required_fields) > 0
 
-    prompt = f"""You are a friendly seller in a conversation with a buyer.
+# Static instructions for every intake turn. Sent as the first system block so
+# prompt caching reuses it across all orders and turns.
+BUYER_TURN_INSTRUCTIONS = """You are a friendly seller in a conversation with a buyer.
 You're collecting customization details for their order.
-
-PRODUCT: {product_title}
-{seller_context}
-DETAILS ALREADY COLLECTED:
-{got_text or "  (none yet)"}
-
-DETAILS STILL NEEDED (required):
-{needed_text or "  (all required details collected!)"}
-
-OPTIONAL DETAILS (nice to have):
-{optional_text or "  (none)"}
-
-CONSTRAINTS PER FIELD:
-{constraint_text or "  (none)"}
-
-{"** ALL REQUIRED DETAILS HAVE BEEN COLLECTED. YOU ARE NOW IN CONFIRMATION PHASE. **" if awaiting_confirmation else ""}
-
-CONVERSATION SO FAR:
-{hist_text}
-BUYER: {buyer_message}
+The ORDER CONTEXT describes the product, any seller notes and the constraints per field.
+Each buyer turn lists the details collected so far, the conversation and the buyer's latest message.
 
 YOUR TASK:
 1. EXTRACT: Pull any detail answers from the buyer's message. Match them to field names.
@@ -212,7 +336,7 @@ RESPONSE RULES:
 - Sound human. No "specifications", say "details" or "preferences".
 
 CRITICAL — CAPABILITY BOUNDARIES:
-- If SELLER NOTES are provided above, use them to answer buyer questions about capabilities.
+- If SELLER NOTES are provided in the order context, use them to answer buyer questions about capabilities.
   - If the seller notes address the buyer's question, respond based on the notes.
   - If the seller notes do NOT address the buyer's question, say: "That's a great question — let me flag that as a special request for the seller to review, since I'm not sure about that one."
 - If NO seller notes are provided:
@@ -227,22 +351,97 @@ CRITICAL — TWO-PHASE COMPLETION:
 - PHASE 2 (Confirm): ONLY when the buyer explicitly confirms (e.g. "yes", "looks good", "correct", "perfect", "that's right", "send it"), THEN set "all_required_complete": true.
 - If the buyer wants to change something at the confirmation step, update the spec and re-confirm with a new summary.
 - NEVER set "all_required_complete": true in the same turn you first present the summary. Always wait for the buyer's response.
-{"- You are currently in CONFIRMATION PHASE. If the buyer is confirming, set all_required_complete: true. If they want changes, update and re-summarize." if awaiting_confirmation else ""}
 
 RESPOND IN THIS EXACT JSON FORMAT:
-{{
-  "extracted_specs": {{"field_name": "value", ...}},
+{
   "response": "your message to the buyer",
+  "extracted_specs": {"field_name": "value", ...},
   "all_required_complete": true/false,
   "awaiting_confirmation": true/false,
   "needs_clarification": ["field_name1", ...]
-}}
+}
 
 JSON only. Nothing else."""
 
-    raw_text, cost, inp, out = call_claude(prompt, AI_MODEL_SMART, max_tokens=600)
 
-    # Parse
+def _build_buyer_prompt(buyer_message, product_title, schema, collected_specs,
+                        conversation_history, seller_notes=None):
+    """
+    Split the turn prompt for prompt caching. Returns (system, turn_text):
+    system = [static instructions, per-order context], each a cache breakpoint;
+    turn_text = the small per-turn part (progress, history, buyer message).
+    """
+    system = [
+        {"type": "text", "text": BUYER_TURN_INSTRUCTIONS,
+         "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": _order_context(product_title, schema, seller_notes),
+         "cache_control": {"type": "ephemeral"}},
+    ]
+
+    hist_text = ""
+    for msg in conversation_history[-10:]:
+        role = "SELLER" if msg.get("direction") == "outbound" else "BUYER"
+        hist_text += f"{role}: {msg['content']}\n"
+
+    got_text = ""
+    for field, value in collected_specs.items():
+        if value:
+            got_text += f"  - {field}: {value}\n"
+
+    needed_text = "".join(q.prompt_line for q in schema.required
+                          if not collected_specs.get(q.field_name))
+    optional_text = "".join(q.prompt_line for q in schema.optional
+                            if not collected_specs.get(q.field_name))
+
+    # Determine conversation phase
+    awaiting_confirmation = schema.required_complete(collected_specs)
+
+    phase_text = ""
+    if awaiting_confirmation:
+        phase_text = (
+            "** ALL REQUIRED DETAILS HAVE BEEN COLLECTED. YOU ARE NOW IN CONFIRMATION PHASE. **\n"
+            "If the buyer is confirming, set all_required_complete: true. "
+            "If they want changes, update and re-summarize.\n"
+        )
+
+    turn_text = f"""DETAILS ALREADY COLLECTED:
+{got_text or "  (none yet)"}
+
+DETAILS STILL NEEDED (required):
+{needed_text or "  (all required details collected!)"}
+
+OPTIONAL DETAILS (nice to have):
+{optional_text or "  (none)"}
+
+{phase_text}
+CONVERSATION SO FAR:
+{hist_text}
+BUYER: {buyer_message}"""
+    return system, turn_text
+
+
+def _order_context(product_title, schema, seller_notes=None):
+    """Per-order prompt block — unchanged across an order's turns, so it caches."""
+    constraint_text = schema.constraint_text
+
+    # Seller notes context
+    seller_context = ""
+    if seller_notes:
+        seller_context = f"""
+SELLER NOTES (what the seller can/can't do, capabilities, materials, preferences):
+{seller_notes}
+"""
+
+    return f"""ORDER CONTEXT
+
+PRODUCT: {product_title}
+{seller_context}
+CONSTRAINTS PER FIELD:
+{constraint_text or "  (none)"}"""
+
+
+def _parse_buyer_reply(raw_text, schema, usage):
+    """Parse the model's JSON turn and validate extracted specs against the questions."""
     try:
         clean = raw_text.strip()
         if clean.startswith("```"):
@@ -259,9 +458,9 @@ JSON only. Nothing else."""
     # Validate extracted specs
     validated = {}
     for field, value in parsed.get("extracted_specs", {}).items():
-        matching_q = next((q for q in questions if q["field_name"] == field), None)
-        if matching_q:
-            validation = validate_answer(matching_q, value)
+        compiled = schema.by_field.get(field)
+        if compiled:
+            validation = compiled.validate(value)
             if validation["valid"]:
                 validated[field] = validation["value"]
 
@@ -272,10 +471,88 @@ JSON only. Nothing else."""
         "needs_clarification": parsed.get("needs_clarification", []),
         "should_escalate": False,
         "escalation_reason": "",
-        "cost": cost,
+        "cost": usage["cost"],
+        "usage": usage,
+        "route": "sonnet",
+        "saved_cost": 0.0,
     }
 
 
+class _ReplyFieldStream:
+    """Incrementally decodes the top-level "response" string out of streamed JSON.
+    feed() takes raw model text chunks and returns any newly decoded reply text.
+    """
+
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = None  # None, or the escape sequence read so far ("" / "u00e")
+        self.surrogate = ""
+        self.token = []
+        self.last_key = None
+        self.expect_value = False
+        self.emitting = False
+        self.done = False
+
+    def feed(self, chunk):
+        out = []
+        for ch in chunk:
+            if self.in_string:
+                if self.escape is not None:
+                    self.escape += ch
+                    if self.escape[0] != "u":
+                        self._char(self._ESCAPES.get(ch, ch), out)
+                        self.escape = None
+                    elif len(self.escape) == 5:
+                        try:
+                            self._char(chr(int(self.escape[1:], 16)), out)
+                        except ValueError:
+                            pass
+                        self.escape = None
+                elif ch == "\\":
+                    self.escape = ""
+                elif ch == '"':
+                    self.in_string = False
+                    if self.emitting:
+                        self.emitting = False
+                        self.done = True
+                    elif self.depth == 1 and not self.expect_value:
+                        self.last_key = "".join(self.token)
+                else:
+                    self._char(ch, out)
+            elif ch == '"':
+                self.in_string = True
+                self.token = []
+                if (self.depth == 1 and self.expect_value and not self.done
+                        and self.last_key == "response"):
+                    self.emitting = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+            elif self.depth == 1 and ch == ":":
+                self.expect_value = True
+            elif self.depth == 1 and ch == ",":
+                self.expect_value = False
+                self.last_key = None
+        return "".join(out)
+
+    def _char(self, ch, out):
+        if not self.emitting:
+            self.token.append(ch)
+            return
+        # Recombine \uD83D\uDE00-style surrogate pairs before emitting
+        if "\ud800" <= ch <= "\udbff":
+            self.surrogate = ch
+            return
+        if self.surrogate:
+            pair, self.surrogate = self.surrogate + ch, ""
+            ch = pair.encode("utf-16", "surrogatepass").decode("utf-16")
+        out.append(ch)
+
+
 def generate_followup(product_title, missing_questions, followup_number=1):
     """Generate a follow-up for unresponsive buyer."""
     missing_text = ", ".join(q["question"] for q in missing_questions[:3])
@@ -295,8 +572,8 @@ Rules:
 
 Just the message."""
 
-    text, cost, inp, out = call_claude(prompt, AI_MODEL_CHEAP, max_tokens=150)
-    return {"response": text, "cost": cost}
+    text, usage = call_claude_with_usage(prompt, AI_MODEL_CHEAP, max_tokens=150)
+    return {"response": text, "cost": usage["cost"], "usage": usage}
 
 
 def generate_intake_questions(product_title, product_category=None, product_description=None):
@@ -304,7 +581,18 @@ def generate_intake_questions(product_title, product_category=None, product_desc
     AI-powered: Generate intake questions for a product the seller adds.
     This is the magic — seller adds a product, AI figures out what specs are needed.
     Now outputs structured constraint fields (max_length, min_length, validation_type).
+    Results are cached by normalized product context; a hit returns cost 0 and cached=True.
     """
+    cache_key = intake_questions_cache_key(product_title, product_category, product_description)
+    # The cache is best-effort: a database error means a miss, never a failed generation
+    try:
+        cached = get_cached_questions(cache_key)
+    except Exception as e:
+        logger.warning("Question cache read failed: %s", e)
+        cached = None
+    if cached is not None:
+        return {"questions": cached, "cost": 0.0, "cached": True, "usage": empty_usage("cache")}
+
     context = f"PRODUCT: {product_title}"
     if product_category:
         context += f"\nCATEGORY: {product_category}"
@@ -353,7 +641,7 @@ RESPOND IN THIS EXACT JSON FORMAT:
 
 JSON array only. Nothing else."""
 
-    raw_text, cost, inp, out = call_claude(prompt, AI_MODEL_SMART, max_tokens=800)
+    raw_text, usage = call_claude_with_usage(prompt, AI_MODEL_SMART, max_tokens=800)
 
     try:
         clean = raw_text.strip()
@@ -361,7 +649,11 @@ JSON array only. Nothing else."""
             clean = clean.split("\n", 1)[1].rsplit("```", 1)[0]
         questions = json.loads(clean)
         if isinstance(questions, list):
-            return {"questions": questions, "cost": cost}
+            try:
+                store_cached_questions(cache_key, questions)
+            except Exception as e:
+                logger.warning("Question cache write failed: %s", e)
+            return {"questions": questions, "cost": usage["cost"], "usage": usage}
     except json.JSONDecodeError:
         pass
 
@@ -377,10 +669,23 @@ JSON array only. Nothing else."""
                 "validation_type": "text"
             }
         ],
-        "cost": cost
+        "cost": usage["cost"],
+        "usage": usage,
     }
 
 
+# Bump when the question-generation prompt changes so stale cache entries miss
+INTAKE_QUESTIONS_CACHE_VERSION = "1"
+
+
+def intake_questions_cache_key(product_title, product_category=None, product_description=None):
+    """Hash of the product context, normalized for case and whitespace."""
+    parts = [INTAKE_QUESTIONS_CACHE_VERSION]
+    for value in (product_title, product_category, product_description):
+        parts.append(" ".join((value or "").lower().split()))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
 def check_escalation(buyer_message, conversation_history):
     """Quick check if conversation needs human intervention."""
     msg_lower = buyer_message.lower()
@@ -410,45 +715,331 @@ def check_escalation(buyer_message, conversation_history):
 
 def validate_answer(question, answer):
     """Validate a single answer against structured question constraints."""
-    answer = str(answer).strip()
-    if not answer:
-        return {"valid": False, "value": answer, "issue": "Empty answer"}
-
-    # Check max_length from structured field
-    max_len = question.get("max_length")
-    if max_len and len(answer) > max_len:
-        return {"valid": False, "value": answer, "issue": f"Too long ({len(answer)} chars). Maximum is {max_len} characters."}
-
-    # Check min_length from structured field
-    min_len = question.get("min_length")
-    if min_len and len(answer) < min_len:
-        return {"valid": False, "value": answer, "issue": f"Too short ({len(answer)} chars). Minimum is {min_len} characters."}
-
-    # Type-specific validation
-    validation_type = question.get("validation_type", "text")
-    if validation_type == "number":
+    return CompiledQuestion(question).validate(answer)
+
+
+# --- Compiled question schema ---
+# Everything a turn derives from the question set (option lookup tables,
+# prompt lines, constraint text) is computed once per set. Schemas are cached
+# by version, so all turns of all orders sharing a product snapshot reuse one.
+
+QUESTION_SCHEMA_CACHE_SIZE = 256
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+class CompiledQuestion:
+    """One intake question with its validation tables and prompt text prebuilt."""
+
+    __slots__ = ("field_name", "question", "required", "max_length", "min_length",
+                 "validation_type", "options", "option_lookup", "option_items", "options_issue",
+                 "option_pattern", "label_words", "takes_numbers", "prompt_line",
+                 "constraint_line")
+
+    def __init__(self, question):
+        self.field_name = question["field_name"]
+        self.question = question["question"]
+        self.required = bool(question.get("required"))
+        self.max_length = question.get("max_length")
+        self.min_length = question.get("min_length")
+        self.validation_type = question.get("validation_type", "text")
+
+        options = question.get("options") or []
+        self.options = tuple(options)
+        # Lowercased option -> original; fuzzy matching walks the same table in order
+        self.option_lookup = {opt.lower(): opt for opt in options}
+        self.option_items = tuple(self.option_lookup.items())
+        self.options_issue = f"Not a valid option. Choose from: {', '.join(options)}"
+        # Whole-word search for any option, longest first ("rose gold" before "gold")
+        self.option_pattern = None
+        if options:
+            alternatives = sorted(self.option_lookup, key=len, reverse=True)
+            self.option_pattern = re.compile(
+                r"(?<![\w.])(" + "|".join(map(re.escape, alternatives)) + r")(?![\w.])")
+        self.label_words = frozenset(self.field_name.lower().split("_"))
+        # Could a bare number be an answer to this question?
+        self.takes_numbers = (self.validation_type == "number"
+                              or (not options and self.validation_type != "email")
+                              or any(_NUMBER_RE.fullmatch(o) for o in self.option_lookup))
+
+        opts = f" (Options: {', '.join(options)})" if options else ""
+        self.prompt_line = f"  - {self.field_name}: {question['question']}{opts}\n"
+
+        constraints = []
+        if options:
+            constraints.append(f"Valid options: {', '.join(options)}")
+        if self.max_length:
+            constraints.append(f"Maximum {self.max_length} characters")
+        if self.min_length:
+            constraints.append(f"Minimum {self.min_length} characters")
+        if question.get("validation_type"):
+            constraints.append(f"Type: {question['validation_type']}")
+        if question.get("example"):
+            constraints.append(f"Example: {question['example']}")
+        self.constraint_line = (f"  - {self.field_name}: {'; '.join(constraints)}\n"
+                                if constraints else "")
+
+    def validate(self, answer):
+        answer = str(answer).strip()
+        if not answer:
+            return {"valid": False, "value": answer, "issue": "Empty answer"}
+
+        max_len = self.max_length
+        if max_len and len(answer) > max_len:
+            return {"valid": False, "value": answer, "issue": f"Too long ({len(answer)} chars). Maximum is {max_len} characters."}
+
+        min_len = self.min_length
+        if min_len and len(answer) < min_len:
+            return {"valid": False, "value": answer, "issue": f"Too short ({len(answer)} chars). Minimum is {min_len} characters."}
+
+        if self.validation_type == "number":
+            try:
+                float(answer)
+            except ValueError:
+                return {"valid": False, "value": answer, "issue": "Must be a number."}
+        elif self.validation_type == "email":
+            if "@" not in answer or "." not in answer:
+                return {"valid": False, "value": answer, "issue": "Must be a valid email address."}
+
+        if self.option_items:
+            answer_lower = answer.lower()
+            exact = self.option_lookup.get(answer_lower)
+            if exact is not None:
+                return {"valid": True, "value": exact, "issue": None}
+
+            # Fuzzy match
+            for opt_lower, opt_original in self.option_items:
+                if answer_lower in opt_lower or opt_lower in answer_lower:
+                    return {"valid": True, "value": opt_original, "issue": None}
+
+            return {"valid": False, "value": answer, "issue": self.options_issue}
+
+        return {"valid": True, "value": answer, "issue": None}
+
+
+class QuestionSchema:
+    """A compiled question set: field lookup, required/optional split, constraint text."""
+
+    def __init__(self, questions):
+        self.questions = tuple(CompiledQuestion(q) for q in questions)
+        self.by_field = {}
+        for q in self.questions:
+            self.by_field.setdefault(q.field_name, q)  # first definition wins
+        self.required = tuple(q for q in self.questions if q.required)
+        self.optional = tuple(q for q in self.questions if not q.required)
+        self.constraint_text = "".join(q.constraint_line for q in self.questions)
+
+    def required_complete(self, specs):
+        return bool(self.required) and all(specs.get(q.field_name) for q in self.required)
+
+
+def compile_questions(questions, version=None):
+    """Compiled schema for a question set. With a version (a key that always maps
+    to the same questions, like a product snapshot id) the result is cached."""
+    if version is None:
+        return QuestionSchema(questions)
+    with _schemas_lock:
+        schema = _schemas.get(version)
+        if schema is not None:
+            _schemas.move_to_end(version)
+            return schema
+    schema = QuestionSchema(questions)
+    with _schemas_lock:
+        _schemas[version] = schema
+        while len(_schemas) > QUESTION_SCHEMA_CACHE_SIZE:
+            _schemas.popitem(last=False)
+    return schema
+
+
+# --- Local spec extraction ---
+# A deterministic pre-pass over the compiled schema. It resolves turns that
+# are only option picks, numbers or a confirmation ("size 7, gold, script
+# font" / "yes looks good"). Anything it can't fully account for (questions,
+# free text, negations, ambiguous matches, invalid values) goes to Sonnet.
+
+LOCAL_MAX_MESSAGE_CHARS = 200
+# Used to estimate the Sonnet cost a local turn avoided
+CHARS_PER_TOKEN = 4
+EST_TURN_OUTPUT_TOKENS = 150
+
+CONFIRMATION_REPLY = ("Perfect, thank you! Your details are confirmed and on their way "
+                      "to the team. You're all set!")
+
+# A confirmation needs an explicit approval; courtesy words may accompany it, but
+# "thanks" or "ok" alone goes to Sonnet
+_AFFIRM = (r"yes|yep|yeah|yup|correct|confirmed?|"
+           r"looks? (?:good|great|perfect|correct|right)|sounds? (?:good|great|perfect)|"
+           r"that'?s (?:right|correct|perfect|it)|all good|good to go|send it")
+_AFFIRM_RE = re.compile(rf"\b(?:{_AFFIRM})\b")
+_CONFIRM_RE = re.compile(
+    rf"(?:(?:{_AFFIRM}|ok|okay|sure|perfect|great|thanks|thank you|ty)\s*)+")
+# The confirmation question every summary ends with (BUYER_TURN_INSTRUCTIONS, _template_reply)
+_SUMMARY_ASK_RE = re.compile(r"does everything look (?:correct|right|good)|"
+                             r"before i send this to the team", re.IGNORECASE)
+_SEGMENT_SPLIT_RE = re.compile(r"\s*(?:[,;\n]|\.\s|\band\b|&)\s*")
+_NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+_FILLER_WORDS = frozenset(
+    "please pls thanks thank you the a an i i'd id would like want go with for it "
+    "make let's lets do style one in inch inches cm mm".split())
+
+
+def _local_turn(buyer_message, product_title, schema, collected_specs, conversation_history,
+                system, turn_text):
+    """Answer the turn without Sonnet if the pre-pass fully resolves it.
+    Returns a process_buyer_message result, or None to fall through."""
+    if not LOCAL_EXTRACTION_ENABLED or len(buyer_message) > LOCAL_MAX_MESSAGE_CHARS:
+        return None
+    if "?" in buyer_message:
+        return None
+
+    if _is_confirmation(buyer_message):
+        # A "yes" only confirms the order if we just showed the summary; otherwise
+        # it may answer another question (e.g. an optional gift note) — ask Sonnet
+        if not (schema.required_complete(collected_specs)
+                and _awaiting_confirmation(conversation_history)):
+            return None
+        extracted, complete = {}, True
+        text, usage = CONFIRMATION_REPLY, empty_usage("local")
+    else:
+        extracted = _local_extract(buyer_message, schema, collected_specs)
+        if not extracted:
+            return None
+        complete = False  # two-phase: the reply summarizes, the buyer confirms next turn
+        text, usage = _local_reply(product_title, schema, extracted,
+                                   dict(collected_specs, **extracted))
+
+    saved = _estimated_turn_cost(system, turn_text) - usage["cost"]
+    return {
+        "response": text,
+        "specs_extracted": extracted,
+        "is_complete": complete,
+        "needs_clarification": [],
+        "should_escalate": False,
+        "escalation_reason": "",
+        "cost": usage["cost"],
+        "usage": usage,
+        "route": "local_haiku" if usage["model"] == AI_MODEL_CHEAP else "local",
+        "saved_cost": max(saved, 0.0),
+    }
+
+
+def _awaiting_confirmation(conversation_history):
+    """True if the last outbound message was the spec summary asking to confirm."""
+    for msg in reversed(conversation_history or []):
+        if msg.get("direction") == "outbound":
+            return _SUMMARY_ASK_RE.search(msg.get("content") or "") is not None
+    return False
+
+
+def _is_confirmation(buyer_message):
+    words = re.sub(r"[^\w' ]+", " ", buyer_message.lower()).split()
+    text = " ".join(words)
+    return (bool(words) and _CONFIRM_RE.fullmatch(text) is not None
+            and _AFFIRM_RE.search(text) is not None)
+
+
+def _local_extract(buyer_message, schema, collected_specs):
+    """Map every part of the message to one field, or return None."""
+    text = buyer_message.lower().replace("!", " ")
+    extracted = {}
+    for segment in _SEGMENT_SPLIT_RE.split(text):
+        segment = segment.strip(" .")
+        if not segment or set(segment.split()) <= _FILLER_WORDS:
+            continue
+        match = _match_segment(segment, schema, collected_specs)
+        if not match or match[0].field_name in extracted:
+            return None
+        question, value = match
+        validation = question.validate(value)
+        if not validation["valid"]:
+            return None
+        extracted[question.field_name] = validation["value"]
+    return extracted or None
+
+
+def _match_segment(segment, schema, collected_specs):
+    """The single (question, value) a segment answers, or None if zero or several fit."""
+    candidates = []
+    for q in schema.questions:
+        if q.option_pattern:
+            m = q.option_pattern.search(segment)
+            if m:
+                candidates.append((q, q.option_lookup[m.group(1)], m))
+        elif q.validation_type == "number":
+            m = _NUMBER_RE.search(segment)
+            if m:
+                candidates.append((q, m.group(0), m))
+
+    words = set(segment.split())
+    labelled = [c for c in candidates if c[0].label_words & words]
+    picked = labelled or candidates
+    if len(picked) != 1:
+        return None
+
+    question, value, m = picked[0]
+    if not labelled and question.validation_type == "number" and any(
+            q is not question and q.takes_numbers and not collected_specs.get(q.field_name)
+            for q in schema.questions):
+        return None  # a bare number could be the answer to another open question
+    # Everything besides the value must be the field's label or filler ("size 7")
+    leftover = set((segment[:m.start()] + " " + segment[m.end():]).split())
+    if leftover - question.label_words - _FILLER_WORDS:
+        return None
+    return question, value
+
+
+def _local_reply(product_title, schema, extracted, specs):
+    """Reply for a locally extracted turn: Haiku writes it, the template is the fallback."""
+    if LOCAL_EXTRACTION_REPLY == "haiku":
         try:
-            float(answer)
-        except ValueError:
-            return {"valid": False, "value": answer, "issue": "Must be a number."}
-    elif validation_type == "email":
-        if "@" not in answer or "." not in answer:
-            return {"valid": False, "value": answer, "issue": "Must be a valid email address."}
-
-    # Check options (for select-type or any question with options)
-    options = question.get("options", [])
-    if options:
-        options_lower = {opt.lower(): opt for opt in options}
-        answer_lower = answer.lower()
-
-        if answer_lower in options_lower:
-            return {"valid": True, "value": options_lower[answer_lower], "issue": None}
-
-        # Fuzzy match
-        for opt_lower, opt_original in options_lower.items():
-            if answer_lower in opt_lower or opt_lower in answer_lower:
-                return {"valid": True, "value": opt_original, "issue": None}
-
-        return {"valid": False, "value": answer, "issue": f"Not a valid option. Choose from: {', '.join(options)}"}
-
-    return {"valid": True, "value": answer, "issue": None}
+            return call_claude_with_usage(_local_reply_prompt(product_title, schema, extracted, specs),
+                                          AI_MODEL_CHEAP, max_tokens=300)
+        except Exception:
+            pass
+    return _template_reply(schema, extracted, specs), empty_usage("local")
+
+
+def _local_reply_prompt(product_title, schema, extracted, specs):
+    got = "".join(f"  - {field}: {value}\n" for field, value in extracted.items())
+    missing = "".join(q.prompt_line for q in schema.required if not specs.get(q.field_name))
+    if missing:
+        task = f"""DETAILS STILL NEEDED:
+{missing}
+Briefly acknowledge what they gave you, then ask for what's still needed (mention options if any)."""
+    else:
+        summary = "".join(f"  - {field}: {value}\n" for field, value in specs.items() if value)
+        task = f"""ALL REQUIRED DETAILS ARE NOW COLLECTED:
+{summary}
+Present a clear summary of every detail and ask: "Does everything look correct? Let me know if you'd like to change anything before I send this to the team." """
+
+    return f"""You are a friendly seller collecting customization details for a buyer's order of: {product_title}
+
+THE BUYER JUST GAVE YOU:
+{got}
+{task}
+
+Keep it SHORT (under 80 words unless presenting the summary). Sound human.
+Don't say "specifications" — say "details". Just write the message, nothing else."""
+
+
+def _template_reply(schema, extracted, specs):
+    got = ", ".join(f"{field.replace('_', ' ')}: {value}" for field, value in extracted.items())
+    missing = [q for q in schema.required if not specs.get(q.field_name)]
+    if missing:
+        return f"Got it — {got}. {missing[0].question}"
+    summary = "\n".join(f"- {field.replace('_', ' ')}: {value}"
+                        for field, value in specs.items() if value)
+    return (f"Great, here's everything I have:\n{summary}\n\n"
+            "Does everything look correct? Let me know if you'd like to change anything "
+            "before I send this to the team.")
+
+
+def _estimated_turn_cost(system, turn_text):
+    """Rough Sonnet cost of a turn: cached system blocks, fresh turn text, typical reply."""
+    rates = AI_COSTS[AI_MODEL_SMART]
+    cached = sum(len(block["text"]) for block in system) / CHARS_PER_TOKEN
+    fresh = len(turn_text) / CHARS_PER_TOKEN
+    return (cached * rates["input"] * CACHE_READ_MULTIPLIER
+            + fresh * rates["input"]
+            + EST_TURN_OUTPUT_TOKENS * rates["output"]) / 1_000_000
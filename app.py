@@ -12,36 +12,44 @@ import logging
 from dotenv import load_dotenv
 load_dotenv()
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, abort, Response
+from flask import (
+    Flask, request, jsonify, render_template, redirect, url_for, session, flash, abort, Response,
+    stream_with_context, g, make_response,
+)
 from werkzeug.security import generate_password_hash, check_password_hash
 from database import (
-    init_db, create_seller, get_seller, get_seller_by_email,
-    set_seller_password, get_seller_by_api_key,
-    add_product, get_product, get_seller_products,
-    create_order, get_order, get_seller_orders, update_order_specs,
-    add_message, get_messages, log_ai_cost, get_seller_stats, get_recent_activity,
-    save_etsy_connection, save_etsy_tokens, update_last_order_check,
-    get_product_by_external_id, order_exists_by_external_id,
-    update_product_notes, update_order_notes, mark_order_escalated,
-    update_fulfillment_status, get_completed_orders_with_specs, get_stale_orders,
+    init_db, init_request_scope, release_request_conn, close_pool,
+    create_seller, get_seller, get_seller_by_email,
+    set_seller_password, get_seller_by_api_key, rotate_api_key,
+    add_product, add_products, get_product,
+    create_order, get_order, get_seller_orders, get_seller_orders_page,
+    add_message, get_messages, log_ai_usage,
+    get_conversation_turn, save_conversation_turn, get_dashboard_snapshot,
+    save_etsy_connection, save_etsy_tokens, clear_etsy_connection,
+    get_products_by_external_ids,
+    update_product_notes, update_order_notes,
+    update_fulfillment_status, get_stale_orders,
     update_seller_settings, update_seller_profile, delete_seller_account,
     update_seller_plan, set_trial_end, get_monthly_order_count, get_product_count,
     get_seller_by_stripe_customer, update_seller_brand,
     set_reset_token, get_seller_by_reset_token, clear_reset_token,
-    get_all_sellers, get_admin_stats,
+    get_all_sellers, get_admin_stats, get_local_extraction_stats, get_ai_usage_rollup,
     generate_referral_code, set_referral_code, get_seller_by_referral_code,
     record_referral, get_referral_count, get_referrals, apply_referral_reward,
     set_onboard_email_stage, get_sellers_needing_onboard_email,
+    get_import_job,
 )
 from ai_engine import (
-    generate_greeting, process_buyer_message, generate_followup,
+    generate_greeting, process_buyer_message, stream_buyer_message, generate_followup,
     generate_intake_questions, validate_answer
 )
 from scraper import scrape_etsy_listing, scrape_etsy_shop
+from shop_import import start_shop_import, ETSY_IMPORT_MAX_PER_REQUEST, IMPORT_BATCH_SIZE
+from etsy_sync import sync_seller_orders, ETSY_SYNC_ENABLED
 from email_service import send_completion_email, send_escalation_email, send_password_reset_email, send_welcome_email
 from etsy_api import (
     generate_pkce_pair, get_oauth_url, exchange_code_for_tokens,
-    get_shop_for_user, get_shop_listings, get_recent_orders
+    get_shop_for_user, get_shop_listings
 )
 from marketing_content import BLOG_POSTS, COMPARISON_PAGES, CHANGELOG_ENTRIES, ABOUT_PAGE, SOLUTION_PAGES, FAQ_ITEMS
 from billing import (
@@ -161,14 +169,22 @@ def require_api_key():
     return seller, None
 
 
+# --- Request-scoped seller ---
+def current_seller():
+    """The logged-in seller, loaded at most once per request (None if logged out)."""
+    if "seller" not in g:
+        seller_id = session.get("seller_id")
+        g.seller = get_seller(seller_id) if seller_id else None
+    return g.seller
+
+
 # --- Stale session cleanup ---
 @app.before_request
 def validate_session():
     """Clear session if seller_id points to a deleted/nonexistent account."""
     seller_id = session.get("seller_id")
     if seller_id and request.endpoint not in ("logout", "home", "static"):
-        seller = get_seller(seller_id)
-        if not seller:
+        if not current_seller():
             session.clear()
             return redirect(url_for("home"))
 
@@ -184,6 +200,11 @@ try:
 except Exception as e:
     logger.warning("Growth tables init skipped: %s", e)
 
+# One pooled connection per request. Startup connections are closed so
+# gunicorn --preload workers each build their own pool after fork.
+init_request_scope(app)
+close_pool()
+
 
 # =============================================================
 # SELLER DASHBOARD
@@ -378,29 +399,59 @@ def dashboard():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
-    products = get_seller_products(seller_id)
-    orders = get_seller_orders(seller_id)
-    stats = get_seller_stats(seller_id)
-    activity = get_recent_activity(seller_id)
-    completed_orders = get_completed_orders_with_specs(seller_id)
-    stale_order_ids = get_stale_orders(seller_id)
+    snapshot = get_dashboard_snapshot(seller_id, seller=current_seller())
+    if not snapshot:
+        session.clear()
+        return redirect(url_for("home"))
 
     # Usage/billing info
-    monthly_orders = get_monthly_order_count(seller_id)
-    product_count = get_product_count(seller_id)
-    usage = get_usage_display(seller, monthly_orders, product_count)
+    usage = get_usage_display(snapshot["seller"], snapshot["stats"]["monthly_orders"],
+                              snapshot["product_count"])
+
+    return render_dashboard(snapshot, usage)
 
+
+def render_dashboard(snapshot, usage):
+    """Render dashboard.html from a get_dashboard_snapshot() result."""
     return render_template("dashboard.html",
-                           seller=seller, products=products,
-                           orders=orders, stats=stats, activity=activity,
-                           completed_orders=completed_orders,
-                           stale_order_ids=stale_order_ids,
+                           seller=snapshot["seller"], products=snapshot["products"],
+                           orders=snapshot["orders"], stats=snapshot["stats"],
+                           activity=snapshot["activity"],
+                           completed_orders=snapshot["completed_orders"],
+                           orders_next_cursor=snapshot["orders_next_cursor"],
+                           stale_order_ids=snapshot["stale_order_ids"],
                            usage=usage)
 
 
+@app.route("/dashboard/orders")
+def dashboard_orders_page():
+    """Next page of dashboard order rows (rendered HTML) for lazy loading."""
+    seller_id = session.get("seller_id")
+    if not seller_id:
+        return jsonify({"error": "Not logged in"}), 401
+
+    try:
+        orders, next_cursor = get_seller_orders_page(
+            seller_id, status=request.args.get("status") or None,
+            cursor=request.args.get("cursor") or None,
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    html = render_template("_order_rows.html", orders=orders,
+                           stale_order_ids=get_stale_orders(seller_id))
+    return jsonify({"html": html, "next_cursor": next_cursor})
+
+
 # === PRODUCT MANAGEMENT ===
 
+def _log_question_cost(seller_id, result, task):
+    """Usage-log a generate_intake_questions result; cache hits log as zero-cost."""
+    if result.get("cached"):
+        task += " (cache hit)"
+    log_ai_usage(seller_id, result["usage"], task)
+
+
 @app.route("/products/add", methods=["GET", "POST"])
 def add_product_page():
     seller_id = session.get("seller_id")
@@ -408,7 +459,7 @@ def add_product_page():
         return redirect(url_for("home"))
 
     if request.method == "GET":
-        seller = get_seller(seller_id)
+        seller = current_seller()
         if not seller:
             return redirect(url_for("home"))
         try:
@@ -435,7 +486,7 @@ def add_product_page():
         return redirect(url_for("add_product_page"))
 
     # Product quota check
-    seller = get_seller(seller_id)
+    seller = current_seller()
     product_count = get_product_count(seller_id)
     plan = get_plan(seller.get("plan", "free"))
     if plan["max_products"] != -1 and product_count >= plan["max_products"]:
@@ -444,10 +495,11 @@ def add_product_page():
 
     # Option A: AI-generate questions
     if request.form.get("ai_generate") == "1":
+        release_request_conn()
         result = generate_intake_questions(title, category, description)
         questions = result["questions"]
-        log_ai_cost(seller_id, "claude-sonnet-4-5-20250929", 0, 0, result["cost"],
-                    f"Generate questions for: {title}")
+        _log_question_cost(seller_id, result,
+                           f"Generate questions for: {title}")
     else:
         # Option B: Manual questions from form
         try:
@@ -488,7 +540,7 @@ def product_detail(product_id):
     orders = get_seller_orders(seller_id)
     product_orders = [o for o in orders if o["product_id"] == product_id]
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     return render_template("product_detail.html", product=product, orders=product_orders, seller=seller)
 
 
@@ -588,6 +640,7 @@ def import_from_url():
         flash("URL must be an Etsy listing.", "error")
         return redirect(url_for("add_product_page"))
 
+    release_request_conn()
     try:
         listing = scrape_etsy_listing(url)
     except Exception as e:
@@ -604,10 +657,11 @@ def import_from_url():
         )
         description = f"{description}\n\nVariations: {variation_info}" if description else variation_info
 
+    release_request_conn()
     result = generate_intake_questions(listing["title"], None, description)
     questions = result["questions"]
-    log_ai_cost(seller_id, "claude-sonnet-4-5-20250929", 0, 0, result["cost"],
-                f"Generate questions for imported: {listing['title']}")
+    _log_question_cost(seller_id, result,
+                       f"Generate questions for imported: {listing['title']}")
 
     product_id = add_product(
         seller_id=seller_id,
@@ -637,6 +691,7 @@ def import_shop_preview():
     if not shop_url:
         return jsonify({"error": "Please paste an Etsy shop URL."}), 400
 
+    release_request_conn()
     try:
         listings = scrape_etsy_shop(shop_url)
     except Exception as e:
@@ -665,43 +720,29 @@ def import_shop_confirm():
     if not selected_urls:
         return jsonify({"error": "No listings selected."}), 400
 
-    imported = []
-    errors = []
+    # Scraping + question generation runs in the background; the page polls progress
+    job_id = start_shop_import(seller_id, selected_urls, seller_notes)
+    return jsonify({"job_id": job_id, "total": len(selected_urls)}), 202
 
-    for url in selected_urls:
-        try:
-            listing = scrape_etsy_listing(url)
-
-            description = listing.get("description", "")
-            if listing.get("variations"):
-                variation_info = ". ".join(
-                    f"Available {v['name']}: {', '.join(v['options'])}" for v in listing["variations"]
-                )
-                description = f"{description}\n\nVariations: {variation_info}" if description else variation_info
-
-            result = generate_intake_questions(listing["title"], None, description)
-            questions = result["questions"]
-            log_ai_cost(seller_id, "claude-sonnet-4-5-20250929", 0, 0, result["cost"],
-                        f"Generate questions for imported: {listing['title']}")
-
-            product_id = add_product(
-                seller_id=seller_id,
-                title=listing["title"],
-                intake_questions=questions,
-                price=listing.get("price"),
-                image_url=listing["images"][0] if listing.get("images") else None,
-                description=listing.get("description") or None,
-                seller_notes=seller_notes or None,
-                source_url=url,
-            )
-            imported.append({"product_id": product_id, "title": listing["title"]})
-        except Exception as e:
-            errors.append({"url": url, "error": str(e)})
+
+@app.route("/products/import-shop/jobs/<job_id>")
+def import_shop_status(job_id):
+    """Progress of a background shop import."""
+    seller_id = session.get("seller_id")
+    if not seller_id:
+        return jsonify({"error": "Not logged in"}), 401
+
+    job = get_import_job(job_id, seller_id)
+    if not job:
+        return jsonify({"error": "Not found"}), 404
 
     return jsonify({
-        "imported": imported,
-        "errors": errors,
-        "count": len(imported),
+        "status": job["status"],
+        "total": job["total"],
+        "processed": job["processed"],
+        "imported": job["imported"],
+        "errors": job["errors"],
+        "count": len(job["imported"]),
     })
 
 
@@ -715,7 +756,7 @@ def create_order_page():
         return redirect(url_for("home"))
 
     # Quota check
-    seller = get_seller(seller_id)
+    seller = current_seller()
     monthly_orders = get_monthly_order_count(seller_id)
     product_count = get_product_count(seller_id)
     allowed, reason = check_quota(seller, monthly_orders, product_count)
@@ -773,7 +814,7 @@ def order_detail(order_id):
     filled_required = [q for q in required if collected.get(q["field_name"])]
     progress = len(filled_required) / len(required) if required else 1.0
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     return render_template("order_detail.html",
                            order=order, messages=messages,
                            progress=progress, seller=seller)
@@ -786,22 +827,26 @@ def order_detail(order_id):
 @app.route("/intake/<order_id>")
 def intake_page(order_id):
     """The buyer-facing page. This is what the Etsy sale_message links to."""
-    order = get_order(order_id)
+    order = get_conversation_turn(order_id)
     if not order:
         return render_template("intake_error.html", message="Order not found."), 404
 
+    # White-label: check if seller is on Business plan
+    white_label = order.get("seller_plan") == "business"
+    brand_color = order.get("brand_color") if white_label else None
+    brand_logo_url = order.get("brand_logo_url") if white_label else None
+
     if order["specs_complete"]:
-        seller = get_seller(order["seller_id"])
-        wl = seller.get("plan") == "business"
         return render_template("intake_complete.html", order=order,
-                               white_label=wl,
-                               brand_color=seller.get("brand_color") if wl else None,
-                               brand_logo_url=seller.get("brand_logo_url") if wl else None)
+                               white_label=white_label,
+                               brand_color=brand_color,
+                               brand_logo_url=brand_logo_url)
 
-    messages = get_messages(order_id)
+    messages = order["messages"]
 
     # If no messages yet, generate greeting
     if not messages:
+        release_request_conn()
         try:
             greeting = generate_greeting(
                 order["product_title"],
@@ -810,8 +855,7 @@ def intake_page(order_id):
                 seller_notes=order.get("seller_notes")
             )
             greeting_text = greeting["response"]
-            log_ai_cost(order["seller_id"], "claude-sonnet-4-5-20250929", 0, 0,
-                        greeting["cost"], f"Greeting for order {order_id}")
+            log_ai_usage(order["seller_id"], greeting["usage"], f"Greeting for order {order_id}")
         except Exception:
             logger.exception("AI error generating greeting for order %s", order_id)
             buyer = order.get("buyer_name") or "there"
@@ -823,117 +867,177 @@ def intake_page(order_id):
         add_message(order_id, "outbound", greeting_text, ai_generated=True)
         messages = get_messages(order_id)
 
-    # White-label: check if seller is on Business plan
-    seller = get_seller(order["seller_id"])
-    white_label = seller.get("plan") == "business"
-    brand_color = seller.get("brand_color") if white_label else None
-    brand_logo_url = seller.get("brand_logo_url") if white_label else None
-
     return render_template("intake_chat.html", order=order, messages=messages,
                            white_label=white_label, brand_color=brand_color,
                            brand_logo_url=brand_logo_url)
 
 
+INTAKE_AI_ERROR_REPLY = {
+    "response": "I'm sorry, I'm having a little trouble right now. Could you try sending that again?",
+    "specs_extracted": {},
+    "is_complete": False,
+    "should_escalate": False,
+}
+
+
 @app.route("/intake/<order_id>/message", methods=["POST"])
 @limiter.limit("20 per minute")
 def intake_message(order_id):
     """Buyer sends a message via the intake chat."""
-    order = get_order(order_id)
-    if not order:
-        return jsonify({"error": "Order not found"}), 404
-
-    if order["specs_complete"]:
-        return jsonify({"error": "Specs already complete", "complete": True})
-
-    buyer_message = request.json.get("message", "").strip()[:2000]
-    if not buyer_message:
-        return jsonify({"error": "Empty message"}), 400
-
-    # Save buyer message
-    add_message(order_id, "inbound", buyer_message)
-
-    # Get conversation history
-    messages = get_messages(order_id)
-    history = [{"direction": m["direction"], "content": m["content"]} for m in messages]
+    turn, buyer_message, err = _load_intake_turn(order_id)
+    if err:
+        return err
 
     # Process with AI
+    release_request_conn()
     try:
-        result = process_buyer_message(
-            buyer_message=buyer_message,
-            product_title=order["product_title"],
-            questions=order["intake_questions"],
-            collected_specs=order["customer_specs"],
-            conversation_history=history,
-            buyer_name=order.get("buyer_name"),
-            seller_notes=order.get("seller_notes"),
-        )
+        result = process_buyer_message(**_buyer_message_args(turn, buyer_message))
     except Exception:
         logger.exception("AI error processing message for order %s", order_id)
-        return jsonify({
-            "response": "I'm sorry, I'm having a little trouble right now. Could you try sending that again?",
-            "specs_extracted": {},
-            "is_complete": False,
-            "should_escalate": False,
-        })
+        # Keep the buyer's message even though the AI turn failed
+        add_message(order_id, "inbound", buyer_message)
+        return jsonify(INTAKE_AI_ERROR_REPLY)
+
+    return jsonify(_finish_intake_turn(turn, buyer_message, result))
+
+
+@app.route("/intake/<order_id>/message/stream", methods=["POST"])
+@limiter.limit("20 per minute")
+def intake_message_stream(order_id):
+    """Streaming variant of intake_message (Server-Sent Events).
+    Emits "token" events with reply text as it is generated, then one "done"
+    event carrying the same payload intake_message returns.
+    """
+    turn, buyer_message, err = _load_intake_turn(order_id)
+    if err:
+        return err
+    # Don't hold a pooled connection for the whole stream
+    release_request_conn()
+
+    def events():
+        stream = stream_buyer_message(**_buyer_message_args(turn, buyer_message))
+        result = None
+        try:
+            for kind, payload in stream:
+                if kind == "text":
+                    yield _sse("token", {"text": payload})
+                else:
+                    result = payload
+        except GeneratorExit:
+            # The buyer left mid-reply: finish the (already paid for) turn and save it anyway
+            try:
+                for kind, payload in stream:
+                    if kind == "result":
+                        result = payload
+            except Exception:
+                logger.exception("AI error finishing abandoned stream for order %s", order_id)
+                add_message(order_id, "inbound", buyer_message)
+                raise
+            _finish_intake_turn(turn, buyer_message, result)
+            raise
+        except Exception:
+            logger.exception("AI error streaming message for order %s", order_id)
+            add_message(order_id, "inbound", buyer_message)
+            yield _sse("done", INTAKE_AI_ERROR_REPLY)
+            return
+        yield _sse("done", _finish_intake_turn(turn, buyer_message, result))
 
-    # Update specs
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _load_intake_turn(order_id):
+    """Validate an intake POST. Returns (turn, buyer_message, error_response)."""
+    # Order, product, seller settings and history in one query
+    turn = get_conversation_turn(order_id)
+    if not turn:
+        return None, None, (jsonify({"error": "Order not found"}), 404)
+
+    if turn["specs_complete"]:
+        return None, None, jsonify({"error": "Specs already complete", "complete": True})
+
+    buyer_message = (request.json or {}).get("message", "").strip()[:2000]
+    if not buyer_message:
+        return None, None, (jsonify({"error": "Empty message"}), 400)
+    return turn, buyer_message, None
+
+
+def _buyer_message_args(turn, buyer_message):
+    # Conversation history, including the message being answered
+    history = [{"direction": m["direction"], "content": m["content"]} for m in turn["messages"]]
+    history.append({"direction": "inbound", "content": buyer_message})
+    return {
+        "buyer_message": buyer_message,
+        "product_title": turn["product_title"],
+        "questions": turn["intake_questions"],
+        "collected_specs": turn["customer_specs"],
+        "conversation_history": history,
+        "buyer_name": turn.get("buyer_name"),
+        "seller_notes": turn.get("seller_notes"),
+        "question_version": turn.get("product_snapshot_id"),
+    }
+
+
+def _finish_intake_turn(turn, buyer_message, result):
+    """Persist an AI turn, send seller notifications, and return the buyer-facing payload."""
+    order_id = turn["id"]
+
+    # Only mark complete when AI confirms buyer explicitly approved
+    # (two-phase: AI summarizes first, buyer confirms, THEN all_required_complete=true)
+    buyer_confirmed = result.get("is_complete", False)
+    updated_specs = None
     if result["specs_extracted"]:
-        updated_specs = order["customer_specs"].copy()
+        updated_specs = turn["customer_specs"].copy()
         # Filter out special_requests from normal specs — store separately
         extracted = result["specs_extracted"].copy()
         extracted.pop("special_requests", None)
         updated_specs.update(extracted)
-
-        # Only mark complete when AI confirms buyer explicitly approved
-        # (two-phase: AI summarizes first, buyer confirms, THEN all_required_complete=true)
-        buyer_confirmed = result.get("is_complete", False)
-
-        update_order_specs(order_id, updated_specs, complete=buyer_confirmed)
-        result["is_complete"] = buyer_confirmed
-    else:
+    elif buyer_confirmed:
         # Even without new specs, the AI might signal completion (buyer confirming summary)
-        buyer_confirmed = result.get("is_complete", False)
-        if buyer_confirmed:
-            update_order_specs(order_id, order["customer_specs"], complete=True)
-            result["is_complete"] = True
+        updated_specs = turn["customer_specs"]
+    result["is_complete"] = buyer_confirmed
 
-    # Save bot response
-    add_message(order_id, "outbound", result["response"],
-                specs_extracted=result["specs_extracted"], ai_generated=True)
+    should_escalate = result.get("should_escalate", False)
 
-    # Log cost
-    log_ai_cost(order["seller_id"], "claude-sonnet-4-5-20250929", 0, 0,
-                result["cost"], f"Conversation turn for order {order_id}")
+    # Buyer message, bot reply, spec update, escalation flag and usage in one transaction
+    save_conversation_turn(
+        order_id, turn["seller_id"], buyer_message, result["response"],
+        specs_extracted=result["specs_extracted"],
+        updated_specs=updated_specs,
+        complete=buyer_confirmed,
+        escalated=should_escalate,
+        usage=result["usage"],
+        task=f"Conversation turn for order {order_id}",
+        route=result.get("route"),
+        saved_cost=result.get("saved_cost", 0.0),
+    )
 
-    # Load seller notification settings
-    seller = get_seller(order["seller_id"])
-    try:
-        seller_settings = json.loads(seller.get("settings") or "{}")
-    except (json.JSONDecodeError, TypeError):
-        seller_settings = {}
+    seller_settings = turn["seller_settings"]
 
     # Handle escalation
-    should_escalate = result.get("should_escalate", False)
     if should_escalate:
-        mark_order_escalated(order_id)
         if seller_settings.get("email_on_escalation", True):
             base_url = request.host_url.rstrip("/")
-            send_escalation_email(order, result.get("escalation_reason", ""), base_url)
+            send_escalation_email(turn, result.get("escalation_reason", ""), base_url)
 
     # Handle completion email
     if result["is_complete"]:
         if seller_settings.get("email_on_complete", True):
             base_url = request.host_url.rstrip("/")
-            refreshed_order = get_order(order_id)
-            if refreshed_order:
-                send_completion_email(refreshed_order, base_url)
+            completed_order = dict(turn, customer_specs=updated_specs,
+                                   specs_complete=1, status="complete")
+            send_completion_email(completed_order, base_url)
 
-    return jsonify({
+    return {
         "response": result["response"],
         "specs_extracted": result["specs_extracted"],
         "is_complete": result["is_complete"],
         "should_escalate": should_escalate,
-    })
+    }
 
 
 # =============================================================
@@ -993,7 +1097,7 @@ def etsy_auth_callback():
         tokens = exchange_code_for_tokens(auth_code, code_verifier)
 
         # Get seller object with new tokens temporarily set
-        seller = get_seller(seller_id)
+        seller = current_seller()
         seller["etsy_access_token"] = tokens["access_token"]
         seller["etsy_refresh_token"] = tokens["refresh_token"]
         seller["etsy_token_expires_at"] = tokens["expires_at"]
@@ -1026,19 +1130,7 @@ def etsy_disconnect():
     if not seller_id:
         return redirect(url_for("home"))
 
-    from database import get_conn
-    conn = get_conn()
-    try:
-        conn.execute("""
-            UPDATE sellers SET etsy_user_id = NULL, etsy_shop_id = NULL,
-                               etsy_access_token = NULL, etsy_refresh_token = NULL,
-                               etsy_token_expires_at = NULL, etsy_connected_at = NULL,
-                               etsy_last_order_check = NULL
-            WHERE id = %s
-        """, (seller_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    clear_etsy_connection(seller_id)
 
     flash("Etsy disconnected.", "success")
     return redirect(url_for("dashboard"))
@@ -1052,11 +1144,12 @@ def etsy_import_products():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller.get("etsy_access_token"):
         flash("Connect Etsy first.", "error")
         return redirect(url_for("dashboard"))
 
+    release_request_conn()
     try:
         listings = get_shop_listings(seller)
     except Exception as e:
@@ -1068,51 +1161,69 @@ def etsy_import_products():
         flash("No active listings found in your Etsy shop.", "error")
         return redirect(url_for("dashboard"))
 
-    imported = 0
     skipped = 0
+    attempted = remaining = 0
 
     # Check product quota
     product_count = get_product_count(seller_id)
     plan = get_plan(seller.get("plan", "free"))
 
+    # One lookup for every listing instead of one per listing
+    existing = get_products_by_external_ids(seller_id, [l["listing_id"] for l in listings])
+    new_products = []
+    imported = 0
+
     for listing in listings:
         # Skip if already imported
-        existing = get_product_by_external_id(seller_id, str(listing["listing_id"]))
-        if existing:
+        if str(listing["listing_id"]) in existing:
             skipped += 1
             continue
 
-        if plan["max_products"] != -1 and product_count >= plan["max_products"]:
+        if (plan["max_products"] != -1
+                and product_count + imported + len(new_products) >= plan["max_products"]):
             logger.info("Product quota reached during Etsy import for seller %s", seller_id)
             break
 
+        # Each new listing costs a synchronous Sonnet call; the rest wait for the next import
+        if attempted >= ETSY_IMPORT_MAX_PER_REQUEST:
+            remaining += 1
+            continue
+
         # Generate AI intake questions
+        attempted += 1
+        release_request_conn()
         try:
             result = generate_intake_questions(
                 listing["title"], None, listing.get("description", "")
             )
-            questions = result["questions"]
-            log_ai_cost(seller_id, "claude-sonnet-4-5-20250929", 0, 0, result["cost"],
-                        f"Generate questions for Etsy import: {listing['title']}")
-
-            add_product(
-                seller_id=seller_id,
-                title=listing["title"],
-                intake_questions=questions,
-                price=listing.get("price"),
-                image_url=listing.get("image_url"),
-                external_id=str(listing["listing_id"]),
-                description=listing.get("description") or None,
-                source_url=listing.get("url") or None,
-            )
-            imported += 1
-            product_count += 1
+            _log_question_cost(seller_id, result,
+                               f"Generate questions for Etsy import: {listing['title']}")
+
+            new_products.append({
+                "title": listing["title"],
+                "intake_questions": result["questions"],
+                "price": listing.get("price"),
+                "image_url": listing.get("image_url"),
+                "external_id": str(listing["listing_id"]),
+                "description": listing.get("description") or None,
+                "source_url": listing.get("url") or None,
+            })
         except Exception as e:
             logger.error("Failed to import listing %s: %s", listing['listing_id'], e)
 
+        # Save in batches so a timeout or crash keeps the questions already paid for
+        if len(new_products) >= IMPORT_BATCH_SIZE:
+            imported += len(add_products(seller_id, new_products))
+            new_products = []
+
+    if new_products:
+        imported += len(add_products(seller_id, new_products))
+
     msg = f"Imported {imported} products from Etsy."
     if skipped:
         msg += f" ({skipped} already existed)"
+    if remaining:
+        msg += f" {remaining} more listings are waiting — run the import again to add them."
     flash(msg, "success")
     return redirect(url_for("dashboard"))
 
@@ -1125,62 +1236,20 @@ def etsy_check_orders():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller.get("etsy_access_token"):
         flash("Connect Etsy first.", "error")
         return redirect(url_for("dashboard"))
 
+    release_request_conn()
     try:
-        receipts = get_recent_orders(seller, min_created=seller.get("etsy_last_order_check"))
+        result = sync_seller_orders(seller)
     except Exception as e:
         logger.error("Etsy order check error: %s", e)
         flash("Could not check Etsy orders. Please try again.", "error")
         return redirect(url_for("dashboard"))
 
-    created = 0
-    skipped = 0
-    no_product = 0
-
-    # Check order quota
-    monthly_orders = get_monthly_order_count(seller_id)
-    plan = get_plan(seller.get("plan", "free"))
-
-    for receipt in receipts:
-        receipt_id = str(receipt["receipt_id"])
-
-        # Skip if order already exists
-        if order_exists_by_external_id(seller_id, receipt_id):
-            skipped += 1
-            continue
-
-        # Match transactions to products
-        for txn in receipt.get("transactions", []):
-            try:
-                listing_id = str(txn.get("listing_id", ""))
-                product = get_product_by_external_id(seller_id, listing_id)
-
-                if not product:
-                    no_product += 1
-                    continue
-
-                allowed, reason = check_quota(seller, monthly_orders, 0)
-                if not allowed:
-                    logger.info("Order quota reached during Etsy order sync for seller %s", seller_id)
-                    break
-
-                order_id = create_order(
-                    seller_id=seller_id,
-                    product_id=product["id"],
-                    buyer_name=receipt.get("buyer_name") or None,
-                    external_order_id=receipt_id,
-                )
-                created += 1
-                monthly_orders += 1
-            except Exception as e:
-                logger.error("Error processing transaction in receipt %s: %s", receipt_id, e)
-                continue
-
-    update_last_order_check(seller_id)
+    created, skipped, no_product = result["created"], result["skipped"], result["no_product"]
 
     msg = f"Found {created} new orders."
     if skipped:
@@ -1241,6 +1310,45 @@ def api_create_order():
     }), 201
 
 
+@app.route("/api/orders", methods=["GET"])
+def api_list_orders():
+    """
+    List orders newest first, a page at a time. Requires X-API-Key header.
+
+    GET /api/orders?limit=25&status=collecting&cursor=<next_cursor from previous page>
+    """
+    seller, err = require_api_key()
+    if err:
+        return err
+
+    try:
+        orders, next_cursor = get_seller_orders_page(
+            seller["id"],
+            status=request.args.get("status") or None,
+            cursor=request.args.get("cursor") or None,
+            limit=request.args.get("limit", 25, type=int),
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    base_url = request.host_url.rstrip("/")
+    return jsonify({
+        "orders": [{
+            "order_id": o["id"],
+            "product_id": o["product_id"],
+            "product_title": o["product_title"],
+            "external_order_id": o["external_order_id"],
+            "buyer_name": o["buyer_name"],
+            "status": o["status"],
+            "specs_complete": bool(o["specs_complete"]),
+            "customer_specs": o["customer_specs"],
+            "created_at": str(o["created_at"]),
+            "intake_url": f"{base_url}/intake/{o['id']}",
+        } for o in orders],
+        "next_cursor": next_cursor,
+    })
+
+
 @app.route("/api/orders/<order_id>", methods=["GET"])
 def api_get_order(order_id):
     """Get order status and collected specs. Requires X-API-Key header."""
@@ -1307,11 +1415,14 @@ def api_generate_questions(product_id):
         return jsonify({"error": "Not found"}), 404
 
     data = request.json or {}
+    release_request_conn()
     result = generate_intake_questions(
         product["title"],
         data.get("category", product.get("category")),
         data.get("description"),
     )
+    _log_question_cost(seller["id"], result,
+                       f"Generate questions via API for: {product['title']}")
 
     return jsonify(result)
 
@@ -1326,7 +1437,7 @@ def settings_page():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller:
         return redirect(url_for("home"))
     try:
@@ -1334,6 +1445,7 @@ def settings_page():
     except (json.JSONDecodeError, TypeError):
         settings = {}
 
+    new_api_key = None
     if request.method == "POST":
         action = request.form.get("action")
 
@@ -1389,13 +1501,19 @@ def settings_page():
             set_referral_code(seller_id, new_code)
             flash("Referral code regenerated.", "success")
 
+        elif action == "regenerate_api_key":
+            # Rendered once in this response; never put in flash(), which lives in the
+            # signed but unencrypted session cookie
+            new_api_key = rotate_api_key(seller_id)
+
         elif action == "delete_account":
             delete_seller_account(seller_id)
             session.clear()
             flash("Account deleted.", "success")
             return redirect(url_for("home"))
 
-        return redirect(url_for("settings_page"))
+        if new_api_key is None:
+            return redirect(url_for("settings_page"))
 
     # Billing/usage data
     monthly_orders = get_monthly_order_count(seller_id)
@@ -1412,9 +1530,12 @@ def settings_page():
         set_referral_code(seller_id, ref_code)
         seller["referral_code"] = ref_code
 
-    return render_template("settings.html", seller=seller, settings=settings,
-                           usage=usage, plans=PLANS,
-                           referral_count=referral_count, referrals=referrals)
+    response = make_response(render_template(
+        "settings.html", seller=seller, settings=settings, usage=usage, plans=PLANS,
+        referral_count=referral_count, referrals=referrals, new_api_key=new_api_key))
+    if new_api_key:
+        response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 # =============================================================
@@ -1428,7 +1549,7 @@ def billing_checkout():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     plan_key = request.form.get("plan", "starter")
 
     if plan_key not in ("starter", "pro", "business"):
@@ -1459,7 +1580,7 @@ def billing_portal():
     if not seller_id:
         return redirect(url_for("home"))
 
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller.get("stripe_customer_id"):
         flash("No billing account found.", "error")
         return redirect(url_for("settings_page"))
@@ -1548,12 +1669,16 @@ def admin_panel():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
     sellers = get_all_sellers()
     stats = get_admin_stats()
-    return render_template("admin.html", seller=seller, sellers=sellers, admin_stats=stats)
+    local_stats = get_local_extraction_stats()
+    return render_template("admin.html", seller=seller, sellers=sellers, admin_stats=stats,
+                           local_stats=local_stats,
+                           usage_by_task=get_ai_usage_rollup("task"),
+                           usage_by_seller=get_ai_usage_rollup("seller", limit=10))
 
 
 # =============================================================
@@ -1565,7 +1690,7 @@ def growth_dashboard():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
 
@@ -1620,7 +1745,7 @@ def growth_settings():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
 
@@ -1771,7 +1896,7 @@ def growth_trigger():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
 
@@ -1792,7 +1917,7 @@ def growth_review():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
 
@@ -1878,7 +2003,7 @@ def growth_rewrite():
     seller_id = session.get("seller_id")
     if not seller_id:
         return redirect(url_for("home"))
-    seller = get_seller(seller_id)
+    seller = current_seller()
     if not seller or not seller.get("is_admin"):
         abort(404)
 
@@ -2301,11 +2426,10 @@ def message_generator():
         return redirect(url_for("message_generator"))
 
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY", ""))
-        response = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=600,
+        from ai_engine import call_claude, AI_MODEL_CHEAP
+        result, _, _, _ = call_claude(
+            f"Generate a custom order spec collection message template for: {product_type}",
+            AI_MODEL_CHEAP, max_tokens=600,
             system="""You generate Etsy seller message templates for collecting custom order specs from buyers.
 
 Given a product type, output a ready-to-paste message template that an Etsy seller can send to buyers after a custom order purchase. The template should:
@@ -2316,9 +2440,7 @@ Given a product type, output a ready-to-paste message template that an Etsy sell
 - Include a brief greeting and sign-off
 
 Output ONLY the message template text. No explanation, no markdown formatting.""",
-            messages=[{"role": "user", "content": f"Generate a custom order spec collection message template for: {product_type}"}],
         )
-        result = response.content[0].text.strip()
     except Exception as e:
         logger.error("Message generator AI error: %s", e)
         result = None
@@ -2348,11 +2470,9 @@ def checklist_generator():
         prompt += f"\nAdditional details: {extra_details}"
 
     try:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY", ""))
-        response = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=800,
+        from ai_engine import call_claude, AI_MODEL_CHEAP
+        result, _, _, _ = call_claude(
+            prompt, AI_MODEL_CHEAP, max_tokens=800,
             system="""You generate custom order spec checklists for Etsy sellers.
 
 Given a product type, output a checklist of every detail/spec the seller should collect from buyers before starting production. Organize into sections:
@@ -2364,9 +2484,7 @@ Given a product type, output a checklist of every detail/spec the seller should
 For each item, include a brief note in parentheses explaining WHY it matters or a common pitfall.
 
 Use HTML formatting: <h3> for section headings, <ul><li> for items. Keep it practical and specific to the product type. No intro paragraph — jump straight into the checklist.""",
-            messages=[{"role": "user", "content": prompt}],
         )
-        result = response.content[0].text.strip()
     except Exception as e:
         logger.error("Checklist generator AI error: %s", e)
         result = None
@@ -2402,8 +2520,9 @@ def health():
 # RUN
 # =============================================================
 
-# Initialize growth scheduler (only in production, not in debug reloader)
-if not os.environ.get("WERKZEUG_RUN_MAIN") and os.environ.get("GROWTH_ENABLED", "0") == "1":
+# Initialize scheduler — growth agents and/or Etsy order sync (not in debug reloader)
+if not os.environ.get("WERKZEUG_RUN_MAIN") and (
+        os.environ.get("GROWTH_ENABLED", "0") == "1" or ETSY_SYNC_ENABLED):
     try:
         from growth.growth_scheduler import init_scheduler
         _growth_scheduler = init_scheduler(app)
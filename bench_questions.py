@@ -0,0 +1,120 @@
+"""
+Microbenchmark: per-turn CPU spent validating the specs the model extracted,
+before and after the cached compiled schema (ai_engine.compile_questions).
+Run: python bench_questions.py [turns]
+
+The baseline is the pre-schema code path, copied below: a next() scan over the
+questions for each field, and a validate_answer that rebuilds the lowercase
+option map on every call. No API calls are made.
+"""
+import json
+import sys
+import timeit
+
+from ai_engine import _parse_buyer_reply, compile_questions
+
+FONTS = ["Arial", "Times New Roman", "Script", "Block", "Serif", "Sans Serif",
+         "Cursive", "Typewriter", "Handwritten", "Monogram", "Art Deco", "Gothic"]
+COLORS = ["Gold", "Silver", "Rose Gold", "Black", "White Gold", "Copper",
+          "Bronze", "Platinum", "Gunmetal", "Brass"]
+
+QUESTIONS = [
+    {"field_name": "engraving_text", "question": "What text should we engrave?",
+     "required": True, "max_length": 20, "example": "Forever & Always"},
+    {"field_name": "font", "question": "Which font would you like?", "required": True,
+     "options": FONTS},
+    {"field_name": "metal_color", "question": "Which metal color?", "required": True,
+     "options": COLORS},
+    {"field_name": "chain_length", "question": "Chain length in inches?", "required": True,
+     "validation_type": "number"},
+    {"field_name": "ring_size", "question": "Ring size?", "required": False,
+     "options": [str(n / 2) for n in range(8, 28)]},
+    {"field_name": "gift_note", "question": "Gift note?", "required": False, "max_length": 200},
+    {"field_name": "contact_email", "question": "Email for proofs?", "required": False,
+     "validation_type": "email"},
+    {"field_name": "initials", "question": "Initials for the clasp?", "required": False,
+     "max_length": 3, "min_length": 1},
+]
+
+REPLY = json.dumps({
+    "response": "Got it! What chain length would you like?",
+    "extracted_specs": {"font": "gothic style", "metal_color": "rose",
+                        "ring_size": "7.5", "initials": "JM"},
+    "all_required_complete": False,
+    "needs_clarification": [],
+})
+USAGE = {"cost": 0.0}
+
+
+# --- Baseline: validation before compiled schemas ---
+
+def legacy_validate_answer(question, answer):
+    answer = str(answer).strip()
+    if not answer:
+        return {"valid": False, "value": answer, "issue": "Empty answer"}
+
+    max_len = question.get("max_length")
+    if max_len and len(answer) > max_len:
+        return {"valid": False, "value": answer, "issue": f"Too long ({len(answer)} chars). Maximum is {max_len} characters."}
+
+    min_len = question.get("min_length")
+    if min_len and len(answer) < min_len:
+        return {"valid": False, "value": answer, "issue": f"Too short ({len(answer)} chars). Minimum is {min_len} characters."}
+
+    validation_type = question.get("validation_type", "text")
+    if validation_type == "number":
+        try:
+            float(answer)
+        except ValueError:
+            return {"valid": False, "value": answer, "issue": "Must be a number."}
+    elif validation_type == "email":
+        if "@" not in answer or "." not in answer:
+            return {"valid": False, "value": answer, "issue": "Must be a valid email address."}
+
+    options = question.get("options", [])
+    if options:
+        options_lower = {opt.lower(): opt for opt in options}
+        answer_lower = answer.lower()
+
+        if answer_lower in options_lower:
+            return {"valid": True, "value": options_lower[answer_lower], "issue": None}
+
+        for opt_lower, opt_original in options_lower.items():
+            if answer_lower in opt_lower or opt_lower in answer_lower:
+                return {"valid": True, "value": opt_original, "issue": None}
+
+        return {"valid": False, "value": answer, "issue": f"Not a valid option. Choose from: {', '.join(options)}"}
+
+    return {"valid": True, "value": answer, "issue": None}
+
+
+def legacy_parse(raw_text, questions):
+    parsed = json.loads(raw_text.strip())
+    validated = {}
+    for field, value in parsed.get("extracted_specs", {}).items():
+        matching_q = next((q for q in questions if q["field_name"] == field), None)
+        if matching_q:
+            validation = legacy_validate_answer(matching_q, value)
+            if validation["valid"]:
+                validated[field] = validation["value"]
+    return validated
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    schema = compile_questions(QUESTIONS, "bench-v1")
+    assert legacy_parse(REPLY, QUESTIONS) == _parse_buyer_reply(REPLY, schema, USAGE)["specs_extracted"]
+
+    legacy = min(timeit.repeat(lambda: legacy_parse(REPLY, QUESTIONS),
+                               number=turns, repeat=3)) / turns
+    cached = min(timeit.repeat(lambda: _parse_buyer_reply(REPLY, schema, USAGE),
+                               number=turns, repeat=3)) / turns
+    print(f"{len(QUESTIONS)} questions, {turns} turns")
+    print(f"  next() + validate_answer: {legacy * 1e6:8.1f} us/turn")
+    print(f"  cached schema:            {cached * 1e6:8.1f} us/turn")
+    print(f"  saved:                    {(legacy - cached) * 1e6:8.1f} us/turn "
+          f"({(1 - cached / legacy) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
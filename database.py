@@ -5,10 +5,17 @@ Set DATABASE_URL env var to use Postgres. Otherwise falls back to SQLite.
 """
 import sqlite3
 import json
+import atexit
 import os
+import re
 import uuid
+import base64
+import hashlib
 import secrets
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
 logger = logging.getLogger("etsai.db")
@@ -27,24 +34,179 @@ if USE_PG:
 else:
     logger.info("Using SQLite: %s", DB_PATH)
 
+# --- Connection pool settings ---
+POOL_SIZE = int(os.environ.get("ETSAI_DB_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.environ.get("ETSAI_DB_POOL_TIMEOUT", "30"))
+# Ping idle connections before reuse; recycle connections older than max age
+POOL_PING_AFTER = float(os.environ.get("ETSAI_DB_POOL_PING_AFTER", "30"))
+POOL_MAX_AGE = float(os.environ.get("ETSAI_DB_POOL_MAX_AGE", "1800"))
+
+# --- Intake question cache (generate_intake_questions results) ---
+QUESTION_CACHE_TTL_DAYS = int(os.environ.get("ETSAI_QUESTION_CACHE_TTL_DAYS", "30"))
+QUESTION_CACHE_MAX_ENTRIES = int(os.environ.get("ETSAI_QUESTION_CACHE_MAX_ENTRIES", "5000"))
+# Cache writes between prunes (expired rows are already misses, so pruning can lag)
+QUESTION_CACHE_PRUNE_EVERY = int(os.environ.get("ETSAI_QUESTION_CACHE_PRUNE_EVERY", "100"))
+
+# --- Seller row cache (per process; seller writers invalidate, 0 disables) ---
+SELLER_CACHE_TTL = float(os.environ.get("ETSAI_SELLER_CACHE_TTL", "30"))
+SELLER_CACHE_MAX_ENTRIES = int(os.environ.get("ETSAI_SELLER_CACHE_MAX_ENTRIES", "2000"))
+
+# --- API key cache (verified key hash -> seller_id, LRU) ---
+API_KEY_CACHE_TTL = float(os.environ.get("ETSAI_API_KEY_CACHE_TTL", "60"))
+API_KEY_CACHE_MAX_ENTRIES = int(os.environ.get("ETSAI_API_KEY_CACHE_MAX_ENTRIES", "1000"))
+
+# --- Write-behind queue for bookkeeping rows (ai_usage, growth_agent_log) ---
+# Flushed once BATCH_SIZE rows are pending or FLUSH_SECONDS pass; 0 writes inline
+WRITE_BEHIND_ENABLED = os.environ.get("ETSAI_WRITE_BEHIND", "1") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("ETSAI_WRITE_BEHIND_BATCH_SIZE", "100"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get("ETSAI_WRITE_BEHIND_FLUSH_SECONDS", "2"))
+# Rows kept while the database is unreachable; the oldest beyond this are dropped
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("ETSAI_WRITE_BEHIND_MAX_PENDING", "10000"))
+
+
+def _connect():
+    """Open a raw driver connection. Per-connection setup (PRAGMAs) runs once here."""
+    if USE_PG:
+        import psycopg2
+        import psycopg2.extras
+        return psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.RealDictCursor)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of raw connections for one process.
+    Connections are health-checked on checkout and rolled back on return.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = []  # [(raw_conn, created_at, last_used)]
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def checkout(self):
+        """Return (raw_conn, created_at). Blocks up to `timeout` when all slots are in use."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError(f"Database pool exhausted ({self.size} connections in use)")
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return _connect(), time.monotonic()
+                raw, created_at, last_used = entry
+                if self._is_usable(raw, created_at, last_used):
+                    return raw, created_at
+                self._discard(raw)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, raw, created_at, broken=False):
+        """Hand a connection back. Uncommitted work is rolled back."""
+        if self.pid != os.getpid():
+            return  # inherited across fork — never touch the parent's socket
+        try:
+            if not broken:
+                try:
+                    raw.rollback()
+                except Exception:
+                    broken = True
+            if broken:
+                self._discard(raw)
+            else:
+                with self._lock:
+                    self._idle.append((raw, created_at, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close all idle connections (checked-out ones close when released)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def _is_usable(self, raw, created_at, last_used):
+        now = time.monotonic()
+        if now - created_at > POOL_MAX_AGE:
+            return False
+        if USE_PG and raw.closed:
+            return False
+        if now - last_used > POOL_PING_AFTER:
+            try:
+                cur = raw.cursor()
+                cur.execute("SELECT 1")
+                cur.fetchone()
+                cur.close()
+                raw.rollback()
+            except Exception:
+                logger.info("Discarding stale pooled DB connection")
+                return False
+        return True
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Connections inherited from a pre-fork parent. Kept referenced so garbage
+# collection never closes them (closing would terminate the parent's session).
+_inherited_pools = []
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def close_pool():
+    """Close idle pooled connections. Call before forking workers (gunicorn --preload)."""
+    if _pool is not None:
+        _pool.close()
+
+
+def _reset_pool_after_fork():
+    """Give each forked worker its own pool and locks."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
 
 class DB:
     """Thin wrapper that normalizes SQLite and PostgreSQL access.
     All queries use %%s placeholders — converted to ? for SQLite automatically.
+    When pooled, close() returns the connection to the pool instead of closing it.
     """
 
-    def __init__(self):
-        if USE_PG:
-            import psycopg2
-            import psycopg2.extras
-            self.conn = psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.RealDictCursor)
-            self._pg = True
-        else:
-            self.conn = sqlite3.connect(DB_PATH)
-            self.conn.row_factory = sqlite3.Row
-            self.conn.execute("PRAGMA journal_mode=WAL")
-            self.conn.execute("PRAGMA foreign_keys=ON")
-            self._pg = False
+    def __init__(self, conn=None, pool=None, created_at=None):
+        self.conn = conn if conn is not None else _connect()
+        self._pg = USE_PG
+        self._pool = pool
+        self._created_at = created_at
+        self._closed = False
+        self._borrowers = 0
 
     def execute(self, sql, params=None):
         if not self._pg:
@@ -56,17 +218,95 @@ class DB:
     def commit(self):
         self.conn.commit()
 
+    def rollback(self):
+        self.conn.rollback()
+
     def close(self):
-        self.conn.close()
+        if self._closed:
+            return
+        self._closed = True
+        if self._pool is not None:
+            self._pool.release(self.conn, self._created_at)
+        else:
+            self.conn.close()
 
     @property
     def is_pg(self):
         return self._pg
 
 
+class _BorrowedDB(DB):
+    """Handle onto the request's shared connection.
+    close() leaves the connection checked out; once the last open handle
+    closes, uncommitted work is rolled back (as closing a private connection would).
+    """
+
+    def __init__(self, owner):
+        super().__init__(owner.conn)
+        self._owner = owner
+        owner._borrowers += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._owner._borrowers -= 1
+        if self._owner._borrowers == 0:
+            try:
+                self.conn.rollback()
+            except Exception:
+                logger.warning("Rollback failed on request-scoped DB connection")
+
+
+# --- Flask request scope ---
+_REQUEST_SCOPE = False
+
+
+def init_request_scope(app):
+    """Share one checked-out connection across all helpers called during a request."""
+    global _REQUEST_SCOPE
+    _REQUEST_SCOPE = True
+    app.teardown_appcontext(_release_request_conn)
+
+
+def _release_request_conn(exc=None):
+    from flask import g
+    owner = g.pop("_etsai_db", None)
+    if owner is not None:
+        owner.close()
+
+
+def release_request_conn():
+    """Hand the request's shared connection back to the pool before slow work
+    (AI calls, scraping, streamed responses) so it isn't held idle meanwhile.
+    Later get_conn() calls in the request check out a fresh one. A no-op while
+    a helper still has a handle open, or outside a request."""
+    if not _REQUEST_SCOPE:
+        return
+    from flask import g, has_request_context
+    if has_request_context():
+        owner = g.get("_etsai_db")
+        if owner is not None and owner._borrowers == 0:
+            _release_request_conn()
+
+
 def get_conn():
-    """Get a DB connection wrapper. Caller must call .close() when done."""
-    return DB()
+    """Get a DB connection wrapper. Caller must call .close() when done.
+    Inside a Flask request (after init_request_scope), all callers share one pooled connection.
+    """
+    if _REQUEST_SCOPE:
+        from flask import g, has_request_context
+        if has_request_context():
+            owner = g.get("_etsai_db")
+            if owner is None:
+                pool = _get_pool()
+                raw, created_at = pool.checkout()
+                owner = DB(raw, pool=pool, created_at=created_at)
+                g._etsai_db = owner
+            return _BorrowedDB(owner)
+    pool = _get_pool()
+    raw, created_at = pool.checkout()
+    return DB(raw, pool=pool, created_at=created_at)
 
 
 # --- SQL dialect helpers ---
@@ -101,6 +341,16 @@ def init_db():
             _init_pg(conn)
         else:
             _init_sqlite(conn)
+        # Backfill counters for sellers created before seller_counters existed
+        missing = conn.execute("""
+            SELECT COUNT(*) as c FROM sellers s
+            WHERE NOT EXISTS (SELECT 1 FROM seller_counters sc WHERE sc.seller_id = s.id)
+        """).fetchone()["c"]
+        if missing:
+            _reconcile_counters(conn)
+        _hash_legacy_api_keys(conn)
+        # Snapshot orders created before product_snapshots existed
+        _attach_snapshots(conn)
         conn.commit()
     finally:
         conn.close()
@@ -117,6 +367,7 @@ def _init_sqlite(conn):
             shop_name TEXT NOT NULL,
             platform TEXT DEFAULT 'etsy',
             api_key TEXT,
+            api_key_hash TEXT,
             webhook_secret TEXT,
             sale_message_template TEXT,
             settings TEXT DEFAULT '{}',
@@ -184,6 +435,7 @@ def _init_sqlite(conn):
             seller_order_notes TEXT,
             escalated INTEGER DEFAULT 0,
             fulfillment_status TEXT DEFAULT 'pending',
+            product_snapshot_id TEXT,
             FOREIGN KEY (seller_id) REFERENCES sellers(id),
             FOREIGN KEY (product_id) REFERENCES products(id)
         )
@@ -212,10 +464,70 @@ def _init_sqlite(conn):
             output_tokens INTEGER,
             cost REAL,
             task TEXT,
+            cache_read_tokens INTEGER DEFAULT 0,
+            cache_write_tokens INTEGER DEFAULT 0,
+            route TEXT,
+            saved_cost REAL DEFAULT 0,
+            task_kind TEXT,
+            latency_ms INTEGER DEFAULT 0,
+            retries INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS product_snapshots (
+            id TEXT PRIMARY KEY,
+            seller_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            product_title TEXT NOT NULL,
+            intake_questions TEXT NOT NULL,
+            image_url TEXT,
+            product_description TEXT,
+            seller_notes TEXT,
+            shop_name TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
 
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS question_cache (
+            cache_key TEXT PRIMARY KEY,
+            questions TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            seller_id TEXT NOT NULL,
+            status TEXT DEFAULT 'running',
+            total INTEGER DEFAULT 0,
+            processed INTEGER DEFAULT 0,
+            imported TEXT DEFAULT '[]',
+            errors TEXT DEFAULT '[]',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS seller_counters (
+            seller_id TEXT PRIMARY KEY,
+            total_orders INTEGER DEFAULT 0,
+            complete_orders INTEGER DEFAULT 0,
+            awaiting_orders INTEGER DEFAULT 0,
+            monthly_orders INTEGER DEFAULT 0,
+            month_key TEXT,
+            product_count INTEGER DEFAULT 0,
+            message_count INTEGER DEFAULT 0,
+            reconciled_at TIMESTAMP
+        )
+    """)
+
     # Legacy migration support: add columns that may not exist yet
     # (for databases created before all columns were in CREATE TABLE)
     migrations = [
@@ -248,6 +560,15 @@ def _init_sqlite(conn):
         ("sellers", "referral_code", "TEXT"),
         ("sellers", "referred_by", "TEXT"),
         ("sellers", "onboard_email_stage", "INTEGER DEFAULT 0"),
+        ("ai_usage", "cache_read_tokens", "INTEGER DEFAULT 0"),
+        ("ai_usage", "cache_write_tokens", "INTEGER DEFAULT 0"),
+        ("sellers", "api_key_hash", "TEXT"),
+        ("orders", "product_snapshot_id", "TEXT"),
+        ("ai_usage", "route", "TEXT"),
+        ("ai_usage", "saved_cost", "REAL DEFAULT 0"),
+        ("ai_usage", "task_kind", "TEXT"),
+        ("ai_usage", "latency_ms", "INTEGER DEFAULT 0"),
+        ("ai_usage", "retries", "INTEGER DEFAULT 0"),
     ]
     for table, column, col_type in migrations:
         try:
@@ -269,6 +590,7 @@ def _init_pg(conn):
             shop_name TEXT NOT NULL,
             platform TEXT DEFAULT 'etsy',
             api_key TEXT,
+            api_key_hash TEXT,
             webhook_secret TEXT,
             sale_message_template TEXT,
             settings TEXT DEFAULT '{}',
@@ -334,7 +656,8 @@ def _init_pg(conn):
             completed_at TIMESTAMP,
             seller_order_notes TEXT,
             escalated INTEGER DEFAULT 0,
-            fulfillment_status TEXT DEFAULT 'pending'
+            fulfillment_status TEXT DEFAULT 'pending',
+            product_snapshot_id TEXT
         )
     """)
 
@@ -360,10 +683,70 @@ def _init_pg(conn):
             output_tokens INTEGER,
             cost REAL,
             task TEXT,
+            cache_read_tokens INTEGER DEFAULT 0,
+            cache_write_tokens INTEGER DEFAULT 0,
+            route TEXT,
+            saved_cost REAL DEFAULT 0,
+            task_kind TEXT,
+            latency_ms INTEGER DEFAULT 0,
+            retries INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS product_snapshots (
+            id TEXT PRIMARY KEY,
+            seller_id TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            product_title TEXT NOT NULL,
+            intake_questions TEXT NOT NULL,
+            image_url TEXT,
+            product_description TEXT,
+            seller_notes TEXT,
+            shop_name TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
 
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS question_cache (
+            cache_key TEXT PRIMARY KEY,
+            questions TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            seller_id TEXT NOT NULL,
+            status TEXT DEFAULT 'running',
+            total INTEGER DEFAULT 0,
+            processed INTEGER DEFAULT 0,
+            imported TEXT DEFAULT '[]',
+            errors TEXT DEFAULT '[]',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS seller_counters (
+            seller_id TEXT PRIMARY KEY,
+            total_orders INTEGER DEFAULT 0,
+            complete_orders INTEGER DEFAULT 0,
+            awaiting_orders INTEGER DEFAULT 0,
+            monthly_orders INTEGER DEFAULT 0,
+            month_key TEXT,
+            product_count INTEGER DEFAULT 0,
+            message_count INTEGER DEFAULT 0,
+            reconciled_at TIMESTAMP
+        )
+    """)
+
     # Postgres migrations use ADD COLUMN IF NOT EXISTS (9.6+)
     pg_migrations = [
         ("products", "description", "TEXT"),
@@ -395,6 +778,15 @@ def _init_pg(conn):
         ("sellers", "referral_code", "TEXT"),
         ("sellers", "referred_by", "TEXT"),
         ("sellers", "onboard_email_stage", "INTEGER DEFAULT 0"),
+        ("ai_usage", "cache_read_tokens", "INTEGER DEFAULT 0"),
+        ("ai_usage", "cache_write_tokens", "INTEGER DEFAULT 0"),
+        ("sellers", "api_key_hash", "TEXT"),
+        ("orders", "product_snapshot_id", "TEXT"),
+        ("ai_usage", "route", "TEXT"),
+        ("ai_usage", "saved_cost", "REAL DEFAULT 0"),
+        ("ai_usage", "task_kind", "TEXT"),
+        ("ai_usage", "latency_ms", "INTEGER DEFAULT 0"),
+        ("ai_usage", "retries", "INTEGER DEFAULT 0"),
     ]
     for table, column, col_type in pg_migrations:
         c.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {col_type}")
@@ -407,13 +799,36 @@ def _create_indexes(conn):
     indexes = [
         "CREATE INDEX IF NOT EXISTS idx_products_seller_id ON products(seller_id)",
         "CREATE INDEX IF NOT EXISTS idx_orders_seller_id ON orders(seller_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_seller_created ON orders(seller_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_seller_status_created ON orders(seller_id, status, created_at, id)",
         "CREATE INDEX IF NOT EXISTS idx_orders_external_order_id ON orders(external_order_id)",
         "CREATE INDEX IF NOT EXISTS idx_messages_order_id ON messages(order_id)",
         "CREATE INDEX IF NOT EXISTS idx_products_external_id ON products(seller_id, external_id)",
         "CREATE UNIQUE INDEX IF NOT EXISTS idx_sellers_referral_code ON sellers(referral_code)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_sellers_api_key_hash ON sellers(api_key_hash)",
+        "CREATE INDEX IF NOT EXISTS idx_question_cache_last_used ON question_cache(last_used_at)",
+        "CREATE INDEX IF NOT EXISTS idx_import_jobs_seller_id ON import_jobs(seller_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ai_usage_created ON ai_usage(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_ai_usage_seller_created ON ai_usage(seller_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_product_snapshots_seller_id ON product_snapshots(seller_id)",
     ]
     for idx_sql in indexes:
         conn.execute(idx_sql)
+    _create_order_dedup_index(conn)
+
+
+def _create_order_dedup_index(conn):
+    """One order per (seller, Etsy receipt, product), so a scheduled sync and a manual
+    check racing on the same receipts can't both create it. Left out, with a warning,
+    while older duplicates remain (remove them, then restart to add the index)."""
+    conn.execute("SAVEPOINT order_dedup_index")
+    try:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_seller_external "
+                     "ON orders(seller_id, external_order_id, product_id)")
+    except Exception as e:
+        conn.execute("ROLLBACK TO SAVEPOINT order_dedup_index")
+        logger.warning("Duplicate Etsy orders found; unique index not created: %s", e)
+    conn.execute("RELEASE SAVEPOINT order_dedup_index")
 
 
 # =============================================================
@@ -422,26 +837,60 @@ def _create_indexes(conn):
 
 def create_seller(email, shop_name, platform="etsy", password_hash=None):
     seller_id = str(uuid.uuid4())[:8]
-    api_key = secrets.token_urlsafe(32)
     conn = get_conn()
     try:
         conn.execute(
-            "INSERT INTO sellers (id, email, shop_name, platform, api_key, password_hash) VALUES (%s, %s, %s, %s, %s, %s)",
-            (seller_id, email, shop_name, platform, api_key, password_hash)
+            "INSERT INTO sellers (id, email, shop_name, platform, api_key_hash, password_hash) VALUES (%s, %s, %s, %s, %s, %s)",
+            (seller_id, email, shop_name, platform, _hash_api_key(secrets.token_urlsafe(32)), password_hash)
         )
+        conn.execute(f"INSERT INTO seller_counters (seller_id, month_key) "
+                     f"VALUES (%s, {_month_key_expr()})", (seller_id,))
         conn.commit()
         return seller_id
     finally:
         conn.close()
 
 
+_seller_cache = {}
+_seller_cache_lock = threading.Lock()
+_seller_cache_gen = 0
+
+
+def _invalidate_seller(seller_id):
+    """Drop a seller from the in-process cache. Call after committing any sellers write."""
+    global _seller_cache_gen
+    with _seller_cache_lock:
+        _seller_cache.pop(str(seller_id), None)
+        _seller_cache_gen += 1
+
+
 def get_seller(seller_id):
+    """Fetch a seller row, served from a short-TTL in-process cache.
+    Other workers may see a write up to SELLER_CACHE_TTL seconds late."""
+    seller_id = str(seller_id)
+    now = time.monotonic()
+    with _seller_cache_lock:
+        hit = _seller_cache.get(seller_id)
+        gen = _seller_cache_gen
+    if hit and hit[0] > now:
+        return dict(hit[1])
+
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM sellers WHERE id = %s", (str(seller_id),)).fetchone()
-        return dict(row) if row else None
+        row = conn.execute("SELECT * FROM sellers WHERE id = %s", (seller_id,)).fetchone()
     finally:
         conn.close()
+    if not row:
+        return None
+    seller = dict(row)
+    if SELLER_CACHE_TTL > 0:
+        with _seller_cache_lock:
+            # Skip the store if a writer invalidated while we were reading
+            if gen == _seller_cache_gen:
+                if len(_seller_cache) >= SELLER_CACHE_MAX_ENTRIES:
+                    _seller_cache.clear()
+                _seller_cache[seller_id] = (now + SELLER_CACHE_TTL, seller)
+    return dict(seller)
 
 
 def get_seller_by_email(email):
@@ -459,17 +908,92 @@ def set_seller_password(seller_id, password_hash):
         conn.execute("UPDATE sellers SET password_hash = %s WHERE id = %s",
                       (password_hash, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
 
+# --- API keys ---
+# Only a SHA-256 of each key is stored. Keys are 256-bit random tokens, so a
+# fast unsalted hash is enough and keeps the lookup a unique-index probe.
+
+_api_key_cache = OrderedDict()
+_api_key_cache_lock = threading.Lock()
+
+
+def _hash_api_key(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _hash_legacy_api_keys(conn):
+    """Move plaintext keys from before api_key_hash existed into hashed form."""
+    rows = conn.execute(
+        "SELECT id, api_key FROM sellers WHERE api_key IS NOT NULL AND api_key_hash IS NULL"
+    ).fetchall()
+    for r in rows:
+        conn.execute("UPDATE sellers SET api_key_hash = %s, api_key = NULL WHERE id = %s",
+                     (_hash_api_key(r["api_key"]), r["id"]))
+
+
+def _invalidate_api_keys(seller_id):
+    """Forget every cached key that resolved to this seller."""
+    with _api_key_cache_lock:
+        for key_hash in [h for h, (_, sid) in _api_key_cache.items() if sid == seller_id]:
+            del _api_key_cache[key_hash]
+
+
 def get_seller_by_api_key(api_key):
+    """Resolve an X-API-Key to its seller. Verified keys are kept in a small
+    in-process LRU (hash -> seller_id); the row itself comes from get_seller."""
+    key_hash = _hash_api_key(api_key)
+    now = time.monotonic()
+    with _api_key_cache_lock:
+        hit = _api_key_cache.get(key_hash)
+        if hit and hit[0] > now:
+            _api_key_cache.move_to_end(key_hash)
+            seller_id = hit[1]
+        else:
+            seller_id = None
+
+    if seller_id is None:
+        conn = get_conn()
+        try:
+            row = conn.execute("SELECT id FROM sellers WHERE api_key_hash = %s",
+                               (key_hash,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        seller_id = row["id"]
+        if API_KEY_CACHE_TTL > 0:
+            with _api_key_cache_lock:
+                _api_key_cache[key_hash] = (now + API_KEY_CACHE_TTL, seller_id)
+                _api_key_cache.move_to_end(key_hash)
+                while len(_api_key_cache) > API_KEY_CACHE_MAX_ENTRIES:
+                    _api_key_cache.popitem(last=False)
+
+    seller = get_seller(seller_id)
+    # The key may have been rotated by another worker since it was cached
+    if seller and seller.get("api_key_hash") != key_hash:
+        _invalidate_api_keys(seller_id)
+        return None
+    return seller
+
+
+def rotate_api_key(seller_id):
+    """Issue a new API key, revoking the old one. Returns the plaintext key
+    (the only time it is available)."""
+    api_key = secrets.token_urlsafe(32)
     conn = get_conn()
     try:
-        row = conn.execute("SELECT * FROM sellers WHERE api_key = %s", (api_key,)).fetchone()
-        return dict(row) if row else None
+        conn.execute("UPDATE sellers SET api_key_hash = %s, api_key = NULL WHERE id = %s",
+                     (_hash_api_key(api_key), seller_id))
+        conn.commit()
+        _invalidate_seller(seller_id)
+        _invalidate_api_keys(seller_id)
     finally:
         conn.close()
+    return api_key
 
 
 # =============================================================
@@ -488,12 +1012,41 @@ def add_product(seller_id, title, intake_questions, category=None, price=None,
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (product_id, seller_id, external_id, title, category, price, image_url,
               json.dumps(intake_questions), description, seller_notes, source_url))
+        _bump_counters(conn, seller_id, products=1)
         conn.commit()
         return product_id
     finally:
         conn.close()
 
 
+def add_products(seller_id, products):
+    """Insert many products with one multi-row INSERT. Each item takes add_product's
+    keyword arguments (title and intake_questions required). Returns the new ids in order.
+    """
+    if not products:
+        return []
+    ids, params = [], []
+    for p in products:
+        product_id = str(uuid.uuid4())[:8]
+        ids.append(product_id)
+        params.extend((product_id, seller_id, p.get("external_id"), p["title"], p.get("category"),
+                       p.get("price"), p.get("image_url"), json.dumps(p["intake_questions"]),
+                       p.get("description"), p.get("seller_notes"), p.get("source_url")))
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(products))
+    conn = get_conn()
+    try:
+        conn.execute(f"""
+            INSERT INTO products (id, seller_id, external_id, title, category, price,
+                                  image_url, intake_questions, description, seller_notes, source_url)
+            VALUES {values}
+        """, tuple(params))
+        _bump_counters(conn, seller_id, products=len(ids))
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
+
+
 def get_product(product_id):
     conn = get_conn()
     try:
@@ -510,20 +1063,104 @@ def get_product(product_id):
 def get_seller_products(seller_id):
     conn = get_conn()
     try:
-        rows = conn.execute(
-            "SELECT * FROM products WHERE seller_id = %s AND active = 1 ORDER BY created_at DESC",
-            (seller_id,)
-        ).fetchall()
-        products = []
-        for r in rows:
-            p = dict(r)
-            p["intake_questions"] = json.loads(p["intake_questions"])
-            products.append(p)
-        return products
+        return _fetch_seller_products(conn, seller_id)
     finally:
         conn.close()
 
 
+def _fetch_seller_products(conn, seller_id):
+    rows = conn.execute(
+        "SELECT * FROM products WHERE seller_id = %s AND active = 1 ORDER BY created_at DESC",
+        (seller_id,)
+    ).fetchall()
+    products = []
+    for r in rows:
+        p = dict(r)
+        p["intake_questions"] = json.loads(p["intake_questions"])
+        products.append(p)
+    return products
+
+
+# =============================================================
+# PRODUCT SNAPSHOTS (immutable per-order copy of product + shop fields)
+# =============================================================
+# Orders point at the snapshot taken when they were created, so product edits
+# and question regeneration only affect new orders. Ids are content hashes:
+# an unchanged product reuses one row, and a given id always holds the same
+# questions, which is what lets _parsed_questions cache by id.
+# Seller notes are not frozen: they guide the AI, and editing them should reach
+# conversations already in progress, so orders read them live from products
+# (product_snapshots.seller_notes is a legacy column, left NULL).
+
+SNAPSHOT_FIELDS = ("product_title", "intake_questions", "image_url",
+                   "product_description", "shop_name")
+_SNAPSHOT_COLUMNS = ", ".join(f"ps.{f}" for f in SNAPSHOT_FIELDS) + ", lp.seller_notes"
+# Join for the live product fields in _SNAPSHOT_COLUMNS
+_LIVE_PRODUCT_JOIN = "LEFT JOIN products lp ON lp.id = o.product_id"
+PARSED_QUESTIONS_CACHE_SIZE = 512
+
+_parsed_questions_cache = OrderedDict()
+_parsed_questions_lock = threading.Lock()
+
+
+def _write_product_snapshots(conn, product_ids):
+    """Snapshot the current state of each product. Returns {product_id: snapshot_id}."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    rows = conn.execute(f"""
+        SELECT p.id, p.seller_id, p.title as product_title, p.intake_questions, p.image_url,
+               p.description as product_description, s.shop_name
+        FROM products p JOIN sellers s ON p.seller_id = s.id
+        WHERE p.id IN ({placeholders})
+    """, tuple(product_ids)).fetchall()
+    snapshots = {}
+    for r in rows:
+        fields = [r[f] for f in SNAPSHOT_FIELDS]
+        digest = hashlib.sha256(json.dumps([r["id"]] + fields).encode()).hexdigest()[:32]
+        conn.execute(f"""
+            INSERT INTO product_snapshots (id, seller_id, product_id, {", ".join(SNAPSHOT_FIELDS)})
+            VALUES (%s, %s, %s, {", ".join(["%s"] * len(fields))})
+            ON CONFLICT (id) DO NOTHING
+        """, (digest, r["seller_id"], r["id"], *fields))
+        snapshots[r["id"]] = digest
+    return snapshots
+
+
+def _attach_snapshots(conn, product_id=None):
+    """Point orders without a snapshot at one of their product's current state."""
+    if product_id is None:
+        rows = conn.execute(
+            "SELECT DISTINCT product_id FROM orders WHERE product_snapshot_id IS NULL"
+        ).fetchall()
+        product_ids = [r["product_id"] for r in rows]
+    else:
+        product_ids = [product_id]
+    for pid, snapshot_id in _write_product_snapshots(conn, product_ids).items():
+        conn.execute(
+            "UPDATE orders SET product_snapshot_id = %s WHERE product_id = %s AND product_snapshot_id IS NULL",
+            (snapshot_id, pid))
+
+
+def _parsed_questions(snapshot_id, raw):
+    """json.loads(intake_questions), cached by snapshot id (ids never change content).
+    Returns fresh dicts so callers can't alter the cached copy."""
+    if snapshot_id is None:
+        return json.loads(raw)
+    with _parsed_questions_lock:
+        questions = _parsed_questions_cache.get(snapshot_id)
+        if questions is not None:
+            _parsed_questions_cache.move_to_end(snapshot_id)
+    if questions is None:
+        questions = json.loads(raw)
+        with _parsed_questions_lock:
+            _parsed_questions_cache[snapshot_id] = questions
+            while len(_parsed_questions_cache) > PARSED_QUESTIONS_CACHE_SIZE:
+                _parsed_questions_cache.popitem(last=False)
+    return [dict(q) for q in questions]
+
+
 # =============================================================
 # ORDER CRUD
 # =============================================================
@@ -534,83 +1171,218 @@ def create_order(seller_id, product_id, buyer_name=None, buyer_email=None,
     intake_url = f"/intake/{order_id}"
     conn = get_conn()
     try:
+        snapshot_id = _write_product_snapshots(conn, [product_id]).get(product_id)
         conn.execute("""
             INSERT INTO orders (id, seller_id, product_id, external_order_id,
-                                buyer_name, buyer_email, buyer_identifier, intake_url)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                                buyer_name, buyer_email, buyer_identifier, intake_url,
+                                product_snapshot_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, (order_id, seller_id, product_id, external_order_id,
-              buyer_name, buyer_email, buyer_identifier, intake_url))
+              buyer_name, buyer_email, buyer_identifier, intake_url, snapshot_id))
+        _bump_counters(conn, seller_id, orders=1, awaiting=1)
         conn.commit()
         return order_id
     finally:
         conn.close()
 
 
+def create_orders(seller_id, orders):
+    """Insert many orders with one multi-row INSERT. Each item takes create_order's
+    keyword arguments (product_id required). Orders whose (external_order_id, product)
+    already exist are skipped; returns the ids actually created, in order.
+    """
+    if not orders:
+        return []
+    conn = get_conn()
+    try:
+        snapshots = _write_product_snapshots(conn, {o["product_id"] for o in orders})
+        ids, params = [], []
+        for o in orders:
+            order_id = str(uuid.uuid4())[:8]
+            ids.append(order_id)
+            params.extend((order_id, seller_id, o["product_id"], o.get("external_order_id"),
+                           o.get("buyer_name"), o.get("buyer_email"), o.get("buyer_identifier"),
+                           f"/intake/{order_id}", snapshots.get(o["product_id"])))
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(orders))
+        cur = conn.execute(f"""
+            INSERT INTO orders (id, seller_id, product_id, external_order_id,
+                                buyer_name, buyer_email, buyer_identifier, intake_url,
+                                product_snapshot_id)
+            VALUES {values}
+            ON CONFLICT DO NOTHING
+        """, tuple(params))
+        if cur.rowcount != len(ids):
+            # Another sync created some of these first
+            placeholders = ", ".join(["%s"] * len(ids))
+            rows = conn.execute(f"SELECT id FROM orders WHERE id IN ({placeholders})",
+                                tuple(ids)).fetchall()
+            inserted = {r["id"] for r in rows}
+            ids = [i for i in ids if i in inserted]
+        if ids:
+            _bump_counters(conn, seller_id, orders=len(ids), awaiting=len(ids))
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
+
+
 def get_order(order_id):
+    """Order plus the product/shop fields frozen in its snapshot, and the product's
+    live seller notes (PK joins)."""
     conn = get_conn()
     try:
-        row = conn.execute("""
-            SELECT o.*, p.title as product_title, p.intake_questions, p.image_url,
-                   p.description as product_description, p.seller_notes,
-                   s.shop_name, s.email as seller_email
-            FROM orders o
-            JOIN products p ON o.product_id = p.id
-            JOIN sellers s ON o.seller_id = s.id
-            WHERE o.id = %s
-        """, (order_id,)).fetchone()
-        if row:
-            o = dict(row)
-            o["customer_specs"] = json.loads(o["customer_specs"])
-            o["intake_questions"] = json.loads(o["intake_questions"])
-            return o
-        return None
+        row = _fetch_order_row(conn, order_id)
+        if not row:
+            return None
+        o = dict(row)
+        o["customer_specs"] = json.loads(o["customer_specs"])
+        o["intake_questions"] = _parsed_questions(o["product_snapshot_id"], o["intake_questions"])
+        return o
     finally:
         conn.close()
 
 
+def _fetch_order_row(conn, order_id):
+    sql = f"""
+        SELECT o.*, {_SNAPSHOT_COLUMNS}
+        FROM orders o
+        LEFT JOIN product_snapshots ps ON ps.id = o.product_snapshot_id
+        {_LIVE_PRODUCT_JOIN}
+        WHERE o.id = %s
+    """
+    row = conn.execute(sql, (order_id,)).fetchone()
+    if row and row["product_snapshot_id"] is None:
+        # Written without a snapshot (e.g. by an older worker mid-deploy)
+        _attach_snapshots(conn, product_id=row["product_id"])
+        conn.commit()
+        row = conn.execute(sql, (order_id,)).fetchone()
+        if row["product_snapshot_id"] is None:
+            return None  # product no longer exists
+    return row
+
+
 def get_seller_orders(seller_id, status=None):
     conn = get_conn()
     try:
-        if status:
-            rows = conn.execute("""
-                SELECT o.*, p.title as product_title
-                FROM orders o JOIN products p ON o.product_id = p.id
-                WHERE o.seller_id = %s AND o.status = %s
-                ORDER BY o.created_at DESC
-            """, (seller_id, status)).fetchall()
-        else:
-            rows = conn.execute("""
-                SELECT o.*, p.title as product_title
-                FROM orders o JOIN products p ON o.product_id = p.id
-                WHERE o.seller_id = %s
-                ORDER BY o.created_at DESC
-            """, (seller_id,)).fetchall()
-        results = []
-        for r in rows:
-            d = dict(r)
-            d["customer_specs"] = json.loads(d["customer_specs"])
-            results.append(d)
-        return results
+        return _fetch_seller_orders(conn, seller_id, status)
+    finally:
+        conn.close()
+
+
+def _fetch_seller_orders(conn, seller_id, status=None):
+    if status:
+        rows = conn.execute("""
+            SELECT o.*, p.title as product_title
+            FROM orders o JOIN products p ON o.product_id = p.id
+            WHERE o.seller_id = %s AND o.status = %s
+            ORDER BY o.created_at DESC
+        """, (seller_id, status)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT o.*, p.title as product_title
+            FROM orders o JOIN products p ON o.product_id = p.id
+            WHERE o.seller_id = %s
+            ORDER BY o.created_at DESC
+        """, (seller_id,)).fetchall()
+    results = []
+    for r in rows:
+        d = dict(r)
+        d["customer_specs"] = json.loads(d["customer_specs"])
+        results.append(d)
+    return results
+
+
+ORDERS_PAGE_SIZE = 25
+ORDERS_MAX_PAGE_SIZE = 100
+
+
+def get_seller_orders_page(seller_id, status=None, cursor=None, limit=ORDERS_PAGE_SIZE):
+    """
+    Keyset-paginated orders, newest first, ordered by (created_at, id).
+    Returns (orders, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    conn = get_conn()
+    try:
+        return _fetch_seller_orders_page(conn, seller_id, status, cursor, limit)
     finally:
         conn.close()
 
 
+def _fetch_seller_orders_page(conn, seller_id, status=None, cursor=None, limit=ORDERS_PAGE_SIZE):
+    limit = max(1, min(int(limit), ORDERS_MAX_PAGE_SIZE))
+    where = ["o.seller_id = %s"]
+    params = [seller_id]
+    if status:
+        where.append("o.status = %s")
+        params.append(status)
+    if cursor:
+        created_at, order_id = _decode_order_cursor(cursor)
+        where.append("(o.created_at < %s OR (o.created_at = %s AND o.id < %s))")
+        params.extend([created_at, created_at, order_id])
+
+    rows = conn.execute(f"""
+        SELECT o.*, p.title as product_title
+        FROM orders o JOIN products p ON o.product_id = p.id
+        WHERE {' AND '.join(where)}
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT %s
+    """, (*params, limit + 1)).fetchall()
+
+    orders = []
+    for r in rows[:limit]:
+        d = dict(r)
+        d["customer_specs"] = json.loads(d["customer_specs"])
+        orders.append(d)
+    next_cursor = None
+    if len(rows) > limit:
+        last = orders[-1]
+        next_cursor = _encode_order_cursor(last["created_at"], last["id"])
+    return orders, next_cursor
+
+
+def _encode_order_cursor(created_at, order_id):
+    raw = json.dumps([str(created_at), order_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_order_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, order_id = json.loads(raw)
+        return str(created_at), str(order_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
 def update_order_specs(order_id, specs, complete=False):
     conn = get_conn()
     try:
-        now = datetime.now().isoformat()
-        status = "complete" if complete else "collecting"
-        completed_at = now if complete else None
-        conn.execute("""
-            UPDATE orders SET customer_specs = %s, specs_complete = %s, status = %s,
-                              updated_at = %s, completed_at = %s
-            WHERE id = %s
-        """, (json.dumps(specs), 1 if complete else 0, status, now, completed_at, order_id))
+        _write_order_specs(conn, order_id, specs, complete)
         conn.commit()
     finally:
         conn.close()
 
 
+def _write_order_specs(conn, order_id, specs, complete):
+    now = datetime.now().isoformat()
+    status = "complete" if complete else "collecting"
+    completed_at = now if complete else None
+    old = conn.execute("SELECT seller_id, specs_complete, status FROM orders WHERE id = %s",
+                       (order_id,)).fetchone()
+    conn.execute("""
+        UPDATE orders SET customer_specs = %s, specs_complete = %s, status = %s,
+                          updated_at = %s, completed_at = %s
+        WHERE id = %s
+    """, (json.dumps(specs), 1 if complete else 0, status, now, completed_at, order_id))
+    if old:
+        was_complete = 1 if old["specs_complete"] else 0
+        was_awaiting = 1 if not old["specs_complete"] and old["status"] != "complete" else 0
+        now_complete = 1 if complete else 0
+        _bump_counters(conn, old["seller_id"], complete=now_complete - was_complete,
+                       awaiting=(1 - now_complete) - was_awaiting)
+
+
 # =============================================================
 # MESSAGE CRUD
 # =============================================================
@@ -618,21 +1390,31 @@ def update_order_specs(order_id, specs, complete=False):
 def add_message(order_id, direction, content, sender=None, specs_extracted=None, ai_generated=False):
     conn = get_conn()
     try:
-        conn.execute("""
-            INSERT INTO messages (order_id, direction, sender, content, specs_extracted, ai_generated)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (order_id, direction, sender or ("bot" if direction == "outbound" else "buyer"),
-              content, json.dumps(specs_extracted or {}), 1 if ai_generated else 0))
+        _insert_message(conn, order_id, direction, content, sender, specs_extracted, ai_generated)
         conn.commit()
     finally:
         conn.close()
 
 
+def _insert_message(conn, order_id, direction, content, sender=None, specs_extracted=None,
+                    ai_generated=False, seller_id=None):
+    conn.execute("""
+        INSERT INTO messages (order_id, direction, sender, content, specs_extracted, ai_generated)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (order_id, direction, sender or ("bot" if direction == "outbound" else "buyer"),
+          content, json.dumps(specs_extracted or {}), 1 if ai_generated else 0))
+    if seller_id is None:
+        row = conn.execute("SELECT seller_id FROM orders WHERE id = %s", (order_id,)).fetchone()
+        seller_id = row["seller_id"] if row else None
+    if seller_id:
+        _bump_counters(conn, seller_id, messages=1)
+
+
 def get_messages(order_id):
     conn = get_conn()
     try:
         rows = conn.execute(
-            "SELECT * FROM messages WHERE order_id = %s ORDER BY created_at ASC",
+            "SELECT * FROM messages WHERE order_id = %s ORDER BY created_at ASC, id ASC",
             (order_id,)
         ).fetchall()
         return [dict(r) for r in rows]
@@ -641,60 +1423,541 @@ def get_messages(order_id):
 
 
 # =============================================================
-# AI COST TRACKING
+# IMPORT JOBS (background shop imports)
 # =============================================================
 
-def log_ai_cost(seller_id, model, input_tokens, output_tokens, cost, task=""):
+# Running jobs not updated for this long are reported as failed (worker restarted)
+IMPORT_JOB_STALE_AFTER = "10 minutes"
+
+
+def create_import_job(seller_id, total):
+    job_id = str(uuid.uuid4())[:8]
     conn = get_conn()
     try:
-        conn.execute("""
-            INSERT INTO ai_usage (seller_id, model, input_tokens, output_tokens, cost, task)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (seller_id, model, input_tokens, output_tokens, cost, task))
+        conn.execute(
+            "INSERT INTO import_jobs (id, seller_id, total) VALUES (%s, %s, %s)",
+            (job_id, seller_id, total)
+        )
         conn.commit()
+        return job_id
     finally:
         conn.close()
 
 
-def get_seller_stats(seller_id):
+def update_import_job(job_id, processed, imported, errors, status=None):
+    """Record progress. imported/errors are the full lists so far."""
+    conn = get_conn()
+    try:
+        conn.execute(f"""
+            UPDATE import_jobs
+            SET processed = %s, imported = %s, errors = %s,
+                status = COALESCE(%s, status), updated_at = {_now_expr()}
+            WHERE id = %s
+        """, (processed, json.dumps(imported), json.dumps(errors), status, job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_import_job(job_id, seller_id):
+    """Fetch a seller's import job with parsed lists, or None."""
+    conn = get_conn()
+    try:
+        row = conn.execute(f"""
+            SELECT *, CASE WHEN status = 'running' AND updated_at < {_ago(IMPORT_JOB_STALE_AFTER)}
+                           THEN 1 ELSE 0 END as stale
+            FROM import_jobs WHERE id = %s AND seller_id = %s
+        """, (job_id, seller_id)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["imported"] = json.loads(job["imported"] or "[]")
+        job["errors"] = json.loads(job["errors"] or "[]")
+        if job.pop("stale"):
+            job["status"] = "failed"
+        return job
+    finally:
+        conn.close()
+
+
+# =============================================================
+# QUESTION CACHE
+# =============================================================
+
+def get_cached_questions(cache_key):
+    """Return cached intake questions for a product-context key, or None.
+    Entries older than QUESTION_CACHE_TTL_DAYS are misses. A hit bumps last_used_at (LRU).
+    """
+    conn = get_conn()
+    try:
+        row = conn.execute(f"""
+            SELECT questions FROM question_cache
+            WHERE cache_key = %s AND created_at > {_ago(f'{QUESTION_CACHE_TTL_DAYS} days')}
+        """, (cache_key,)).fetchone()
+        if not row:
+            return None
+        conn.execute(f"""
+            UPDATE question_cache SET hits = hits + 1, last_used_at = {_now_expr()}
+            WHERE cache_key = %s
+        """, (cache_key,))
+        conn.commit()
+        return json.loads(row["questions"])
+    finally:
+        conn.close()
+
+
+def store_cached_questions(cache_key, questions):
+    """Upsert a cache entry. Every QUESTION_CACHE_PRUNE_EVERY writes (per process)
+    the cache is pruned; see prune_question_cache."""
+    global _question_cache_writes
+    conn = get_conn()
+    try:
+        conn.execute(f"""
+            INSERT INTO question_cache (cache_key, questions, hits, created_at, last_used_at)
+            VALUES (%s, %s, 0, {_now_expr()}, {_now_expr()})
+            ON CONFLICT (cache_key) DO UPDATE SET
+                questions = excluded.questions, hits = 0,
+                created_at = excluded.created_at, last_used_at = excluded.last_used_at
+        """, (cache_key, json.dumps(questions)))
+        conn.commit()
+    finally:
+        conn.close()
+    with _question_cache_lock:
+        _question_cache_writes += 1
+        due = _question_cache_writes >= QUESTION_CACHE_PRUNE_EVERY
+        if due:
+            _question_cache_writes = 0
+    if due:
+        prune_question_cache()
+
+
+_question_cache_writes = 0
+_question_cache_lock = threading.Lock()
+
+
+def prune_question_cache():
+    """Drop expired entries, then evict least-recently-used rows beyond
+    QUESTION_CACHE_MAX_ENTRIES (only when the table is over the limit).
+    Returns the number of rows removed."""
+    conn = get_conn()
+    try:
+        removed = conn.execute(
+            f"DELETE FROM question_cache WHERE created_at < {_ago(f'{QUESTION_CACHE_TTL_DAYS} days')}"
+        ).rowcount
+        count = conn.execute("SELECT COUNT(*) AS n FROM question_cache").fetchone()["n"]
+        if count > QUESTION_CACHE_MAX_ENTRIES:
+            removed += conn.execute("""
+                DELETE FROM question_cache WHERE cache_key NOT IN (
+                    SELECT cache_key FROM question_cache ORDER BY last_used_at DESC LIMIT %s
+                )
+            """, (QUESTION_CACHE_MAX_ENTRIES,)).rowcount
+        conn.commit()
+        return removed
+    finally:
+        conn.close()
+
+
+# =============================================================
+# WRITE-BEHIND QUEUE (bookkeeping rows off the request path)
+# =============================================================
+# Cost and agent-log rows are buffered per process and appended in multi-row
+# INSERTs by a background thread, and flushed at interpreter exit (gunicorn
+# workers leave through sys.exit, so graceful shutdown runs atexit).
+# Conversation messages and specs never go through here: save_conversation_turn
+# and add_message still commit them before the buyer gets a reply.
+
+# Rows per INSERT; keeps bound parameters under SQLite's 999 limit
+_WRITE_BEHIND_ROWS_PER_INSERT = 50
+# Longest pause between background retries while the database is failing
+_WRITE_BEHIND_MAX_BACKOFF = 60.0
+# created_at placeholder: timestamptz -> TIMESTAMP assignment uses the session time zone
+_WRITE_BEHIND_TIMESTAMP = "CAST(%s AS TIMESTAMPTZ)" if USE_PG else "%s"
+
+
+class WriteBehindQueue:
+    """Per-process buffer of rows to append, grouped by (table, columns)."""
+
+    def __init__(self, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_seconds=WRITE_BEHIND_FLUSH_SECONDS, max_pending=WRITE_BEHIND_MAX_PENDING):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._rows = {}  # (table, columns) -> [values]
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def put(self, table, columns, values):
+        with self._cond:
+            if not self._closed:
+                self._rows.setdefault((table, columns), []).append(values)
+                self._pending += 1
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="etsai-write-behind",
+                                                    daemon=True)
+                    self._thread.start()
+                if self._pending >= self.batch_size:
+                    self._cond.notify()
+                return
+        _write_rows({(table, columns): [values]})  # after shutdown: write inline
+
+    def flush(self):
+        """Write everything buffered so far. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._cond:
+                batches, self._rows, self._pending = self._rows, {}, 0
+            if not batches:
+                return 0
+            try:
+                _write_rows(batches)
+            except Exception:
+                self._requeue(batches)
+                with self._cond:
+                    self._failures += 1
+                    delay = min(self.flush_seconds * 2 ** self._failures, _WRITE_BEHIND_MAX_BACKOFF)
+                    self._retry_at = time.monotonic() + delay
+                logger.exception("Write-behind flush failed; retrying in %.0fs", delay)
+                return 0
+            with self._cond:
+                self._failures = 0
+            return sum(len(rows) for rows in batches.values())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # After a failed flush, back off instead of retrying a full queue at once
+                while not self._closed and self._failures:
+                    delay = self._retry_at - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if self._pending < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_seconds)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _requeue(self, batches):
+        with self._cond:
+            for key, rows in batches.items():
+                self._rows[key] = rows + self._rows.get(key, [])
+            self._pending = sum(len(rows) for rows in self._rows.values())
+            overflow = self._pending - self.max_pending
+            for key, rows in self._rows.items():
+                if overflow <= 0:
+                    break
+                dropped = min(overflow, len(rows))
+                del rows[:dropped]
+                overflow -= dropped
+                self._pending -= dropped
+                logger.error("Write-behind queue full: dropped %d %s rows", dropped, key[0])
+
+
+def _write_rows(batches):
+    """Append {(table, columns): [values]} in one transaction on a private pooled
+    connection, so a flush never commits a request's in-flight work."""
+    pool = _get_pool()
+    raw, created_at = pool.checkout()
+    conn = DB(raw, pool=pool, created_at=created_at)
+    try:
+        for (table, columns), rows in batches.items():
+            row_sql = "(" + ", ".join(_WRITE_BEHIND_TIMESTAMP if c == "created_at" else "%s"
+                                      for c in columns) + ")"
+            for start in range(0, len(rows), _WRITE_BEHIND_ROWS_PER_INSERT):
+                chunk = rows[start:start + _WRITE_BEHIND_ROWS_PER_INSERT]
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                    + ", ".join([row_sql] * len(chunk)),
+                    tuple(v for row in chunk for v in row))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_write_behind = WriteBehindQueue()
+
+
+def write_behind(table, columns, values):
+    """Queue one row for a batched INSERT. `columns` is a tuple of column names.
+    Only for append-only bookkeeping rows that tolerate a few seconds of delay."""
+    if not WRITE_BEHIND_ENABLED:
+        _write_rows({(table, columns): [values]})
+        return
+    _write_behind.put(table, columns, values)
+
+
+def flush_write_behind():
+    """Write this process's queued rows now. Readers of queued tables call this
+    first so they see their own process's writes."""
+    return _write_behind.flush()
+
+
+def _utc_timestamp():
+    """created_at for queued rows, so they keep the time of the event rather than
+    of the flush. SQLite's CURRENT_TIMESTAMP is UTC text in this format; on Postgres
+    the explicit offset is converted to the session time zone on insert, matching
+    CURRENT_TIMESTAMP/NOW() whatever the server's TimeZone setting."""
+    stamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return stamp + "+00:00" if USE_PG else stamp
+
+
+def _close_write_behind():
+    _write_behind.close()
+
+
+def _reset_write_behind_after_fork():
+    """Forked workers start with an empty queue; the parent still owns its rows."""
+    global _write_behind
+    _write_behind = WriteBehindQueue()
+
+
+atexit.register(_close_write_behind)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_write_behind_after_fork)
+
+
+# =============================================================
+# AI COST TRACKING
+# =============================================================
+
+def log_ai_usage(seller_id, usage, task="", route=None, saved_cost=0.0):
+    """Record one AI call (queued; see write_behind). `usage` is an ai_engine
+    usage record (model, token counts, cost, latency_ms, retries). route is set
+    for intake turns: "sonnet", or "local"/"local_haiku" when the local pre-pass
+    answered; saved_cost is the estimated Sonnet cost avoided."""
+    write_behind("ai_usage", _AI_USAGE_COLUMNS, (
+        seller_id, usage["model"], usage.get("input_tokens", 0), usage.get("output_tokens", 0),
+        usage.get("cost", 0.0), task, usage.get("cache_read_tokens", 0),
+        usage.get("cache_write_tokens", 0), route, saved_cost, _task_kind(task),
+        usage.get("latency_ms", 0), usage.get("retries", 0), _utc_timestamp()))
+
+
+_AI_USAGE_COLUMNS = ("seller_id", "model", "input_tokens", "output_tokens", "cost", "task",
+                     "cache_read_tokens", "cache_write_tokens", "route", "saved_cost",
+                     "task_kind", "latency_ms", "retries", "created_at")
+
+
+# "Greeting for order ab12" / "Generate questions via API for: Mug (cache hit)"
+# roll up as "Greeting" / "Generate questions"
+_TASK_KIND_RE = re.compile(r"\s+(?:for\b|via\b|\().*$|:.*$", re.S)
+
+
+def _task_kind(task):
+    return _TASK_KIND_RE.sub("", task or "").strip() or "other"
+
+
+def get_ai_usage_rollup(by="task", days=30, seller_id=None, limit=20):
+    """Spend and latency grouped by task kind (by="task") or seller (by="seller"),
+    most expensive first. p95_ms is nearest-rank over calls that hit the API.
+    """
+    column = {"task": "task_kind", "seller": "seller_id"}.get(by)
+    if column is None:
+        raise ValueError(f"Unknown rollup: {by}")
+    flush_write_behind()
+    params = []
+    seller_filter = ""
+    if seller_id:
+        seller_filter = "AND seller_id = %s"
+        params.append(seller_id)
+    params.append(int(limit))
+
+    conn = get_conn()
+    try:
+        rows = conn.execute(f"""
+            WITH scoped AS (
+                SELECT COALESCE({column}, '') as grp, input_tokens, output_tokens,
+                       cache_read_tokens, cost, latency_ms, retries
+                FROM ai_usage
+                WHERE created_at > {_ago(f'{int(days)} days')} {seller_filter}
+            ),
+            ranked AS (
+                SELECT grp, latency_ms,
+                       ROW_NUMBER() OVER (PARTITION BY grp ORDER BY latency_ms) as rn,
+                       COUNT(*) OVER (PARTITION BY grp) as n
+                FROM scoped WHERE latency_ms > 0
+            ),
+            p95 AS (
+                SELECT grp, MIN(latency_ms) as p95_ms
+                FROM ranked WHERE rn * 100 >= n * 95
+                GROUP BY grp
+            )
+            SELECT s.grp, COUNT(*) as calls,
+                   COALESCE(SUM(s.input_tokens), 0) as input_tokens,
+                   COALESCE(SUM(s.output_tokens), 0) as output_tokens,
+                   COALESCE(SUM(s.cache_read_tokens), 0) as cache_read_tokens,
+                   COALESCE(SUM(s.cost), 0) as cost,
+                   COALESCE(SUM(s.retries), 0) as retries,
+                   AVG(CASE WHEN s.latency_ms > 0 THEN s.latency_ms END) as avg_ms,
+                   MAX(p.p95_ms) as p95_ms
+            FROM scoped s LEFT JOIN p95 p ON p.grp = s.grp
+            GROUP BY s.grp
+            ORDER BY cost DESC
+            LIMIT %s
+        """, tuple(params)).fetchall()
+        return [{
+            by: r["grp"] or None,
+            "calls": r["calls"],
+            "input_tokens": int(r["input_tokens"]),
+            "output_tokens": int(r["output_tokens"]),
+            "cache_read_tokens": int(r["cache_read_tokens"]),
+            "cost": float(r["cost"]),
+            "retries": int(r["retries"]),
+            "avg_ms": int(r["avg_ms"]) if r["avg_ms"] is not None else None,
+            "p95_ms": r["p95_ms"],
+        } for r in rows]
+    finally:
+        conn.close()
+
+
+def get_local_extraction_stats(days=30):
+    """Share of intake turns answered by the local pre-pass, and estimated savings."""
+    flush_write_behind()
     conn = get_conn()
     try:
-        total = conn.execute("SELECT COUNT(*) as c FROM orders WHERE seller_id = %s", (seller_id,)).fetchone()["c"]
-        complete = conn.execute("SELECT COUNT(*) as c FROM orders WHERE seller_id = %s AND specs_complete = 1", (seller_id,)).fetchone()["c"]
-        awaiting_buyer = conn.execute("SELECT COUNT(*) as c FROM orders WHERE seller_id = %s AND specs_complete = 0 AND status != 'complete'", (seller_id,)).fetchone()["c"]
+        row = conn.execute(f"""
+            SELECT COUNT(*) as turns,
+                   COALESCE(SUM(CASE WHEN route IN ('local', 'local_haiku') THEN 1 ELSE 0 END), 0) as local_turns,
+                   COALESCE(SUM(saved_cost), 0) as saved
+            FROM ai_usage
+            WHERE route IS NOT NULL AND created_at > {_ago(f'{int(days)} days')}
+        """).fetchone()
+        turns = row["turns"]
         return {
-            "total_orders": total,
-            "complete": complete,
-            "awaiting_buyer": awaiting_buyer,
+            "turns": turns,
+            "local_turns": int(row["local_turns"]),
+            "hit_rate": int(row["local_turns"]) / turns if turns else 0.0,
+            "saved_cost": float(row["saved"]),
         }
     finally:
         conn.close()
 
 
+# =============================================================
+# CONVERSATION TURN (intake chat hot path)
+# =============================================================
+
+def get_conversation_turn(order_id):
+    """Load everything one intake turn needs in a single query.
+    Returns the get_order() fields plus seller plan/settings/branding and the
+    ordered message history under "messages", or None if the order doesn't exist.
+    """
+    conn = get_conn()
+    try:
+        # Product fields come from the order's snapshot; seller notes, settings, plan,
+        # branding and notification email stay live
+        sql = f"""
+            SELECT o.*, {_SNAPSHOT_COLUMNS},
+                   s.email as seller_email, s.plan as seller_plan,
+                   s.settings as seller_settings, s.brand_color, s.brand_logo_url,
+                   m.id as msg_id, m.direction as msg_direction, m.sender as msg_sender,
+                   m.content as msg_content, m.created_at as msg_created_at
+            FROM orders o
+            LEFT JOIN product_snapshots ps ON ps.id = o.product_snapshot_id
+            {_LIVE_PRODUCT_JOIN}
+            JOIN sellers s ON o.seller_id = s.id
+            LEFT JOIN messages m ON m.order_id = o.id
+            WHERE o.id = %s
+            ORDER BY m.created_at ASC, m.id ASC
+        """
+        rows = conn.execute(sql, (order_id,)).fetchall()
+        if not rows:
+            return None
+        if rows[0]["product_snapshot_id"] is None:
+            _attach_snapshots(conn, product_id=rows[0]["product_id"])
+            conn.commit()
+            rows = conn.execute(sql, (order_id,)).fetchall()
+            if rows[0]["product_snapshot_id"] is None:
+                return None
+
+        turn = {k: v for k, v in dict(rows[0]).items() if not k.startswith("msg_")}
+        turn["customer_specs"] = json.loads(turn["customer_specs"])
+        turn["intake_questions"] = _parsed_questions(turn["product_snapshot_id"],
+                                                     turn["intake_questions"])
+        try:
+            turn["seller_settings"] = json.loads(turn["seller_settings"] or "{}")
+        except (json.JSONDecodeError, TypeError):
+            turn["seller_settings"] = {}
+        turn["messages"] = [
+            {"id": r["msg_id"], "order_id": order_id, "direction": r["msg_direction"],
+             "sender": r["msg_sender"], "content": r["msg_content"],
+             "created_at": r["msg_created_at"]}
+            for r in rows if r["msg_id"] is not None
+        ]
+        return turn
+    finally:
+        conn.close()
+
+
+def save_conversation_turn(order_id, seller_id, buyer_message, bot_response,
+                           specs_extracted=None, updated_specs=None, complete=False,
+                           escalated=False, usage=None, task="", route=None, saved_cost=0.0):
+    """Persist one intake turn in a single transaction: buyer message, bot reply,
+    spec update (skipped when updated_specs is None) and escalation flag.
+    The turn's ai_usage row (from its usage record) is queued after the commit.
+    """
+    conn = get_conn()
+    try:
+        _insert_message(conn, order_id, "inbound", buyer_message, seller_id=seller_id)
+        if updated_specs is not None:
+            _write_order_specs(conn, order_id, updated_specs, complete)
+        if escalated:
+            conn.execute("UPDATE orders SET escalated = 1 WHERE id = %s", (order_id,))
+        _insert_message(conn, order_id, "outbound", bot_response,
+                        specs_extracted=specs_extracted, ai_generated=True, seller_id=seller_id)
+        conn.commit()
+    finally:
+        conn.close()
+    if usage:
+        log_ai_usage(seller_id, usage, task, route, saved_cost)
+
+
+def get_seller_stats(seller_id):
+    c = get_seller_counters(seller_id)
+    return {
+        "total_orders": c["total_orders"],
+        "complete": c["complete_orders"],
+        "awaiting_buyer": c["awaiting_orders"],
+    }
+
+
 def get_recent_activity(seller_id, limit=10):
     """Get recent activity feed for dashboard."""
     conn = get_conn()
     try:
-        rows = conn.execute("""
-            SELECT 'order_created' as type,
-                   'New order for ' || p.title || CASE WHEN o.buyer_name IS NOT NULL THEN ' from ' || o.buyer_name ELSE '' END as description,
-                   o.created_at as timestamp
-            FROM orders o JOIN products p ON o.product_id = p.id
-            WHERE o.seller_id = %s
-            UNION ALL
-            SELECT 'order_complete' as type,
-                   p.title || ' specs complete' || CASE WHEN o.buyer_name IS NOT NULL THEN ' (' || o.buyer_name || ')' ELSE '' END as description,
-                   o.completed_at as timestamp
-            FROM orders o JOIN products p ON o.product_id = p.id
-            WHERE o.seller_id = %s AND o.specs_complete = 1 AND o.completed_at IS NOT NULL
-            ORDER BY timestamp DESC
-            LIMIT %s
-        """, (seller_id, seller_id, limit)).fetchall()
-        return [dict(r) for r in rows]
+        return _fetch_recent_activity(conn, seller_id, limit)
     finally:
         conn.close()
 
 
+def _fetch_recent_activity(conn, seller_id, limit=10):
+    rows = conn.execute("""
+        SELECT 'order_created' as type,
+               'New order for ' || p.title || CASE WHEN o.buyer_name IS NOT NULL THEN ' from ' || o.buyer_name ELSE '' END as description,
+               o.created_at as timestamp
+        FROM orders o JOIN products p ON o.product_id = p.id
+        WHERE o.seller_id = %s
+        UNION ALL
+        SELECT 'order_complete' as type,
+               p.title || ' specs complete' || CASE WHEN o.buyer_name IS NOT NULL THEN ' (' || o.buyer_name || ')' ELSE '' END as description,
+               o.completed_at as timestamp
+        FROM orders o JOIN products p ON o.product_id = p.id
+        WHERE o.seller_id = %s AND o.specs_complete = 1 AND o.completed_at IS NOT NULL
+        ORDER BY timestamp DESC
+        LIMIT %s
+    """, (seller_id, seller_id, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
 # =============================================================
 # ETSY INTEGRATION
 # =============================================================
@@ -709,6 +1972,7 @@ def save_etsy_tokens(seller_id, access_token, refresh_token, expires_at):
             WHERE id = %s
         """, (access_token, refresh_token, expires_at, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -726,19 +1990,39 @@ def save_etsy_connection(seller_id, etsy_user_id, etsy_shop_id, access_token,
         """, (etsy_user_id, etsy_shop_id, access_token, refresh_token,
               expires_at, datetime.now().isoformat(), seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
+    finally:
+        conn.close()
+
+
+def clear_etsy_connection(seller_id):
+    """Clear Etsy tokens and shop link (disconnect)."""
+    conn = get_conn()
+    try:
+        conn.execute("""
+            UPDATE sellers SET etsy_user_id = NULL, etsy_shop_id = NULL,
+                               etsy_access_token = NULL, etsy_refresh_token = NULL,
+                               etsy_token_expires_at = NULL, etsy_connected_at = NULL,
+                               etsy_last_order_check = NULL
+            WHERE id = %s
+        """, (seller_id,))
+        conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
 
-def update_last_order_check(seller_id):
-    """Track when we last polled for new orders."""
+def update_last_order_check(seller_id, checked_at=None):
+    """Track when we last polled for new orders. Pass the time the poll started
+    so receipts created while it ran are picked up next time."""
     conn = get_conn()
     try:
         conn.execute(
             "UPDATE sellers SET etsy_last_order_check = %s WHERE id = %s",
-            (datetime.now().isoformat(), seller_id)
+            ((checked_at or datetime.now()).isoformat(), seller_id)
         )
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -760,6 +2044,29 @@ def get_product_by_external_id(seller_id, external_id):
         conn.close()
 
 
+def get_products_by_external_ids(seller_id, external_ids):
+    """Resolve many Etsy listing_ids at once. Returns {external_id: product}
+    for the active products found; missing ids are simply absent."""
+    ids = list({str(i) for i in external_ids})
+    if not ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(ids))
+    conn = get_conn()
+    try:
+        rows = conn.execute(f"""
+            SELECT * FROM products
+            WHERE seller_id = %s AND active = 1 AND external_id IN ({placeholders})
+        """, (seller_id, *ids)).fetchall()
+        products = {}
+        for r in rows:
+            p = dict(r)
+            p["intake_questions"] = json.loads(p["intake_questions"])
+            products[p["external_id"]] = p
+        return products
+    finally:
+        conn.close()
+
+
 def order_exists_by_external_id(seller_id, external_order_id):
     """Check if an order already exists (prevent duplicates)."""
     conn = get_conn()
@@ -773,6 +2080,38 @@ def order_exists_by_external_id(seller_id, external_order_id):
         conn.close()
 
 
+def get_existing_external_order_ids(seller_id, external_order_ids):
+    """Return the subset of external order ids that already have orders (one query)."""
+    ids = list({str(i) for i in external_order_ids})
+    if not ids:
+        return set()
+    placeholders = ", ".join(["%s"] * len(ids))
+    conn = get_conn()
+    try:
+        rows = conn.execute(f"""
+            SELECT DISTINCT external_order_id FROM orders
+            WHERE seller_id = %s AND external_order_id IN ({placeholders})
+        """, (seller_id, *ids)).fetchall()
+        return {r["external_order_id"] for r in rows}
+    finally:
+        conn.close()
+
+
+def get_etsy_connected_sellers():
+    """Sellers with a connected Etsy shop, for the background order sync."""
+    conn = get_conn()
+    try:
+        rows = conn.execute("""
+            SELECT * FROM sellers
+            WHERE etsy_access_token IS NOT NULL AND etsy_access_token != ''
+              AND etsy_shop_id IS NOT NULL
+            ORDER BY etsy_last_order_check ASC
+        """).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
 def update_product_notes(product_id, seller_notes):
     conn = get_conn()
     try:
@@ -818,24 +2157,28 @@ def update_fulfillment_status(order_id, status):
 def get_completed_orders_with_specs(seller_id, limit=20):
     conn = get_conn()
     try:
-        rows = conn.execute("""
-            SELECT o.*, p.title as product_title, p.intake_questions
-            FROM orders o JOIN products p ON o.product_id = p.id
-            WHERE o.seller_id = %s AND o.specs_complete = 1
-            ORDER BY o.completed_at DESC
-            LIMIT %s
-        """, (seller_id, limit)).fetchall()
-        results = []
-        for r in rows:
-            d = dict(r)
-            d["customer_specs"] = json.loads(d["customer_specs"])
-            d["intake_questions"] = json.loads(d["intake_questions"])
-            results.append(d)
-        return results
+        return _fetch_completed_orders(conn, seller_id, limit)
     finally:
         conn.close()
 
 
+def _fetch_completed_orders(conn, seller_id, limit=20):
+    rows = conn.execute("""
+        SELECT o.*, p.title as product_title, p.intake_questions
+        FROM orders o JOIN products p ON o.product_id = p.id
+        WHERE o.seller_id = %s AND o.specs_complete = 1
+        ORDER BY o.completed_at DESC
+        LIMIT %s
+    """, (seller_id, limit)).fetchall()
+    results = []
+    for r in rows:
+        d = dict(r)
+        d["customer_specs"] = json.loads(d["customer_specs"])
+        d["intake_questions"] = json.loads(d["intake_questions"])
+        results.append(d)
+    return results
+
+
 def get_stale_orders(seller_id):
     """Returns set of order IDs needing follow-up:
     - Created >24h ago with no buyer messages (never opened link)
@@ -843,28 +2186,51 @@ def get_stale_orders(seller_id):
     """
     conn = get_conn()
     try:
-        never_opened = conn.execute(f"""
-            SELECT o.id FROM orders o
-            WHERE o.seller_id = %s AND o.specs_complete = 0
-              AND o.created_at <= {_ago('1 day')}
-              AND NOT EXISTS (
-                  SELECT 1 FROM messages m WHERE m.order_id = o.id AND m.direction = 'inbound'
-              )
-        """, (seller_id,)).fetchall()
+        return _fetch_stale_order_ids(conn, seller_id)
+    finally:
+        conn.close()
 
-        stale_convos = conn.execute(f"""
-            SELECT o.id FROM orders o
-            WHERE o.seller_id = %s AND o.specs_complete = 0
-              AND EXISTS (
-                  SELECT 1 FROM messages m WHERE m.order_id = o.id AND m.direction = 'inbound'
-              )
-              AND (
-                  SELECT MAX(m.created_at) FROM messages m
-                  WHERE m.order_id = o.id AND m.direction = 'inbound'
-              ) <= {_ago('2 days')}
-        """, (seller_id,)).fetchall()
 
-        return set(r["id"] for r in never_opened) | set(r["id"] for r in stale_convos)
+def _fetch_stale_order_ids(conn, seller_id):
+    # One grouped pass: last inbound message per incomplete order
+    rows = conn.execute(f"""
+        SELECT o.id FROM orders o
+        LEFT JOIN messages m ON m.order_id = o.id AND m.direction = 'inbound'
+        WHERE o.seller_id = %s AND o.specs_complete = 0
+        GROUP BY o.id, o.created_at
+        HAVING (MAX(m.created_at) IS NULL AND o.created_at <= {_ago('1 day')})
+            OR MAX(m.created_at) <= {_ago('2 days')}
+    """, (seller_id,)).fetchall()
+    return set(r["id"] for r in rows)
+
+
+def get_dashboard_snapshot(seller_id, seller=None):
+    """Everything the dashboard renders, read over one connection.
+    Counts come from seller_counters (no scans over orders);
+    orders is the first keyset page, with orders_next_cursor for the rest.
+    Pass an already-loaded seller row to skip re-reading it.
+    Returns None if the seller doesn't exist.
+    """
+    conn = get_conn()
+    try:
+        if seller is None:
+            row = conn.execute("SELECT * FROM sellers WHERE id = %s", (str(seller_id),)).fetchone()
+            if not row:
+                return None
+            seller = dict(row)
+        products = _fetch_seller_products(conn, seller_id)
+        orders, next_cursor = _fetch_seller_orders_page(conn, seller_id)
+        return {
+            "seller": seller,
+            "products": products,
+            "product_count": len(products),
+            "orders": orders,
+            "orders_next_cursor": next_cursor,
+            "stats": _counter_stats(_fetch_seller_counters(conn, seller_id)),
+            "activity": _fetch_recent_activity(conn, seller_id),
+            "completed_orders": _fetch_completed_orders(conn, seller_id),
+            "stale_order_ids": _fetch_stale_order_ids(conn, seller_id),
+        }
     finally:
         conn.close()
 
@@ -883,6 +2249,7 @@ def update_seller_settings(seller_id, settings_dict):
         conn.execute("UPDATE sellers SET settings = %s WHERE id = %s",
                       (json.dumps(current), seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -896,12 +2263,17 @@ def update_seller_profile(seller_id, shop_name, email, display_name=None,
                         phone = %s, website = %s, timezone = %s WHERE id = %s""",
                       (shop_name, email, display_name, phone, website, timezone, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
 
 def delete_seller_account(seller_id):
-    """Cascade delete: messages -> orders -> products -> ai_usage -> seller."""
+    """Cascade delete: messages -> orders -> snapshots -> products -> ai_usage -> seller.
+    Cost rows still queued in other worker processes can land after this; they are
+    accepted as orphans (ai_usage has no foreign key; the spend was real and still
+    counts in admin totals) rather than checking the seller on every batched insert."""
+    flush_write_behind()  # this process's queued cost rows land before the delete
     conn = get_conn()
     try:
         conn.execute("""
@@ -910,10 +2282,15 @@ def delete_seller_account(seller_id):
             )
         """, (seller_id,))
         conn.execute("DELETE FROM orders WHERE seller_id = %s", (seller_id,))
+        conn.execute("DELETE FROM product_snapshots WHERE seller_id = %s", (seller_id,))
         conn.execute("DELETE FROM products WHERE seller_id = %s", (seller_id,))
         conn.execute("DELETE FROM ai_usage WHERE seller_id = %s", (seller_id,))
+        conn.execute("DELETE FROM import_jobs WHERE seller_id = %s", (seller_id,))
+        conn.execute("DELETE FROM seller_counters WHERE seller_id = %s", (seller_id,))
         conn.execute("DELETE FROM sellers WHERE id = %s", (seller_id,))
         conn.commit()
+        _invalidate_seller(seller_id)
+        _invalidate_api_keys(seller_id)
     finally:
         conn.close()
 
@@ -933,6 +2310,7 @@ def update_seller_plan(seller_id, plan, stripe_customer_id=None):
         else:
             conn.execute("UPDATE sellers SET plan = %s WHERE id = %s", (plan, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -944,32 +2322,169 @@ def set_trial_end(seller_id, trial_ends_at):
         conn.execute("UPDATE sellers SET trial_ends_at = %s WHERE id = %s",
                       (trial_ends_at, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
 
 def get_monthly_order_count(seller_id):
     """Count orders created this calendar month for quota enforcement."""
+    return get_seller_counters(seller_id)["monthly_orders"]
+
+
+def get_product_count(seller_id):
+    """Count active products for quota enforcement."""
+    return get_seller_counters(seller_id)["product_count"]
+
+
+# =============================================================
+# SELLER COUNTERS (O(1) stats + quota lookups)
+# =============================================================
+# Bumped in the same transaction as every order/product/message write;
+# reconcile_seller_counters() recomputes them from the base tables to repair drift.
+
+_COUNTER_FIELDS = ("total_orders", "complete_orders", "awaiting_orders", "monthly_orders",
+                   "product_count", "message_count")
+
+
+def _month_key_expr():
+    """SQL expression for the month the monthly_orders counter belongs to. Taken from
+    the database clock, like _month_start(), so both agree at a month boundary."""
+    if USE_PG:
+        return "to_char(NOW(), 'YYYY-MM')"
+    return "strftime('%Y-%m', 'now')"
+
+
+def _month_key(conn):
+    return conn.execute(f"SELECT {_month_key_expr()} AS month_key").fetchone()["month_key"]
+
+
+def _bump_counters(conn, seller_id, orders=0, complete=0, awaiting=0, products=0, messages=0):
+    """Apply deltas after a write, inside the caller's transaction. Orders also count
+    toward this month (the monthly counter restarts when the month rolls over)."""
+    month = _month_key_expr()
+    cur = conn.execute(f"""
+        UPDATE seller_counters SET
+            total_orders = total_orders + %s,
+            complete_orders = complete_orders + %s,
+            awaiting_orders = awaiting_orders + %s,
+            product_count = product_count + %s,
+            message_count = message_count + %s,
+            monthly_orders = CASE WHEN month_key = {month} THEN monthly_orders + %s ELSE %s END,
+            month_key = {month}
+        WHERE seller_id = %s
+    """, (orders, complete, awaiting, products, messages, orders, orders, seller_id))
+    if cur.rowcount == 0:
+        # No row yet: build it from the base tables (already includes this write)
+        _reconcile_counters(conn, seller_id)
+
+
+def _reconcile_counters(conn, seller_id=None):
+    """Recompute counters from orders/products/messages (one seller, or all)."""
+    scope = "WHERE seller_id = %s" if seller_id else ""
+    scope_params = (seller_id,) if seller_id else ()
+    params = (*scope_params, *scope_params, *scope_params)
+    conn.execute(f"""
+        INSERT INTO seller_counters (seller_id, total_orders, complete_orders, awaiting_orders,
+                                     monthly_orders, month_key, product_count, message_count,
+                                     reconciled_at)
+        SELECT s.id, COALESCE(o.total, 0), COALESCE(o.complete, 0), COALESCE(o.awaiting, 0),
+               COALESCE(o.monthly, 0), {_month_key_expr()}, COALESCE(p.c, 0), COALESCE(m.c, 0),
+               {_now_expr()}
+        FROM sellers s
+        LEFT JOIN (
+            SELECT seller_id, COUNT(*) as total,
+                   SUM(CASE WHEN specs_complete = 1 THEN 1 ELSE 0 END) as complete,
+                   SUM(CASE WHEN specs_complete = 0 AND status != 'complete' THEN 1 ELSE 0 END) as awaiting,
+                   SUM(CASE WHEN created_at >= {_month_start()} THEN 1 ELSE 0 END) as monthly
+            FROM orders {scope} GROUP BY seller_id
+        ) o ON o.seller_id = s.id
+        LEFT JOIN (
+            SELECT seller_id, COUNT(*) as c FROM products
+            {scope + " AND" if scope else "WHERE"} active = 1 GROUP BY seller_id
+        ) p ON p.seller_id = s.id
+        LEFT JOIN (
+            SELECT ord.seller_id, COUNT(*) as c
+            FROM messages msg JOIN orders ord ON msg.order_id = ord.id
+            {scope.replace("seller_id", "ord.seller_id")} GROUP BY ord.seller_id
+        ) m ON m.seller_id = s.id
+        WHERE {"s.id = %s" if seller_id else "1 = 1"}
+        ON CONFLICT (seller_id) DO UPDATE SET
+            total_orders = excluded.total_orders, complete_orders = excluded.complete_orders,
+            awaiting_orders = excluded.awaiting_orders, monthly_orders = excluded.monthly_orders,
+            month_key = excluded.month_key, product_count = excluded.product_count,
+            message_count = excluded.message_count, reconciled_at = excluded.reconciled_at
+    """, params + scope_params)
+
+
+def _fetch_seller_counters(conn, seller_id):
+    sql = (f"SELECT *, {_month_key_expr()} AS current_month FROM seller_counters "
+           "WHERE seller_id = %s")
+    row = conn.execute(sql, (seller_id,)).fetchone()
+    if not row:
+        _reconcile_counters(conn, seller_id)
+        conn.commit()
+        row = conn.execute(sql, (seller_id,)).fetchone()
+    c = {k: int(row[k] or 0) if row else 0 for k in _COUNTER_FIELDS}
+    if row and row["month_key"] != row["current_month"]:
+        c["monthly_orders"] = 0  # no orders yet this month
+    return c
+
+
+def _counter_stats(c):
+    """Counters in the dashboard's stats shape."""
+    return {
+        "total_orders": c["total_orders"],
+        "complete": c["complete_orders"],
+        "awaiting_buyer": c["awaiting_orders"],
+        "monthly_orders": c["monthly_orders"],
+    }
+
+
+def get_seller_counters(seller_id):
+    """O(1) counts for a seller: orders (total/complete/awaiting/this month), products, messages."""
     conn = get_conn()
     try:
-        row = conn.execute(f"""
-            SELECT COUNT(*) as c FROM orders
-            WHERE seller_id = %s
-              AND created_at >= {_month_start()}
-        """, (seller_id,)).fetchone()
-        return row["c"]
+        return _fetch_seller_counters(conn, seller_id)
     finally:
         conn.close()
 
 
-def get_product_count(seller_id):
-    """Count active products for quota enforcement."""
+def reconcile_seller_counters():
+    """Scheduled repair: recompute every seller's counters. Returns how many had drifted.
+    One seller per transaction. On Postgres the seller's counters row is locked
+    FOR UPDATE first: bumps update that row in the same transaction as their
+    order/product/message write, so they wait for (or are seen by) the recompute
+    instead of being overwritten. SQLite serializes the recompute behind its single writer."""
     conn = get_conn()
     try:
-        row = conn.execute(
-            "SELECT COUNT(*) as c FROM products WHERE seller_id = %s AND active = 1",
-            (seller_id,)).fetchone()
-        return row["c"]
+        month = _month_key(conn)
+
+        def _values(row):
+            if not row:
+                return None
+            vals = {k: int(row[k] or 0) for k in _COUNTER_FIELDS}
+            if row["month_key"] != month:
+                vals["monthly_orders"] = 0  # month rolled over — not drift
+            return vals
+
+        lock = " FOR UPDATE" if USE_PG else ""
+        seller_ids = [r["id"] for r in conn.execute("SELECT id FROM sellers").fetchall()]
+        drifted = 0
+        for seller_id in seller_ids:
+            before = _values(conn.execute(
+                f"SELECT * FROM seller_counters WHERE seller_id = %s{lock}", (seller_id,)
+            ).fetchone())
+            _reconcile_counters(conn, seller_id)
+            after = _values(conn.execute(
+                "SELECT * FROM seller_counters WHERE seller_id = %s", (seller_id,)
+            ).fetchone())
+            conn.commit()
+            if before != after:
+                drifted += 1
+        if drifted:
+            logger.warning("Seller counters drifted for %d seller(s); repaired", drifted)
+        return {"sellers": len(seller_ids), "drifted": drifted}
     finally:
         conn.close()
 
@@ -994,6 +2509,7 @@ def update_seller_brand(seller_id, brand_color=None, brand_logo_url=None):
             "UPDATE sellers SET brand_color = %s, brand_logo_url = %s WHERE id = %s",
             (brand_color, brand_logo_url, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -1005,6 +2521,7 @@ def set_reset_token(seller_id, token, expires_at):
         conn.execute("UPDATE sellers SET password_reset_token = %s, password_reset_expires = %s WHERE id = %s",
                       (token, expires_at, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -1033,6 +2550,7 @@ def clear_reset_token(seller_id):
         conn.execute("UPDATE sellers SET password_reset_token = NULL, password_reset_expires = NULL WHERE id = %s",
                       (seller_id,))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -1061,17 +2579,20 @@ def get_admin_stats():
     """Get system-wide stats for admin panel."""
     conn = get_conn()
     try:
-        sellers = conn.execute("SELECT COUNT(*) as c FROM sellers").fetchone()["c"]
-        products = conn.execute("SELECT COUNT(*) as c FROM products WHERE active = 1").fetchone()["c"]
-        orders = conn.execute("SELECT COUNT(*) as c FROM orders").fetchone()["c"]
-        completed = conn.execute("SELECT COUNT(*) as c FROM orders WHERE specs_complete = 1").fetchone()["c"]
-        messages = conn.execute("SELECT COUNT(*) as c FROM messages").fetchone()["c"]
+        row = conn.execute("""
+            SELECT COUNT(*) as sellers,
+                   COALESCE(SUM(product_count), 0) as products,
+                   COALESCE(SUM(total_orders), 0) as orders,
+                   COALESCE(SUM(complete_orders), 0) as completed,
+                   COALESCE(SUM(message_count), 0) as messages
+            FROM seller_counters
+        """).fetchone()
         return {
-            "total_sellers": sellers,
-            "total_products": products,
-            "total_orders": orders,
-            "completed_orders": completed,
-            "total_messages": messages,
+            "total_sellers": row["sellers"],
+            "total_products": int(row["products"]),
+            "total_orders": int(row["orders"]),
+            "completed_orders": int(row["completed"]),
+            "total_messages": int(row["messages"]),
         }
     finally:
         conn.close()
@@ -1093,6 +2614,7 @@ def set_referral_code(seller_id, code):
         conn.execute("UPDATE sellers SET referral_code = %s WHERE id = %s",
                       (code, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
@@ -1115,6 +2637,7 @@ def record_referral(new_seller_id, referrer_seller_id):
         conn.execute("UPDATE sellers SET referred_by = %s WHERE id = %s",
                       (referrer_seller_id, new_seller_id))
         conn.commit()
+        _invalidate_seller(new_seller_id)
     finally:
         conn.close()
 
@@ -1185,6 +2708,7 @@ def apply_referral_reward(referrer_seller_id):
         conn.execute("UPDATE sellers SET settings = %s WHERE id = %s",
                       (json.dumps(current_settings), referrer_seller_id))
         conn.commit()
+        _invalidate_seller(referrer_seller_id)
     finally:
         conn.close()
 
@@ -1210,6 +2734,7 @@ def set_onboard_email_stage(seller_id, stage):
         conn.execute("UPDATE sellers SET onboard_email_stage = %s WHERE id = %s",
                       (stage, seller_id))
         conn.commit()
+        _invalidate_seller(seller_id)
     finally:
         conn.close()
 
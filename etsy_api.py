@@ -10,14 +10,27 @@ import secrets
 import time
 import requests
 from datetime import datetime, timedelta
+from itertools import islice
 from urllib.parse import urlencode
 
+from rate_limit import RateBudget
+
 ETSY_API_BASE = "https://openapi.etsy.com/v3"
 ETSY_AUTH_URL = "https://www.etsy.com/oauth/connect"
 ETSY_TOKEN_URL = "https://api.etsy.com/v3/public/oauth/token"
 
 REQUEST_TIMEOUT = 15
 
+# Results per page for paginated endpoints (Etsy caps limit at 100)
+ETSY_MAX_PAGE_SIZE = 100
+ETSY_PAGE_SIZE = min(int(os.environ.get("ETSY_PAGE_SIZE", "100")), ETSY_MAX_PAGE_SIZE)
+
+# Requests/second shared by every Etsy call in this process (Etsy allows 10 QPS per app)
+ETSY_RATE_PER_SEC = float(os.environ.get("ETSY_RATE_PER_SEC", "5"))
+
+
+_rate_budget = RateBudget(ETSY_RATE_PER_SEC)
+
 
 # === PKCE Helpers ===
 
@@ -144,6 +157,7 @@ def etsy_request(method, path, seller, params=None, _retried=False):
 
     url = f"{ETSY_API_BASE}{path}"
 
+    _rate_budget.acquire()
     if method.upper() == "GET":
         resp = requests.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
     else:
@@ -159,6 +173,7 @@ def etsy_request(method, path, seller, params=None, _retried=False):
             tokens["refresh_token"],
             tokens["expires_at"],
         )
+        _rate_budget.acquire()
         if method.upper() == "GET":
             resp = requests.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
         else:
@@ -200,70 +215,89 @@ def get_shop_for_user(seller):
     }
 
 
-def get_shop_listings(seller, limit=25):
-    """Fetch active listings from the seller's Etsy shop."""
+def _iter_pages(path, seller, params=None, page_size=ETSY_PAGE_SIZE):
+    """Yield raw results across pages using offset/limit. Pages are fetched lazily,
+    so a caller that stops iterating stops the API calls too."""
+    page_size = max(1, min(int(page_size), ETSY_MAX_PAGE_SIZE))
+    offset = 0
+    while True:
+        data = etsy_request("GET", path, seller,
+                            params={**(params or {}), "limit": page_size, "offset": offset})
+        results = data.get("results", [])
+        yield from results
+        offset += len(results)
+        if len(results) < page_size or offset >= data.get("count", offset + 1):
+            return
+
+
+def iter_shop_listings(seller, page_size=ETSY_PAGE_SIZE):
+    """Iterate every active listing in the seller's Etsy shop, page by page."""
     shop_id = seller.get("etsy_shop_id")
     if not shop_id:
         raise Exception("No Etsy shop connected")
 
-    data = etsy_request("GET", f"/application/shops/{shop_id}/listings/active", seller,
-                        params={"limit": limit, "includes": "Images"})
-
-    listings = []
-    for item in data.get("results", []):
+    for item in _iter_pages(f"/application/shops/{shop_id}/listings/active", seller,
+                            params={"includes": "Images"}, page_size=page_size):
         images = []
         if item.get("images"):
             images = [img.get("url_570xN", "") for img in item["images"][:3]]
 
-        listings.append({
+        yield {
             "listing_id": item.get("listing_id"),
             "title": item.get("title", ""),
             "description": item.get("description", ""),
             "price": float(item.get("price", {}).get("amount", 0)) / item.get("price", {}).get("divisor", 100) if item.get("price") else None,
             "image_url": images[0] if images else None,
             "url": item.get("url", ""),
-        })
+        }
 
-    return listings
 
+def get_shop_listings(seller, limit=None):
+    """Fetch active listings from the seller's Etsy shop (all of them unless `limit`)."""
+    return list(islice(iter_shop_listings(seller), limit))
 
-def get_recent_orders(seller, min_created=None):
+
+def iter_receipts(seller, min_created=None, page_size=ETSY_PAGE_SIZE):
     """
-    Poll for recent receipts (orders) from the seller's shop.
-    Returns list of receipt dicts with transaction info.
+    Iterate receipts (orders) newest first, page by page.
+    With `min_created` (ISO timestamp) iteration stops at the first older receipt.
     """
     shop_id = seller.get("etsy_shop_id")
     if not shop_id:
         raise Exception("No Etsy shop connected")
 
-    params = {"limit": 25, "sort_on": "created", "sort_order": "desc"}
+    params = {"sort_on": "created", "sort_order": "desc"}
 
     # Filter by timestamp if provided
+    min_ts = None
     if min_created:
         try:
-            ts = int(datetime.fromisoformat(min_created).timestamp())
-            params["min_created"] = ts
+            min_ts = int(datetime.fromisoformat(min_created).timestamp())
+            params["min_created"] = min_ts
         except (ValueError, TypeError):
             pass
 
-    data = etsy_request("GET", f"/application/shops/{shop_id}/receipts", seller, params=params)
-
-    orders = []
-    for receipt in data.get("results", []):
-        # Get buyer info from shipping address
-        buyer_name = ""
-        if receipt.get("name"):
-            buyer_name = receipt["name"]
+    for receipt in _iter_pages(f"/application/shops/{shop_id}/receipts", seller,
+                               params=params, page_size=page_size):
+        created = receipt.get("create_timestamp")
+        if min_ts and created and created < min_ts:
+            return  # past the watermark — everything after is older
 
-        orders.append({
+        yield {
             "receipt_id": receipt.get("receipt_id"),
-            "buyer_name": buyer_name,
+            "buyer_name": receipt.get("name") or "",
             "buyer_email": receipt.get("buyer_email", ""),
-            "created_timestamp": receipt.get("create_timestamp"),
+            "created_timestamp": created,
             "transactions": receipt.get("transactions", []),
-        })
+        }
 
-    return orders
+
+def get_recent_orders(seller, min_created=None):
+    """
+    Poll for recent receipts (orders) from the seller's shop.
+    Returns list of receipt dicts with transaction info.
+    """
+    return list(iter_receipts(seller, min_created=min_created))
 
 
 def get_receipt_transactions(seller, receipt_id):
@@ -0,0 +1,136 @@
+"""
+ETSAI Etsy Order Sync
+Incremental receipt polling for connected sellers. Used by the manual
+"Check orders" button and by the scheduled sync across all sellers.
+"""
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from etsy_api import iter_receipts, ETSY_PAGE_SIZE
+from billing import check_quota
+from database import (
+    create_orders, get_products_by_external_ids, get_monthly_order_count,
+    get_existing_external_order_ids, get_etsy_connected_sellers, update_last_order_check,
+)
+
+logger = logging.getLogger("etsai.etsy_sync")
+
+ETSY_SYNC_ENABLED = os.environ.get("ETSY_SYNC_ENABLED", "0") == "1"
+# Minutes between scheduled syncs of every connected seller
+ETSY_SYNC_INTERVAL_MINS = int(os.environ.get("ETSY_SYNC_INTERVAL_MINS", "5"))
+# Sellers polled concurrently (the Etsy request budget in etsy_api caps the total rate)
+ETSY_SYNC_WORKERS = int(os.environ.get("ETSY_SYNC_WORKERS", "4"))
+# First sync for a shop (no watermark yet) only looks back this far
+ETSY_SYNC_FIRST_LOOKBACK_DAYS = int(os.environ.get("ETSY_SYNC_FIRST_LOOKBACK_DAYS", "7"))
+
+# One sync per seller at a time in this process; the unique
+# (seller_id, external_order_id, product_id) index covers other processes
+_seller_locks = {}
+_seller_locks_lock = threading.Lock()
+
+
+def _seller_lock(seller_id):
+    with _seller_locks_lock:
+        return _seller_locks.setdefault(seller_id, threading.Lock())
+
+
+def sync_seller_orders(seller):
+    """
+    Pull receipts created since the seller's last check and create orders for new ones.
+    Returns {"created", "skipped", "no_product"}. Raises if the Etsy fetch fails.
+    """
+    with _seller_lock(seller["id"]):
+        return _sync_seller_orders(seller)
+
+
+def _sync_seller_orders(seller):
+    seller_id = seller["id"]
+    started_at = datetime.now()
+    watermark = seller.get("etsy_last_order_check") or (
+        started_at - timedelta(days=ETSY_SYNC_FIRST_LOOKBACK_DAYS)).isoformat()
+    receipts = iter_receipts(seller, min_created=watermark)
+
+    created = 0
+    skipped = 0
+    no_product = 0
+
+    # Check order quota
+    monthly_orders = get_monthly_order_count(seller_id)
+
+    # Receipts stream in page-sized batches. Per batch: one existence query,
+    # one product lookup and one multi-row order insert.
+    quota_reached = False
+    while not quota_reached:
+        batch = list(islice(receipts, ETSY_PAGE_SIZE))
+        if not batch:
+            break
+        existing = get_existing_external_order_ids(seller_id, [r["receipt_id"] for r in batch])
+        products = get_products_by_external_ids(
+            seller_id,
+            [txn.get("listing_id", "") for r in batch for txn in r.get("transactions", [])],
+        )
+
+        new_orders = []
+        for receipt in batch:
+            receipt_id = str(receipt["receipt_id"])
+
+            # Skip if order already exists
+            if receipt_id in existing:
+                skipped += 1
+                continue
+
+            # Match transactions to products
+            for txn in receipt.get("transactions", []):
+                product = products.get(str(txn.get("listing_id", "")))
+                if not product:
+                    no_product += 1
+                    continue
+
+                allowed, reason = check_quota(seller, monthly_orders + len(new_orders), 0)
+                if not allowed:
+                    logger.info("Order quota reached during Etsy order sync for seller %s", seller_id)
+                    quota_reached = True
+                    break
+
+                new_orders.append({
+                    "product_id": product["id"],
+                    "buyer_name": receipt.get("buyer_name") or None,
+                    "external_order_id": receipt_id,
+                })
+            if quota_reached:
+                break
+
+        new_ids = create_orders(seller_id, new_orders)
+        created += len(new_ids)
+        skipped += len(new_orders) - len(new_ids)
+        monthly_orders += len(new_ids)
+
+    update_last_order_check(seller_id, started_at)
+    return {"created": created, "skipped": skipped, "no_product": no_product}
+
+
+def sync_all_sellers():
+    """Scheduled job: sync every connected seller, a few at a time."""
+    sellers = get_etsy_connected_sellers()
+    if not sellers:
+        return {"sellers": 0, "created": 0, "failed": 0}
+
+    def _sync(seller):
+        try:
+            return sync_seller_orders(seller)
+        except Exception as e:
+            logger.error("Etsy order sync failed for seller %s: %s", seller["id"], e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=ETSY_SYNC_WORKERS) as pool:
+        results = list(pool.map(_sync, sellers))
+
+    return {
+        "sellers": len(sellers),
+        "created": sum(r["created"] for r in results if r),
+        "failed": sum(1 for r in results if r is None),
+    }
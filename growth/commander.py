@@ -22,7 +22,7 @@ from growth.growth_db import (
     get_agent_stats, get_last_agent_run, get_lead_funnel,
     get_active_campaigns, log_agent_action, get_agent_log,
     get_messages_sent_today, get_lead_count_today, get_videos_published_today,
-    upsert_learning, get_top_learnings, get_learnings, get_conn,
+    upsert_learning, get_top_learnings, get_learnings, get_conn, get_total_agent_spend,
 )
 from growth.growth_config import (
     DAILY_BUDGET, GROWTH_ENABLED,
@@ -48,7 +48,8 @@ BOOTSTRAP_INSTRUCTIONS = {
 
 def _collect_metrics():
     """Gather current metrics from all sources."""
-    overview = get_growth_overview()
+    # Fresh read: budget decisions and the saved daily spend can't use a cached snapshot
+    overview = get_growth_overview(max_age=0)
     funnel = get_lead_funnel()
 
     agent_stats = {}
@@ -97,16 +98,8 @@ def update_commander_learnings():
     finally:
         conn.close()
 
-    # Get total spend from agent logs
-    conn = get_conn()
-    try:
-        spend_row = conn.execute("""
-            SELECT COALESCE(SUM(cost), 0) as total_cost
-            FROM growth_agent_log
-        """).fetchone()
-        total_spend = spend_row["total_cost"] if spend_row else 0
-    finally:
-        conn.close()
+    # Total spend: daily rollups plus the raw agent log still in retention
+    total_spend = get_total_agent_spend()
 
     total_sent_all = sum(dict(r).get("sent", 0) + dict(r).get("replied", 0) for r in rows)
 
@@ -0,0 +1,166 @@
+"""
+ETSAI Growth Bot — Lead enrichment pipeline
+Finds contact emails and social links on Etsy shop About pages in three stages:
+bounded concurrent fetches (spaced per host), a regex parse of the raw HTML,
+and batched UPDATEs. Used by Scout for HOT/WARM leads.
+"""
+import html
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import HostRateLimiter
+from growth.growth_db import get_leads_for_enrichment, update_lead_contacts
+from growth.growth_config import ENRICH_FETCH_WORKERS, ENRICH_HOST_INTERVAL, ENRICH_WRITE_BATCH
+
+logger = logging.getLogger("etsai.growth.enrichment")
+
+REQUEST_TIMEOUT = 15
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html",
+}
+
+_EMAIL_RE = re.compile(r'[\w.\-+]+@[\w.\-]+\.\w{2,}')
+_SOCIAL_RE = re.compile(
+    r'href=["\'](https?://(?:www\.)?(?:instagram\.com/[\w.]+|facebook\.com/[\w.]+'
+    r'|twitter\.com/[\w.]+|tiktok\.com/@[\w.]+))',
+    re.IGNORECASE,
+)
+# Script and style bodies carry asset names and vendor DSNs that look like emails
+_NON_TEXT_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_ASSET_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".js", ".css")
+
+
+# --- Parse stage ---
+
+def parse_about_page(page, need_email=True, need_social=True):
+    """Pull the first shop email and social link out of raw About-page HTML."""
+    found = {}
+    if need_email:
+        text = _NON_TEXT_RE.sub(" ", page)
+        email = _first_email(text)
+        # Obfuscated addresses (&#64; etc.) only show up once entities are decoded
+        if not email and "&" in text:
+            email = _first_email(html.unescape(text))
+        if email:
+            found["email"] = email
+    if need_social:
+        match = _SOCIAL_RE.search(page)
+        if match:
+            found["social_url"] = match.group(1)
+    return found
+
+
+def _first_email(text):
+    for email in _EMAIL_RE.findall(text):
+        lower = email.lower()
+        if "etsy.com" not in lower and not lower.endswith(_ASSET_SUFFIXES):
+            return email
+    return None
+
+
+# --- Pipeline ---
+
+class EnrichmentPipeline:
+    """Fetches About pages on a bounded pool, parses them as they arrive,
+    and writes results in batches."""
+
+    def __init__(self, workers=ENRICH_FETCH_WORKERS, host_interval=ENRICH_HOST_INTERVAL,
+                 write_batch=ENRICH_WRITE_BATCH):
+        self.workers = max(workers, 1)
+        self.write_batch = max(write_batch, 1)
+        self._host_limiter = HostRateLimiter(host_interval)
+        self._session = requests.Session()
+        self._session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="lead-enrich")
+
+    def fetch_about(self, shop_name):
+        """GET the shop's About page. Returns the HTML, or None on a non-200."""
+        url = f"https://www.etsy.com/shop/{shop_name}/about"
+        self._host_limiter.wait(url)
+        resp = self._session.get(url, timeout=REQUEST_TIMEOUT)
+        if resp.status_code != 200:
+            logger.debug(f"Enrichment: {shop_name} About page returned {resp.status_code}")
+            return None
+        return resp.text
+
+    def run(self, lead_ids):
+        """Enrich the given leads. Returns ({lead_id: found dict}, stats dict).
+        Leads that already have both an email and a social link are returned as-is."""
+        started = time.monotonic()
+        results = {}
+        pending = {}
+        for lead in get_leads_for_enrichment(lead_ids):
+            if lead.get("email") and lead.get("social_url"):
+                results[lead["id"]] = {"email": lead["email"], "social_url": lead["social_url"]}
+            elif lead.get("shop_name"):
+                pending[lead["id"]] = lead
+
+        futures = {self._executor.submit(self.fetch_about, lead["shop_name"]): lead
+                   for lead in pending.values()}
+        fetched = enriched = 0
+        batch = {}
+        for future in as_completed(futures):
+            lead = futures[future]
+            try:
+                page = future.result()
+            except Exception as e:
+                logger.error(f"Enrichment error for {lead['shop_name']}: {e}")
+                continue
+            if page is None:
+                continue
+            fetched += 1
+            found = parse_about_page(page, need_email=not lead.get("email"),
+                                     need_social=not lead.get("social_url"))
+            results[lead["id"]] = found
+            if found:
+                batch[lead["id"]] = found
+                if len(batch) >= self.write_batch:
+                    enriched += update_lead_contacts(batch)
+                    batch = {}
+        if batch:
+            enriched += update_lead_contacts(batch)
+
+        elapsed = time.monotonic() - started
+        stats = {
+            "checked": len(pending),
+            "fetched": fetched,
+            "enriched": enriched,
+            "seconds": round(elapsed, 2),
+            "leads_per_min": round(len(pending) * 60 / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        if pending:
+            logger.info(f"Enrichment: {enriched}/{len(pending)} leads enriched "
+                        f"in {elapsed:.1f}s ({stats['leads_per_min']} leads/min)")
+        return results, stats
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_enrichment_pipeline():
+    """Process-wide pipeline, created lazily so it is never inherited across a fork."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = EnrichmentPipeline()
+    return _pipeline
+
+
+def enrich_leads(lead_ids):
+    """Run the shared pipeline over lead_ids. See EnrichmentPipeline.run."""
+    return get_enrichment_pipeline().run(lead_ids)
@@ -64,6 +64,14 @@ REDDIT_USERNAME = os.environ.get("REDDIT_USERNAME", "")
 REDDIT_PASSWORD = os.environ.get("REDDIT_PASSWORD", "")
 REDDIT_USER_AGENT = os.environ.get("REDDIT_USER_AGENT", "ETSAI-GrowthBot/1.0")
 
+# Shared JSON client (growth/reddit_client.py). The bucket is the ceiling;
+# Reddit's X-Ratelimit-* response headers pause it further when they say so.
+REDDIT_RATE_PER_MIN = float(os.environ.get("GROWTH_REDDIT_RATE_PER_MIN", "30"))
+REDDIT_BURST = int(os.environ.get("GROWTH_REDDIT_BURST", "8"))
+REDDIT_FETCH_WORKERS = int(os.environ.get("GROWTH_REDDIT_FETCH_WORKERS", "4"))
+# Seconds a "newest seen post" cursor is trusted before a full listing refetch
+REDDIT_CURSOR_TTL = int(os.environ.get("GROWTH_REDDIT_CURSOR_TTL", "21600"))
+
 REDDIT_TARGET_SUBREDDITS = [
     "Etsy", "EtsySellers", "smallbusiness", "Entrepreneur",
     "ecommerce", "craftit", "handmade",
@@ -80,6 +88,21 @@ REDDIT_KEYWORDS = [
     "customize", "specification", "questionnaire",
 ]
 
+# In-process LRU of thread IDs already marked seen (skips the DB for threads this
+# worker recently handled; exact, so an unseen thread is never skipped)
+SEEN_CACHE_ENABLED = os.environ.get("GROWTH_SEEN_CACHE", "1") == "1"
+SEEN_CACHE_SIZE = int(os.environ.get("GROWTH_SEEN_CACHE_SIZE", "20000"))
+
+# =============================================================
+# LEAD ENRICHMENT (Etsy About pages)
+# =============================================================
+
+ENRICH_FETCH_WORKERS = int(os.environ.get("GROWTH_ENRICH_FETCH_WORKERS", "4"))
+# Minimum seconds between requests to the same host (politeness budget)
+ENRICH_HOST_INTERVAL = float(os.environ.get("GROWTH_ENRICH_HOST_INTERVAL", "1.0"))
+# Enriched leads per batched UPDATE
+ENRICH_WRITE_BATCH = int(os.environ.get("GROWTH_ENRICH_WRITE_BATCH", "20"))
+
 # =============================================================
 # YOUTUBE API
 # =============================================================
@@ -115,6 +138,22 @@ SCHEDULE_LISTENER_MINS = int(os.environ.get("GROWTH_SCHED_LISTENER", "30"))
 SCHEDULE_CREATOR_MINS = int(os.environ.get("GROWTH_SCHED_CREATOR", "720"))
 SCHEDULE_WRITER_MINS = int(os.environ.get("GROWTH_SCHED_WRITER", "120"))
 
+# =============================================================
+# DASHBOARD
+# =============================================================
+
+# Seconds the growth overview snapshot is shared by the dashboard and commander
+OVERVIEW_CACHE_SECONDS = float(os.environ.get("GROWTH_OVERVIEW_CACHE_SECONDS", "30"))
+
+# =============================================================
+# RETENTION (scheduled; agent-log cost is kept as daily totals)
+# =============================================================
+
+SEEN_THREADS_RETENTION_DAYS = int(os.environ.get("GROWTH_SEEN_THREADS_RETENTION_DAYS", "7"))
+AGENT_LOG_RETENTION_DAYS = int(os.environ.get("GROWTH_AGENT_LOG_RETENTION_DAYS", "30"))
+RETENTION_BATCH_SIZE = int(os.environ.get("GROWTH_RETENTION_BATCH_SIZE", "500"))
+SCHEDULE_RETENTION_HOURS = int(os.environ.get("GROWTH_SCHED_RETENTION_HOURS", "6"))
+
 # =============================================================
 # SELF-LEARNING
 # =============================================================
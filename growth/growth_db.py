@@ -5,12 +5,19 @@ Six growth tables using the same DB wrapper from database.py.
 import json
 import uuid
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_conn, USE_PG, _ago, _now_expr
+from database import get_conn, USE_PG, _ago, _now_expr, write_behind, flush_write_behind, _utc_timestamp
+from growth.growth_config import (
+    OVERVIEW_CACHE_SECONDS, SEEN_CACHE_ENABLED, SEEN_CACHE_SIZE,
+    SEEN_THREADS_RETENTION_DAYS, AGENT_LOG_RETENTION_DAYS, RETENTION_BATCH_SIZE,
+)
 
 logger = logging.getLogger("etsai.growth_db")
 
@@ -175,6 +182,20 @@ def _init_growth_sqlite(conn):
         )
     """)
 
+    # growth_agent_log rows past retention, summed per day and agent
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS growth_agent_daily (
+            date TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            actions INTEGER DEFAULT 0,
+            successes INTEGER DEFAULT 0,
+            tokens_used INTEGER DEFAULT 0,
+            cost REAL DEFAULT 0,
+            duration_ms INTEGER DEFAULT 0,
+            PRIMARY KEY (date, agent)
+        )
+    """)
+
     _create_growth_indexes(conn)
 
 
@@ -319,6 +340,20 @@ def _init_growth_pg(conn):
         )
     """)
 
+    # growth_agent_log rows past retention, summed per day and agent
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS growth_agent_daily (
+            date TEXT NOT NULL,
+            agent TEXT NOT NULL,
+            actions INTEGER DEFAULT 0,
+            successes INTEGER DEFAULT 0,
+            tokens_used INTEGER DEFAULT 0,
+            cost REAL DEFAULT 0,
+            duration_ms INTEGER DEFAULT 0,
+            PRIMARY KEY (date, agent)
+        )
+    """)
+
     _create_growth_indexes(conn)
 
 
@@ -329,6 +364,7 @@ def _create_growth_indexes(conn):
         "CREATE INDEX IF NOT EXISTS idx_gl_source ON growth_leads(source)",
         "CREATE INDEX IF NOT EXISTS idx_gl_niche ON growth_leads(niche)",
         "CREATE INDEX IF NOT EXISTS idx_gl_shop_url ON growth_leads(shop_url)",
+        "CREATE INDEX IF NOT EXISTS idx_gl_reddit_username ON growth_leads(reddit_username)",
         "CREATE INDEX IF NOT EXISTS idx_gm_campaign ON growth_messages(campaign_id)",
         "CREATE INDEX IF NOT EXISTS idx_gm_lead ON growth_messages(lead_id)",
         "CREATE INDEX IF NOT EXISTS idx_gm_status ON growth_messages(status)",
@@ -340,6 +376,11 @@ def _create_growth_indexes(conn):
         "CREATE INDEX IF NOT EXISTS idx_glrn_agent ON growth_learnings(agent)",
         "CREATE INDEX IF NOT EXISTS idx_glrn_type ON growth_learnings(learning_type)",
         "CREATE INDEX IF NOT EXISTS idx_glrn_lookup ON growth_learnings(agent, learning_type, key)",
+        # Covering indexes: get_growth_overview scans these instead of the wide rows
+        "CREATE INDEX IF NOT EXISTS idx_gl_overview ON growth_leads(contact_status, tier, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_gm_overview ON growth_messages(status, review_status, sent_at, replied_at)",
+        "CREATE INDEX IF NOT EXISTS idx_gal_created_cost ON growth_agent_log(created_at, cost)",
+        "CREATE INDEX IF NOT EXISTS idx_gst_created ON growth_seen_threads(created_at)",
     ]
     for sql in indexes:
         conn.execute(sql)
@@ -484,6 +525,59 @@ def update_lead_score(lead_id, score, tier, outreach_angle=None):
         conn.close()
 
 
+# Leads per statement; the CASE update binds 5 parameters per lead (SQLite caps at 999)
+_LEAD_BATCH = 150
+
+
+def get_leads_for_enrichment(lead_ids):
+    """Fetch id, shop_name, email and social_url for the given leads in one query."""
+    lead_ids = list(dict.fromkeys(lead_ids))
+    if not lead_ids:
+        return []
+    conn = get_conn()
+    try:
+        rows = []
+        for start in range(0, len(lead_ids), _LEAD_BATCH):
+            chunk = lead_ids[start:start + _LEAD_BATCH]
+            rows += conn.execute(
+                "SELECT id, shop_name, email, social_url FROM growth_leads WHERE id IN ("
+                + ", ".join(["%s"] * len(chunk)) + ")",
+                tuple(chunk)
+            ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def update_lead_contacts(contacts):
+    """Batch-write enrichment results: {lead_id: {"email": ..., "social_url": ...}}.
+    One UPDATE per batch; existing values are never overwritten."""
+    contacts = [(lead_id, found) for lead_id, found in contacts.items() if found]
+    if not contacts:
+        return 0
+    conn = get_conn()
+    try:
+        for start in range(0, len(contacts), _LEAD_BATCH):
+            chunk = contacts[start:start + _LEAD_BATCH]
+            params = []
+            for field in ("email", "social_url"):
+                for lead_id, found in chunk:
+                    params += [lead_id, found.get(field)]
+            params.append(datetime.now().isoformat())
+            params += [lead_id for lead_id, _ in chunk]
+            whens = " ".join(["WHEN %s THEN %s"] * len(chunk))
+            conn.execute(
+                f"UPDATE growth_leads SET email = COALESCE(email, CASE id {whens} END), "
+                f"social_url = COALESCE(social_url, CASE id {whens} END), updated_at = %s "
+                "WHERE id IN (" + ", ".join(["%s"] * len(chunk)) + ")",
+                tuple(params)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return len(contacts)
+
+
 def get_lead_count_today(source=None):
     """Count leads discovered today (for quota enforcement)."""
     conn = get_conn()
@@ -503,6 +597,26 @@ def get_lead_count_today(source=None):
         conn.close()
 
 
+def get_existing_reddit_usernames(usernames):
+    """Subset of usernames that already have a lead (one query per _SEEN_BATCH names)."""
+    usernames = list(dict.fromkeys(u for u in usernames if u))
+    existing = set()
+    if not usernames:
+        return existing
+    conn = get_conn()
+    try:
+        for start in range(0, len(usernames), _SEEN_BATCH):
+            chunk = usernames[start:start + _SEEN_BATCH]
+            rows = conn.execute(
+                f"SELECT reddit_username FROM growth_leads WHERE reddit_username IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk)
+            ).fetchall()
+            existing.update(r["reddit_username"] for r in rows)
+        return existing
+    finally:
+        conn.close()
+
+
 def lead_exists(shop_url):
     """Check if a lead already exists by shop URL."""
     conn = get_conn()
@@ -674,6 +788,7 @@ def update_message_status(msg_id, status, review_status=None):
         conn.commit()
     finally:
         conn.close()
+    invalidate_growth_overview()  # review actions show up on the next page view
 
 
 def get_messages_sent_today(channel=None):
@@ -866,22 +981,20 @@ def get_videos_published_today():
 # AGENT LOG
 # =============================================================
 
+_AGENT_LOG_COLUMNS = ("agent", "action", "success", "details", "tokens_used", "cost",
+                      "duration_ms", "created_at")
+
+
 def log_agent_action(agent, action, success=True, details=None,
                      tokens_used=0, cost=0.0, duration_ms=0):
-    conn = get_conn()
-    try:
-        conn.execute("""
-            INSERT INTO growth_agent_log
-            (agent, action, success, details, tokens_used, cost, duration_ms)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (agent, action, 1 if success else 0, json.dumps(details or {}),
-              tokens_used, cost, duration_ms))
-        conn.commit()
-    finally:
-        conn.close()
+    """Queued; readers below flush this process's pending rows first."""
+    write_behind("growth_agent_log", _AGENT_LOG_COLUMNS, (
+        agent, action, 1 if success else 0, json.dumps(details or {}),
+        tokens_used, cost, duration_ms, _utc_timestamp()))
 
 
 def get_agent_log(agent=None, limit=50):
+    flush_write_behind()
     conn = get_conn()
     try:
         if agent:
@@ -906,6 +1019,7 @@ def get_agent_log(agent=None, limit=50):
 
 def get_agent_stats(agent, since_hours=24):
     """Get aggregate stats for an agent over the last N hours."""
+    flush_write_behind()
     conn = get_conn()
     try:
         interval = f"{since_hours} hours" if USE_PG else f"{since_hours} hours"
@@ -924,6 +1038,7 @@ def get_agent_stats(agent, since_hours=24):
 
 def get_last_agent_run(agent):
     """Get the most recent log entry for an agent."""
+    flush_write_behind()
     conn = get_conn()
     try:
         row = conn.execute(
@@ -1009,53 +1124,106 @@ def get_metrics_range(days=30):
 # DASHBOARD AGGREGATES
 # =============================================================
 
-def get_growth_overview():
-    """Get summary stats for the growth dashboard."""
+# Shared by the /growth page and commander._collect_metrics: (computed_at, overview)
+_overview_snapshot = (0.0, None)
+_overview_lock = threading.Lock()
+
+
+def get_growth_overview(max_age=None):
+    """Get summary stats for the growth dashboard.
+    Served from a per-process snapshot up to `max_age` seconds old
+    (default OVERVIEW_CACHE_SECONDS; 0 forces a fresh read).
+    """
+    global _overview_snapshot
+    max_age = OVERVIEW_CACHE_SECONDS if max_age is None else max_age
+    computed_at, overview = _overview_snapshot
+    if overview is not None and time.monotonic() - computed_at < max_age:
+        return dict(overview)
+    with _overview_lock:
+        # Another thread may have refreshed it while we waited
+        computed_at, overview = _overview_snapshot
+        if overview is None or time.monotonic() - computed_at >= max_age:
+            overview = _compute_growth_overview()
+            _overview_snapshot = (time.monotonic(), overview)
+    return dict(overview)
+
+
+def invalidate_growth_overview():
+    """Drop this process's snapshot (other workers refresh within the TTL)."""
+    global _overview_snapshot
+    _overview_snapshot = (0.0, None)
+
+
+def _compute_growth_overview():
+    """One aggregate scan per table (15 COUNT/SUM queries before)."""
+    flush_write_behind()
     conn = get_conn()
     try:
-        leads_total = conn.execute("SELECT COUNT(*) as c FROM growth_leads").fetchone()["c"]
-        leads_hot = conn.execute("SELECT COUNT(*) as c FROM growth_leads WHERE tier = 'HOT'").fetchone()["c"]
-        leads_contacted = conn.execute("SELECT COUNT(*) as c FROM growth_leads WHERE contact_status = 'contacted'").fetchone()["c"]
-        leads_responded = conn.execute("SELECT COUNT(*) as c FROM growth_leads WHERE contact_status = 'responded'").fetchone()["c"]
-        leads_converted = conn.execute("SELECT COUNT(*) as c FROM growth_leads WHERE contact_status = 'converted'").fetchone()["c"]
-
-        messages_total = conn.execute("SELECT COUNT(*) as c FROM growth_messages WHERE status = 'sent'").fetchone()["c"]
-        messages_replied = conn.execute("SELECT COUNT(*) as c FROM growth_messages WHERE status = 'replied'").fetchone()["c"]
-        messages_pending = conn.execute("SELECT COUNT(*) as c FROM growth_messages WHERE review_status = 'pending'").fetchone()["c"]
-
-        videos_total = conn.execute("SELECT COUNT(*) as c FROM growth_content WHERE content_type = 'video' AND status = 'published'").fetchone()["c"]
-        video_views = conn.execute("SELECT COALESCE(SUM(views), 0) as c FROM growth_content WHERE content_type = 'video'").fetchone()["c"]
-
-        # Today's numbers
-        leads_today = conn.execute(f"SELECT COUNT(*) as c FROM growth_leads WHERE created_at >= {_ago('1 day')}").fetchone()["c"]
-        messages_today = conn.execute(f"SELECT COUNT(*) as c FROM growth_messages WHERE sent_at >= {_ago('1 day')}").fetchone()["c"]
-        replies_today = conn.execute(f"SELECT COUNT(*) as c FROM growth_messages WHERE replied_at >= {_ago('1 day')}").fetchone()["c"]
-
-        total_spend = conn.execute("SELECT COALESCE(SUM(cost), 0) as c FROM growth_agent_log").fetchone()["c"]
-        spend_today = conn.execute(f"SELECT COALESCE(SUM(cost), 0) as c FROM growth_agent_log WHERE created_at >= {_ago('1 day')}").fetchone()["c"]
-
-        return {
-            "leads_total": leads_total,
-            "leads_hot": leads_hot,
-            "leads_contacted": leads_contacted,
-            "leads_responded": leads_responded,
-            "leads_converted": leads_converted,
-            "messages_total": messages_total,
-            "messages_replied": messages_replied,
-            "messages_pending": messages_pending,
-            "videos_total": videos_total,
-            "video_views": video_views,
-            "leads_today": leads_today,
-            "messages_today": messages_today,
-            "replies_today": replies_today,
-            "total_spend": round(total_spend, 2),
-            "spend_today": round(spend_today, 2),
-            "reply_rate": round((messages_replied / messages_total * 100), 1) if messages_total > 0 else 0,
-            "conversion_rate": round((leads_converted / leads_total * 100), 1) if leads_total > 0 else 0,
-        }
+        # Grouped rather than CASE-per-status: a handful of groups off the covering index
+        lead_groups = conn.execute(f"""
+            SELECT contact_status, tier, COUNT(*) as n,
+                   COALESCE(SUM(CASE WHEN created_at >= {_ago('1 day')} THEN 1 ELSE 0 END), 0) as today
+            FROM growth_leads
+            GROUP BY contact_status, tier
+        """).fetchall()
+
+        messages = conn.execute(f"""
+            SELECT COALESCE(SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END), 0) as sent,
+                   COALESCE(SUM(CASE WHEN status = 'replied' THEN 1 ELSE 0 END), 0) as replied,
+                   COALESCE(SUM(CASE WHEN review_status = 'pending' THEN 1 ELSE 0 END), 0) as pending,
+                   COALESCE(SUM(CASE WHEN sent_at >= {_ago('1 day')} THEN 1 ELSE 0 END), 0) as sent_today,
+                   COALESCE(SUM(CASE WHEN replied_at >= {_ago('1 day')} THEN 1 ELSE 0 END), 0) as replied_today
+            FROM growth_messages
+        """).fetchone()
+
+        videos = conn.execute("""
+            SELECT COALESCE(SUM(CASE WHEN status = 'published' THEN 1 ELSE 0 END), 0) as published,
+                   COALESCE(SUM(views), 0) as views
+            FROM growth_content
+            WHERE content_type = 'video'
+        """).fetchone()
+
+        spend = conn.execute(f"""
+            SELECT (SELECT COALESCE(SUM(cost), 0) FROM growth_agent_daily)
+                       + COALESCE(SUM(cost), 0) as total,
+                   COALESCE(SUM(CASE WHEN created_at >= {_ago('1 day')} THEN cost ELSE 0 END), 0) as today
+            FROM growth_agent_log
+        """).fetchone()
     finally:
         conn.close()
 
+    leads = {"total": 0, "hot": 0, "today": 0, "contacted": 0, "responded": 0, "converted": 0}
+    for g in lead_groups:
+        leads["total"] += int(g["n"])
+        leads["today"] += int(g["today"])
+        if g["tier"] == "HOT":
+            leads["hot"] += int(g["n"])
+        if g["contact_status"] in ("contacted", "responded", "converted"):
+            leads[g["contact_status"]] += int(g["n"])
+    leads_total = leads["total"]
+    leads_converted = leads["converted"]
+    messages_total = int(messages["sent"])
+    messages_replied = int(messages["replied"])
+    return {
+        "leads_total": leads_total,
+        "leads_hot": leads["hot"],
+        "leads_contacted": leads["contacted"],
+        "leads_responded": leads["responded"],
+        "leads_converted": leads_converted,
+        "messages_total": messages_total,
+        "messages_replied": messages_replied,
+        "messages_pending": int(messages["pending"]),
+        "videos_total": int(videos["published"]),
+        "video_views": int(videos["views"]),
+        "leads_today": leads["today"],
+        "messages_today": int(messages["sent_today"]),
+        "replies_today": int(messages["replied_today"]),
+        "total_spend": round(float(spend["total"]), 2),
+        "spend_today": round(float(spend["today"]), 2),
+        "reply_rate": round((messages_replied / messages_total * 100), 1) if messages_total > 0 else 0,
+        "conversion_rate": round((leads_converted / leads_total * 100), 1) if leads_total > 0 else 0,
+    }
+
 
 def get_lead_funnel():
     """Get lead counts by status for funnel visualization."""
@@ -1162,46 +1330,192 @@ def get_top_learnings(agent, learning_type, limit=10, min_sample=3):
 
 
 # =============================================================
-# SEEN THREADS (persistent dedup for Listener)
+# SEEN THREADS (persistent dedup for Listener and Scout)
 # =============================================================
 
-def is_thread_seen(thread_id):
-    """Check if a thread has already been processed."""
+# Max IDs per IN (...) / multi-row VALUES statement (SQLite binds at most 999)
+_SEEN_BATCH = 400
+
+
+_seen_cache = OrderedDict()  # thread IDs known to be marked seen, least recent first
+_seen_cache_lock = threading.Lock()
+
+
+def _remember_seen(thread_ids):
+    if not SEEN_CACHE_ENABLED:
+        return
+    with _seen_cache_lock:
+        for tid in thread_ids:
+            _seen_cache[tid] = True
+            _seen_cache.move_to_end(tid)
+        while len(_seen_cache) > SEEN_CACHE_SIZE:
+            _seen_cache.popitem(last=False)
+
+
+def filter_unseen_threads(thread_ids):
+    """Return the thread_ids not yet marked seen, in input order (one query per
+    _SEEN_BATCH IDs). IDs this process recently saw marked skip the lookup; the
+    cache is exact, so a new ID always reaches the database."""
+    candidates = list(dict.fromkeys(tid for tid in thread_ids if tid))
+    if SEEN_CACHE_ENABLED:
+        with _seen_cache_lock:
+            candidates = [tid for tid in candidates if tid not in _seen_cache]
+    if not candidates:
+        return []
+
+    seen = set()
     conn = get_conn()
     try:
-        row = conn.execute("SELECT 1 FROM growth_seen_threads WHERE thread_id = %s", (thread_id,)).fetchone()
-        return row is not None
+        for start in range(0, len(candidates), _SEEN_BATCH):
+            chunk = candidates[start:start + _SEEN_BATCH]
+            rows = conn.execute(
+                f"SELECT thread_id FROM growth_seen_threads WHERE thread_id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk)
+            ).fetchall()
+            seen.update(r["thread_id"] for r in rows)
     finally:
         conn.close()
+    _remember_seen(seen)
+    return [tid for tid in candidates if tid not in seen]
+
+
+def is_thread_seen(thread_id):
+    """Check if a thread has already been processed."""
+    return not filter_unseen_threads([thread_id])
 
 
 def mark_threads_seen(thread_ids, subreddit=None):
     """Mark threads as seen so they aren't re-classified after deploys."""
+    thread_ids = list(dict.fromkeys(tid for tid in thread_ids if tid))
     if not thread_ids:
         return
     conn = get_conn()
     try:
-        for tid in thread_ids:
-            try:
-                conn.execute(
-                    "INSERT INTO growth_seen_threads (thread_id, subreddit) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                    (tid, subreddit)
-                )
-            except Exception:
-                pass  # Ignore duplicates
+        for start in range(0, len(thread_ids), _SEEN_BATCH):
+            chunk = thread_ids[start:start + _SEEN_BATCH]
+            params = []
+            for tid in chunk:
+                params += [tid, subreddit]
+            conn.execute(
+                "INSERT INTO growth_seen_threads (thread_id, subreddit) VALUES "
+                + ", ".join(["(%s, %s)"] * len(chunk)) + " ON CONFLICT DO NOTHING",
+                tuple(params)
+            )
         conn.commit()
     finally:
         conn.close()
+    _remember_seen(thread_ids)
 
 
 def cleanup_old_seen_threads(days=7):
     """Remove seen threads older than N days to prevent table bloat."""
+    return _delete_older_than("growth_seen_threads", "thread_id", days)
+
+
+# =============================================================
+# RETENTION (run by the scheduler; see run_retention)
+# =============================================================
+
+def _delete_older_than(table, key, days, batch_size=None):
+    """Delete rows with created_at older than `days`, oldest first, `batch_size`
+    keys per transaction (walks the created_at index; no DELETE ... LIMIT on Postgres).
+    Returns the number of rows deleted."""
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    deleted = 0
+    while True:
+        conn = get_conn()
+        try:
+            cur = conn.execute(f"""
+                DELETE FROM {table} WHERE {key} IN (
+                    SELECT {key} FROM {table}
+                    WHERE created_at < {_ago(f'{int(days)} days')}
+                    ORDER BY created_at
+                    LIMIT %s
+                )
+            """, (batch_size,))
+            conn.commit()
+            count = cur.rowcount
+        finally:
+            conn.close()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def rollup_agent_log(days=None, batch_size=None):
+    """Fold growth_agent_log rows older than `days` into growth_agent_daily, then
+    delete them. Each batch is summed and deleted in one transaction, so a row is
+    counted exactly once. Returns the number of rows rolled up."""
+    days = max(int(days or AGENT_LOG_RETENTION_DAYS), 2)  # spend_today reads the raw log
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    flush_write_behind()
+    rolled = 0
+    while True:
+        conn = get_conn()
+        try:
+            rows = conn.execute(f"""
+                SELECT id, agent, success, tokens_used, cost, duration_ms, created_at
+                FROM growth_agent_log
+                WHERE created_at < {_ago(f'{days} days')}
+                ORDER BY created_at
+                LIMIT %s
+            """, (batch_size,)).fetchall()
+            if not rows:
+                return rolled
+
+            daily = {}
+            for r in rows:
+                totals = daily.setdefault((str(r["created_at"])[:10], r["agent"]), [0, 0, 0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += 1 if r["success"] else 0
+                totals[2] += r["tokens_used"] or 0
+                totals[3] += r["cost"] or 0
+                totals[4] += r["duration_ms"] or 0
+
+            ids = [r["id"] for r in rows]
+            cur = conn.execute(
+                f"DELETE FROM growth_agent_log WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                tuple(ids))
+            if cur.rowcount != len(ids):
+                # Another process rolled up some of these rows first; let it finish
+                conn.rollback()
+                return rolled
+            for (date, agent), (actions, successes, tokens, cost, duration) in daily.items():
+                conn.execute("""
+                    INSERT INTO growth_agent_daily (date, agent, actions, successes, tokens_used, cost, duration_ms)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (date, agent) DO UPDATE SET
+                        actions = growth_agent_daily.actions + excluded.actions,
+                        successes = growth_agent_daily.successes + excluded.successes,
+                        tokens_used = growth_agent_daily.tokens_used + excluded.tokens_used,
+                        cost = growth_agent_daily.cost + excluded.cost,
+                        duration_ms = growth_agent_daily.duration_ms + excluded.duration_ms
+                """, (date, agent, actions, successes, tokens, cost, duration))
+            conn.commit()
+        finally:
+            conn.close()
+        rolled += len(rows)
+        if len(rows) < batch_size:
+            return rolled
+
+
+def get_total_agent_spend():
+    """All-time agent spend: rolled-up days plus the raw log still in retention."""
+    flush_write_behind()
     conn = get_conn()
     try:
-        conn.execute(
-            "DELETE FROM growth_seen_threads WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '%s days'",
-            (days,)
-        )
-        conn.commit()
+        row = conn.execute("""
+            SELECT (SELECT COALESCE(SUM(cost), 0) FROM growth_agent_daily)
+                   + (SELECT COALESCE(SUM(cost), 0) FROM growth_agent_log) as total
+        """).fetchone()
+        return float(row["total"])
     finally:
         conn.close()
+
+
+def run_retention():
+    """Scheduled job: prune growth_seen_threads and roll up growth_agent_log."""
+    return {
+        "seen_threads_deleted": cleanup_old_seen_threads(SEEN_THREADS_RETENTION_DAYS),
+        "agent_log_rolled_up": rollup_agent_log(AGENT_LOG_RETENTION_DAYS),
+    }
@@ -14,6 +14,7 @@ from growth.growth_config import (
     SCHEDULE_LISTENER_MINS,
     SCHEDULE_CREATOR_MINS,
     SCHEDULE_WRITER_MINS,
+    SCHEDULE_RETENTION_HOURS,
 )
 
 logger = logging.getLogger("etsai.growth.scheduler")
@@ -21,9 +22,9 @@ logger = logging.getLogger("etsai.growth.scheduler")
 _scheduler = None
 
 
-def _safe_run(agent_name, run_func, **kwargs):
+def _safe_run(agent_name, run_func, growth_job=True, **kwargs):
     """Wrapper that catches errors so one agent crash doesn't kill the scheduler."""
-    if not GROWTH_ENABLED:
+    if growth_job and not GROWTH_ENABLED:
         return
     try:
         logger.info(f"Scheduler: Running {agent_name}")
@@ -41,9 +42,10 @@ def init_scheduler(app=None):
     Call this from app.py after init_db().
     """
     global _scheduler
+    from etsy_sync import ETSY_SYNC_ENABLED, ETSY_SYNC_INTERVAL_MINS
 
-    if not GROWTH_ENABLED:
-        logger.info("Growth system disabled — scheduler not started")
+    if not GROWTH_ENABLED and not ETSY_SYNC_ENABLED:
+        logger.info("Growth system and Etsy sync disabled — scheduler not started")
         return None
 
     try:
@@ -54,8 +56,46 @@ def init_scheduler(app=None):
 
     _scheduler = BackgroundScheduler(daemon=True)
 
-    # Commander — the brain, runs everything else too
+    if GROWTH_ENABLED:
+        _add_growth_jobs(_scheduler)
+
+    # Etsy order sync — new receipts become orders shortly after purchase
+    if ETSY_SYNC_ENABLED:
+        _scheduler.add_job(
+            lambda: _safe_run("etsy_order_sync", _run_etsy_order_sync, growth_job=False),
+            "interval",
+            minutes=ETSY_SYNC_INTERVAL_MINS,
+            id="etsy_order_sync",
+            replace_existing=True,
+        )
+
+    # Seller counters — recompute from base tables to repair any drift
     _scheduler.add_job(
+        lambda: _safe_run("seller_counters", _run_reconcile_counters, growth_job=False),
+        "interval",
+        hours=6,
+        id="seller_counters_reconcile",
+        replace_existing=True,
+    )
+
+    _scheduler.start()
+    if GROWTH_ENABLED:
+        logger.info("Growth scheduler started — "
+                    f"Commander every {SCHEDULE_COMMANDER_MINS}m, "
+                    f"Scout every {SCHEDULE_SCOUT_MINS}m, "
+                    f"Listener every {SCHEDULE_LISTENER_MINS}m, "
+                    f"Creator every {SCHEDULE_CREATOR_MINS}m, "
+                    f"Writer every {SCHEDULE_WRITER_MINS}m")
+    if ETSY_SYNC_ENABLED:
+        logger.info(f"Etsy order sync every {ETSY_SYNC_INTERVAL_MINS}m")
+
+    return _scheduler
+
+
+def _add_growth_jobs(scheduler):
+    """Growth agents + onboard emails (only when GROWTH_ENABLED)."""
+    # Commander — the brain, runs everything else too
+    scheduler.add_job(
         lambda: _safe_run("commander", _run_commander),
         "interval",
         minutes=SCHEDULE_COMMANDER_MINS,
@@ -64,7 +104,7 @@ def init_scheduler(app=None):
     )
 
     # Scout — lead discovery (also runs in Commander cycle, this is backup)
-    _scheduler.add_job(
+    scheduler.add_job(
         lambda: _safe_run("scout", _run_scout),
         "interval",
         minutes=SCHEDULE_SCOUT_MINS,
@@ -73,7 +113,7 @@ def init_scheduler(app=None):
     )
 
     # Listener — community monitoring
-    _scheduler.add_job(
+    scheduler.add_job(
         lambda: _safe_run("listener", _run_listener),
         "interval",
         minutes=SCHEDULE_LISTENER_MINS,
@@ -82,7 +122,7 @@ def init_scheduler(app=None):
     )
 
     # Creator — video production
-    _scheduler.add_job(
+    scheduler.add_job(
         lambda: _safe_run("creator", _run_creator),
         "interval",
         minutes=SCHEDULE_CREATOR_MINS,
@@ -91,7 +131,7 @@ def init_scheduler(app=None):
     )
 
     # Writer — process send queue
-    _scheduler.add_job(
+    scheduler.add_job(
         lambda: _safe_run("writer", _run_writer),
         "interval",
         minutes=SCHEDULE_WRITER_MINS,
@@ -99,8 +139,17 @@ def init_scheduler(app=None):
         replace_existing=True,
     )
 
+    # Retention — prune seen threads, roll old agent-log rows into daily totals
+    scheduler.add_job(
+        lambda: _safe_run("retention", _run_retention),
+        "interval",
+        hours=SCHEDULE_RETENTION_HOURS,
+        id="growth_retention",
+        replace_existing=True,
+    )
+
     # Onboard email sequence — check every 6 hours
-    _scheduler.add_job(
+    scheduler.add_job(
         lambda: _safe_run("onboard_emails", _run_onboard_emails),
         "interval",
         hours=6,
@@ -108,16 +157,6 @@ def init_scheduler(app=None):
         replace_existing=True,
     )
 
-    _scheduler.start()
-    logger.info("Growth scheduler started — "
-                f"Commander every {SCHEDULE_COMMANDER_MINS}m, "
-                f"Scout every {SCHEDULE_SCOUT_MINS}m, "
-                f"Listener every {SCHEDULE_LISTENER_MINS}m, "
-                f"Creator every {SCHEDULE_CREATOR_MINS}m, "
-                f"Writer every {SCHEDULE_WRITER_MINS}m")
-
-    return _scheduler
-
 
 def _run_commander():
     from growth.commander import run_cycle
@@ -144,6 +183,11 @@ def _run_writer():
     return writer_run()
 
 
+def _run_retention():
+    from growth.growth_db import run_retention
+    return run_retention()
+
+
 def _run_onboard_emails():
     """Send scheduled onboard emails (day 2 product reminder, day 5 tips, day 12 trial expiring)."""
     from database import get_sellers_needing_onboard_email, set_onboard_email_stage
@@ -173,6 +217,16 @@ def _run_onboard_emails():
     return {"sent": sent}
 
 
+def _run_etsy_order_sync():
+    from etsy_sync import sync_all_sellers
+    return sync_all_sellers()
+
+
+def _run_reconcile_counters():
+    from database import reconcile_seller_counters
+    return reconcile_seller_counters()
+
+
 def shutdown_scheduler():
     """Gracefully shut down the scheduler."""
     global _scheduler
@@ -21,8 +21,9 @@ from ai_engine import call_claude, AI_MODEL_CHEAP, AI_MODEL_SMART
 from growth.growth_db import (
     add_growth_message, log_agent_action, add_content,
     upsert_learning, get_top_learnings, get_learnings,
-    is_thread_seen, mark_threads_seen, cleanup_old_seen_threads,
+    filter_unseen_threads, mark_threads_seen,
 )
+from growth.reddit_client import get_reddit_client
 from growth.growth_config import (
     REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET,
     REDDIT_TARGET_SUBREDDITS, REDDIT_KEYWORDS,
@@ -61,58 +62,39 @@ def _get_reddit():
 def _scan_reddit_json(subreddits, since_hours=6, limit=25):
     """Fetch ALL recent posts from subreddits — no keyword filter.
     Claude will decide what's relevant downstream."""
-    import requests
-
     threads = []
     cutoff = time.time() - (since_hours * 3600)
-    headers = {"User-Agent": "ETSAI-GrowthBot/1.0"}
+    listings = get_reddit_client().fetch_subreddits(subreddits, sort="new", limit=limit,
+                                                    consumer="listener")
 
-    for sub_name in subreddits:
-        try:
-            url = f"https://www.reddit.com/r/{sub_name}/new.json?limit={limit}"
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code != 200:
-                logger.warning(f"Listener: Reddit JSON r/{sub_name} returned {resp.status_code}")
-                time.sleep(2)
+    for sub_name, posts in listings.items():
+        for post in posts:
+            created_utc = post.get("created_utc", 0)
+            if created_utc < cutoff:
                 continue
 
-            data = resp.json()
-            posts = data.get("data", {}).get("children", [])
-
-            for post_wrapper in posts:
-                post = post_wrapper.get("data", {})
-                created_utc = post.get("created_utc", 0)
-                if created_utc < cutoff:
-                    continue
-
-                post_id = post.get("id", "")
-                if is_thread_seen(post_id):
-                    continue
-
-                author = post.get("author")
-                if not author or author in ("[deleted]", "AutoModerator"):
-                    continue
-
-                permalink = post.get("permalink", "")
-
-                threads.append({
-                    "id": post_id,
-                    "subreddit": sub_name,
-                    "title": post.get("title", ""),
-                    "body": (post.get("selftext") or "")[:1000],
-                    "url": f"https://reddit.com{permalink}",
-                    "author": author,
-                    "score": post.get("score", 0),
-                    "num_comments": post.get("num_comments", 0),
-                    "created_utc": created_utc,
-                })
+            post_id = post.get("id", "")
+            author = post.get("author")
+            if not author or author in ("[deleted]", "AutoModerator"):
+                continue
 
-            time.sleep(2)
+            permalink = post.get("permalink", "")
 
-        except Exception as e:
-            logger.error(f"Listener: Reddit JSON error on r/{sub_name}: {e}")
+            threads.append({
+                "id": post_id,
+                "subreddit": sub_name,
+                "title": post.get("title", ""),
+                "body": (post.get("selftext") or "")[:1000],
+                "url": f"https://reddit.com{permalink}",
+                "author": author,
+                "score": post.get("score", 0),
+                "num_comments": post.get("num_comments", 0),
+                "created_utc": created_utc,
+            })
 
-    return threads
+    # One seen-thread lookup for every subreddit's candidates
+    unseen = set(filter_unseen_threads([t["id"] for t in threads]))
+    return [t for t in threads if t["id"] in unseen]
 
 
 def scan_reddit(subreddits=None, since_hours=6, limit=25):
@@ -450,12 +432,6 @@ def run():
         "pain_points": [],
     }
 
-    # Cleanup old seen threads (keep last 7 days)
-    try:
-        cleanup_old_seen_threads(days=7)
-    except Exception:
-        pass
-
     # Scan Reddit
     if CHANNEL_REDDIT:
         smart_subs = _get_smart_subreddits()
@@ -465,6 +441,7 @@ def run():
         # Mark all fetched threads as seen (persists across deploys)
         if threads:
             mark_threads_seen([t["id"] for t in threads])
+        get_reddit_client().commit_cursors("listener")
 
         if threads:
             # Classify
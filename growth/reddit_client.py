@@ -0,0 +1,175 @@
+"""
+ETSAI Growth Bot — Shared Reddit JSON client
+One pooled requests.Session and one token bucket per process, shared by the
+Listener and Scout. Subreddits are fetched concurrently; listing fetches send
+before=<newest post processed> so repeat scans only return new posts. A fetch
+only proposes the new cursor — the consumer commits it once the posts are handled.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import RateBudget
+from growth.growth_config import (
+    REDDIT_USER_AGENT, REDDIT_RATE_PER_MIN, REDDIT_BURST,
+    REDDIT_FETCH_WORKERS, REDDIT_CURSOR_TTL,
+)
+
+logger = logging.getLogger("etsai.growth.reddit")
+
+REDDIT_BASE = "https://www.reddit.com"
+REQUEST_TIMEOUT = 15
+
+
+class RedditClient:
+    """Rate-limited, pooled Reddit JSON fetcher."""
+
+    def __init__(self, rate_per_min=REDDIT_RATE_PER_MIN, burst=REDDIT_BURST,
+                 workers=REDDIT_FETCH_WORKERS, user_agent=REDDIT_USER_AGENT):
+        self.workers = max(workers, 1)
+        self._budget = RateBudget(rate_per_min / 60.0, burst=burst)
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="reddit-fetch")
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        # (consumer, subreddit, sort) -> (newest post fullname, etag, stored_at)
+        self._cursors = {}
+        # Same shape: fetched but not yet committed by the consumer
+        self._pending_cursors = {}
+
+    # --- Requests ---
+
+    def get_json(self, path, params=None, etag=None):
+        """GET a reddit.com JSON path. Returns (status, json or None, etag)."""
+        self._wait_for_budget()
+        headers = {"If-None-Match": etag} if etag else None
+        resp = self._session.get(f"{REDDIT_BASE}{path}", params=params, headers=headers,
+                                 timeout=REQUEST_TIMEOUT)
+        self._observe_limits(resp)
+        if resp.status_code != 200:
+            return resp.status_code, None, None
+        return 200, resp.json(), resp.headers.get("ETag")
+
+    def _wait_for_budget(self):
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self._budget.acquire()
+
+    def _observe_limits(self, resp):
+        """Honor Reddit's X-Ratelimit-* headers and 429 Retry-After."""
+        pause = 0.0
+        try:
+            if resp.status_code == 429:
+                pause = float(resp.headers.get("Retry-After", "60"))
+            elif float(resp.headers.get("X-Ratelimit-Remaining", "1")) < 1:
+                pause = float(resp.headers.get("X-Ratelimit-Reset", "60"))
+        except ValueError:
+            pause = 60.0
+        if pause > 0:
+            logger.warning(f"Reddit rate limit reached — pausing {pause:.0f}s")
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    # --- Listings ---
+
+    def fetch_subreddits(self, subreddits, sort="new", limit=25, consumer=None):
+        """Fetch r/<sub>/<sort>.json for each subreddit concurrently.
+        Returns {subreddit: [post data dicts]}, omitting subreddits that failed.
+        With a `consumer` name and sort="new", only posts newer than that consumer's
+        last committed cursor are returned (cursor per consumer, so Listener and Scout
+        don't share one). Call commit_cursors once the posts have been handled.
+        """
+        futures = {sub: self._executor.submit(self._fetch_listing, sub, sort, limit, consumer)
+                   for sub in subreddits}
+        results = {}
+        for sub, future in futures.items():
+            try:
+                posts = future.result()
+            except Exception as e:
+                logger.error(f"Reddit fetch error r/{sub}: {e}")
+                continue
+            if posts is not None:
+                results[sub] = posts
+        return results
+
+    def search(self, queries, limit=10, sort="new"):
+        """Run /search.json for each query concurrently. Returns {query: [post data dicts]}."""
+        futures = {q: self._executor.submit(self._fetch_search, q, limit, sort) for q in queries}
+        results = {}
+        for query, future in futures.items():
+            try:
+                posts = future.result()
+            except Exception as e:
+                logger.error(f"Reddit search error for '{query}': {e}")
+                continue
+            if posts is not None:
+                results[query] = posts
+        return results
+
+    def _fetch_listing(self, sub_name, sort, limit, consumer):
+        consumer = consumer if sort == "new" else None
+        key = (consumer, sub_name, sort)
+        params = {"limit": limit}
+        etag = None
+        if consumer:
+            with self._lock:
+                cursor = self._cursors.get(key)
+            # A deleted anchor post makes before= return nothing forever, so cursors expire
+            if cursor and time.time() - cursor[2] < REDDIT_CURSOR_TTL:
+                params["before"] = cursor[0]
+                etag = cursor[1]
+
+        status, data, new_etag = self.get_json(f"/r/{sub_name}/{sort}.json", params, etag)
+        if status == 304:
+            return []
+        if status != 200:
+            logger.warning(f"Reddit r/{sub_name} returned {status}")
+            return None
+
+        posts = [child.get("data", {}) for child in data.get("data", {}).get("children", [])]
+        if consumer and posts and posts[0].get("name"):
+            with self._lock:
+                self._pending_cursors[key] = (posts[0]["name"], new_etag, time.time())
+        return posts
+
+    def commit_cursors(self, consumer, subreddits=None):
+        """Advance `consumer`'s cursors to its last fetch (all subreddits, or just
+        `subreddits`). Uncommitted subreddits are fetched from the old cursor again."""
+        with self._lock:
+            for key in [k for k in self._pending_cursors if k[0] == consumer]:
+                if subreddits is None or key[1] in subreddits:
+                    self._cursors[key] = self._pending_cursors.pop(key)
+
+    def _fetch_search(self, query, limit, sort):
+        status, data, _ = self.get_json("/search.json", {"q": query, "sort": sort, "limit": limit})
+        if status != 200:
+            logger.warning(f"Reddit search '{query}' returned {status}")
+            return None
+        return [child.get("data", {}) for child in data.get("data", {}).get("children", [])]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_reddit_client():
+    """Process-wide client, created lazily so it is never inherited across a fork."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = RedditClient()
+    return _client
@@ -22,8 +22,11 @@ from ai_engine import call_claude, AI_MODEL_CHEAP, AI_MODEL_SMART
 from growth.growth_db import (
     add_growth_lead, lead_exists, get_lead_count_today,
     update_lead_score, log_agent_action, get_conn,
+    filter_unseen_threads, mark_threads_seen, get_existing_reddit_usernames,
     upsert_learning, get_top_learnings, get_learnings,
 )
+from growth.reddit_client import get_reddit_client
+from growth.enrichment import enrich_leads
 from growth.growth_config import (
     SCOUT_MAX_LEADS_PER_DAY, REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET,
     LEARNING_ENABLED, LEARNING_EXPLORATION_RATE,
@@ -360,76 +363,40 @@ SELLER_SEARCH_QUERIES = [
 ]
 
 
-def _fetch_reddit_posts(subreddits, limit=25, sort="new"):
-    """Fetch posts from Reddit JSON endpoints. Returns raw post dicts."""
-    import requests
-    headers = {"User-Agent": "ETSAI-GrowthBot/1.0"}
-    all_posts = []
-
-    for sub_name in subreddits:
-        try:
-            url = f"https://www.reddit.com/r/{sub_name}/{sort}.json?limit={limit}"
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code != 200:
-                logger.warning(f"Reddit r/{sub_name} returned {resp.status_code}")
-                time.sleep(2)
-                continue
+def _reddit_post(post, subreddit):
+    """Lead-candidate dict from a Reddit post, or None for deleted/bot authors."""
+    author = post.get("author")
+    if not author or author in ("[deleted]", "AutoModerator"):
+        return None
+    return {
+        "id": post.get("id", ""),
+        "subreddit": subreddit,
+        "author": author,
+        "title": post.get("title", ""),
+        "body": (post.get("selftext") or "")[:500],
+        "url": f"https://reddit.com{post.get('permalink', '')}",
+        "flair": post.get("link_flair_text") or post.get("author_flair_text") or "",
+        "score": post.get("score", 0),
+    }
 
-            data = resp.json()
-            for child in data.get("data", {}).get("children", []):
-                post = child.get("data", {})
-                author = post.get("author")
-                if not author or author in ("[deleted]", "AutoModerator"):
-                    continue
-                all_posts.append({
-                    "subreddit": sub_name,
-                    "author": author,
-                    "title": post.get("title", ""),
-                    "body": (post.get("selftext") or "")[:500],
-                    "url": f"https://reddit.com{post.get('permalink', '')}",
-                    "flair": post.get("link_flair_text") or post.get("author_flair_text") or "",
-                    "score": post.get("score", 0),
-                })
-            time.sleep(2)  # Unauthenticated rate limit
-        except Exception as e:
-            logger.error(f"Reddit fetch error r/{sub_name}: {e}")
 
+def _fetch_reddit_posts(subreddits, limit=25, sort="new"):
+    """Fetch posts from Reddit JSON endpoints (concurrently, via the shared client)."""
+    listings = get_reddit_client().fetch_subreddits(subreddits, sort=sort, limit=limit,
+                                                    consumer="scout")
+    all_posts = []
+    for sub_name, posts in listings.items():
+        all_posts.extend(p for p in (_reddit_post(post, sub_name) for post in posts) if p)
     return all_posts
 
 
 def _search_reddit_sellers(limit=10):
     """Search Reddit for sellers actively sharing their Etsy shops."""
-    import requests
-    headers = {"User-Agent": "ETSAI-GrowthBot/1.0"}
+    results = get_reddit_client().search(SELLER_SEARCH_QUERIES, limit=limit)
     all_posts = []
-
-    for query in SELLER_SEARCH_QUERIES:
-        try:
-            url = f"https://www.reddit.com/search.json?q={query.replace(' ', '+')}&sort=new&limit={limit}"
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code != 200:
-                time.sleep(2)
-                continue
-
-            data = resp.json()
-            for child in data.get("data", {}).get("children", []):
-                post = child.get("data", {})
-                author = post.get("author")
-                if not author or author in ("[deleted]", "AutoModerator"):
-                    continue
-                all_posts.append({
-                    "subreddit": post.get("subreddit", "search"),
-                    "author": author,
-                    "title": post.get("title", ""),
-                    "body": (post.get("selftext") or "")[:500],
-                    "url": f"https://reddit.com{post.get('permalink', '')}",
-                    "flair": post.get("link_flair_text") or post.get("author_flair_text") or "",
-                    "score": post.get("score", 0),
-                })
-            time.sleep(2)
-        except Exception as e:
-            logger.error(f"Reddit search error for '{query}': {e}")
-
+    for posts in results.values():
+        all_posts.extend(p for p in (_reddit_post(post, post.get("subreddit", "search"))
+                                     for post in posts) if p)
     return all_posts
 
 
@@ -524,10 +491,12 @@ JSON array only."""
 
 
 def _dedup_and_save_leads(classified_posts):
-    """Save classified leads to DB, deduplicating by reddit username."""
+    """Save classified leads to DB, deduplicating by reddit username.
+    Returns (leads_added, deferred) — deferred are qualified posts left unsaved by the daily quota."""
     leads_added = 0
+    existing = get_existing_reddit_usernames(p["author"] for p in classified_posts)
 
-    for post in classified_posts:
+    for i, post in enumerate(classified_posts):
         # Only save sellers with medium+ ETSAI fit
         if post.get("etsai_fit") in ("none", "low"):
             continue
@@ -535,21 +504,14 @@ def _dedup_and_save_leads(classified_posts):
             continue
 
         username = post["author"]
-        conn = get_conn()
-        try:
-            existing = conn.execute(
-                "SELECT id FROM growth_leads WHERE reddit_username = %s",
-                (username,)
-            ).fetchone()
-        finally:
-            conn.close()
-
-        if existing:
+        if username in existing:
             continue
 
         if get_lead_count_today("reddit") >= SCOUT_MAX_LEADS_PER_DAY:
             logger.info("Scout: daily Reddit lead quota reached")
-            break
+            return leads_added, [p for p in classified_posts[i:]
+                                 if p.get("etsai_fit") not in ("none", "low")
+                                 and p.get("is_seller") != "no"]
 
         # Use first shop URL if found
         shop_urls = post.get("shop_urls", [])
@@ -573,11 +535,12 @@ def _dedup_and_save_leads(classified_posts):
         )
         if lead_id:
             leads_added += 1
+            existing.add(username)
             # Apply pre-computed score from classification (skip separate scoring call)
             if post.get("score") and post.get("tier"):
                 update_lead_score(lead_id, post["score"], post["tier"], post.get("outreach_angle", ""))
 
-    return leads_added
+    return leads_added, []
 
 
 def discover_reddit_leads(limit=25):
@@ -609,9 +572,14 @@ def discover_reddit_leads(limit=25):
             seen_authors.add(post["author"])
             unique_posts.append(post)
 
+    # Skip posts classified on an earlier run ("scout:" keeps these apart from the Listener's)
+    unseen = set(filter_unseen_threads(f"scout:{p['id']}" for p in unique_posts if p.get("id")))
+    unique_posts = [p for p in unique_posts if not p.get("id") or f"scout:{p['id']}" in unseen]
+
     logger.info(f"Scout: {len(unique_posts)} unique posts to classify")
 
     if not unique_posts:
+        get_reddit_client().commit_cursors("scout")
         duration_ms = int((time.time() - start) * 1000)
         log_agent_action("scout", "discover_reddit", True,
                          {"leads_added": 0, "posts_found": 0}, duration_ms=duration_ms)
@@ -625,7 +593,16 @@ def discover_reddit_leads(limit=25):
     logger.info(f"Scout: {len(qualified)}/{len(classified)} posts qualified as leads")
 
     # Step 5: Save to DB
-    leads_added = _dedup_and_save_leads(classified)
+    leads_added, deferred = _dedup_and_save_leads(classified)
+    # Posts from failed batches or cut by the daily quota stay unseen and are retried next run
+    deferred_ids = {p.get("id") for p in deferred}
+    marked = [p for p in classified if p.get("id") and p["id"] not in deferred_ids]
+    mark_threads_seen([f"scout:{p['id']}" for p in marked], subreddit="scout")
+    # Subreddits with posts left unseen keep their cursor, so those posts are fetched again
+    marked_ids = {p["id"] for p in marked}
+    held = {p["subreddit"] for p in unique_posts if p.get("id") not in marked_ids}
+    get_reddit_client().commit_cursors(
+        "scout", [s for s in SELLER_SUBREDDITS + GENERAL_SUBREDDITS if s not in held])
 
     duration_ms = int((time.time() - start) * 1000)
     log_agent_action("scout", "discover_reddit", True, {
@@ -648,95 +625,8 @@ def enrich_lead_email(lead_id):
     Scrape the Etsy shop About page for email addresses and social links.
     Updates the lead record if found. Returns dict of found data.
     """
-    import re
-    import requests
-    from bs4 import BeautifulSoup
-
-    conn = get_conn()
-    try:
-        row = conn.execute("SELECT shop_url, shop_name, email, social_url FROM growth_leads WHERE id = %s", (lead_id,)).fetchone()
-    finally:
-        conn.close()
-
-    if not row:
-        return {}
-
-    lead = dict(row)
-    # Skip if already enriched
-    if lead.get("email") and lead.get("social_url"):
-        return {"email": lead["email"], "social_url": lead["social_url"]}
-
-    shop_name = lead.get("shop_name", "")
-    if not shop_name:
-        return {}
-
-    found = {}
-    try:
-        url = f"https://www.etsy.com/shop/{shop_name}/about"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "text/html",
-        }
-        resp = requests.get(url, headers=headers, timeout=15)
-        if resp.status_code != 200:
-            return {}
-
-        soup = BeautifulSoup(resp.text, "html.parser")
-        text = soup.get_text(separator=" ")
-
-        # Extract email
-        if not lead.get("email"):
-            emails = re.findall(r'[\w.\-+]+@[\w.\-]+\.\w{2,}', text)
-            # Filter out Etsy internal emails
-            real_emails = [e for e in emails if "etsy.com" not in e.lower()]
-            if real_emails:
-                found["email"] = real_emails[0]
-
-        # Extract social links
-        if not lead.get("social_url"):
-            social_patterns = [
-                r'(https?://(?:www\.)?instagram\.com/[\w.]+)',
-                r'(https?://(?:www\.)?facebook\.com/[\w.]+)',
-                r'(https?://(?:www\.)?twitter\.com/[\w.]+)',
-                r'(https?://(?:www\.)?tiktok\.com/@[\w.]+)',
-            ]
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
-                for pattern in social_patterns:
-                    match = re.match(pattern, href)
-                    if match:
-                        found["social_url"] = match.group(1)
-                        break
-                if found.get("social_url"):
-                    break
-
-        # Update DB
-        if found:
-            conn = get_conn()
-            try:
-                updates = []
-                params = []
-                if found.get("email"):
-                    updates.append("email = %s")
-                    params.append(found["email"])
-                if found.get("social_url"):
-                    updates.append("social_url = %s")
-                    params.append(found["social_url"])
-                if updates:
-                    params.append(lead_id)
-                    conn.execute(
-                        f"UPDATE growth_leads SET {', '.join(updates)} WHERE id = %s",
-                        params
-                    )
-                    conn.commit()
-            finally:
-                conn.close()
-
-        logger.info(f"Scout: Enriched {shop_name} — found: {list(found.keys()) or 'nothing'}")
-    except Exception as e:
-        logger.error(f"Enrichment error for {shop_name}: {e}")
-
-    return found
+    results, _ = enrich_leads([lead_id])
+    return results.get(lead_id, {})
 
 
 def enrich_scored_leads(limit=20):
@@ -752,17 +642,14 @@ def enrich_scored_leads(limit=20):
     finally:
         conn.close()
 
-    enriched = 0
-    for row in rows:
-        result = enrich_lead_email(row["id"])
-        if result:
-            enriched += 1
-        time.sleep(1)  # Rate limit: 1 req/sec
-
-    if enriched:
-        log_agent_action("scout", "enrich_leads", True, {"enriched": enriched, "checked": len(rows)})
-        logger.info(f"Scout: Enriched {enriched}/{len(rows)} leads")
-    return enriched
+    if not rows:
+        return 0
+    _, stats = enrich_leads([row["id"] for row in rows])
+    if stats["enriched"]:
+        log_agent_action("scout", "enrich_leads", True, stats,
+                         duration_ms=int(stats["seconds"] * 1000))
+        logger.info(f"Scout: Enriched {stats['enriched']}/{len(rows)} leads")
+    return stats["enriched"]
 
 
 # =============================================================
@@ -914,14 +801,10 @@ def score_unscored_leads(limit=50):
 
     # Enrich HOT/WARM leads with email/social data
     if hot_warm_ids:
-        enriched = 0
-        for lead_id in hot_warm_ids:
-            result = enrich_lead_email(lead_id)
-            if result:
-                enriched += 1
-            time.sleep(1)
-        if enriched:
-            logger.info(f"Scout: Enriched {enriched}/{len(hot_warm_ids)} newly scored leads")
+        _, stats = enrich_leads(hot_warm_ids)
+        if stats["enriched"]:
+            logger.info(f"Scout: Enriched {stats['enriched']}/{len(hot_warm_ids)} newly scored leads "
+                        f"({stats['leads_per_min']} leads/min)")
 
     return scored
 
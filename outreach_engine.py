@@ -20,9 +20,10 @@ import sys
 import time
 from datetime import datetime
 
-from anthropic import Anthropic
 from dotenv import load_dotenv
 
+from ai_engine import get_client
+
 load_dotenv()
 
 logging.basicConfig(
@@ -36,18 +37,12 @@ log = logging.getLogger("outreach_engine")
 # Claude client
 # ---------------------------------------------------------------------------
 
-client = None
-
-
 def _get_client():
-    global client
-    if client is None:
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            log.error("ANTHROPIC_API_KEY not set in environment or .env")
-            sys.exit(1)
-        client = Anthropic(api_key=api_key)
-    return client
+    """Shared process-wide client from ai_engine (pooled keep-alive connections)."""
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        log.error("ANTHROPIC_API_KEY not set in environment or .env")
+        sys.exit(1)
+    return get_client()
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,50 @@
+"""
+ETSAI Rate Limiting
+Thread-safe limiters shared by the Etsy API client, shop imports and the growth bot.
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RateBudget:
+    """Token bucket: allows `rate` requests per second, bursting up to `burst`
+    (default `rate`)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(burst or rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Spaces calls to the same host at least `interval` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).hostname or ""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,116 @@
+"""
+ETSAI Shop Import — background jobs for multi-listing Etsy shop imports.
+
+Each job scrapes listings and generates intake questions on a shared, bounded
+worker pool, spaces requests per host, and bulk-inserts products in batches.
+Progress lives in the import_jobs table so any worker can answer a poll.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rate_limit import HostRateLimiter
+from scraper import scrape_etsy_listing
+from ai_engine import generate_intake_questions
+from database import add_products, log_ai_usage, create_import_job, update_import_job
+
+logger = logging.getLogger("etsai.import")
+
+# Concurrent listings per process (shared by all running imports)
+IMPORT_WORKERS = int(os.environ.get("ETSAI_IMPORT_WORKERS", "4"))
+# Minimum seconds between requests to the same host
+IMPORT_HOST_INTERVAL = float(os.environ.get("ETSAI_IMPORT_HOST_INTERVAL", "1.0"))
+# Products per multi-row INSERT
+IMPORT_BATCH_SIZE = int(os.environ.get("ETSAI_IMPORT_BATCH_SIZE", "10"))
+# New listings the synchronous Etsy API import generates questions for per request
+# (one Sonnet call each; keeps the request well inside the gunicorn timeout)
+ETSY_IMPORT_MAX_PER_REQUEST = int(os.environ.get("ETSAI_ETSY_IMPORT_MAX_PER_REQUEST", "25"))
+
+
+_host_limiter = HostRateLimiter(IMPORT_HOST_INTERVAL)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Lazily create the pool so it is never inherited across a gunicorn fork."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS,
+                                               thread_name_prefix="shop-import")
+    return _executor
+
+
+def start_shop_import(seller_id, urls, seller_notes=None):
+    """Create an import job and run it in the background. Returns the job id."""
+    job_id = create_import_job(seller_id, len(urls))
+    t = threading.Thread(target=_run_import, args=(job_id, seller_id, urls, seller_notes),
+                         daemon=True)
+    t.start()
+    return job_id
+
+
+def _prepare_listing(url, seller_notes):
+    """Scrape one listing and generate its questions. Returns (product, question_result)."""
+    _host_limiter.wait(url)
+    listing = scrape_etsy_listing(url)
+
+    description = listing.get("description", "")
+    if listing.get("variations"):
+        variation_info = ". ".join(
+            f"Available {v['name']}: {', '.join(v['options'])}" for v in listing["variations"]
+        )
+        description = f"{description}\n\nVariations: {variation_info}" if description else variation_info
+
+    result = generate_intake_questions(listing["title"], None, description)
+    product = {
+        "title": listing["title"],
+        "intake_questions": result["questions"],
+        "price": listing.get("price"),
+        "image_url": listing["images"][0] if listing.get("images") else None,
+        "description": listing.get("description") or None,
+        "seller_notes": seller_notes or None,
+        "source_url": url,
+    }
+    return product, result
+
+
+def _run_import(job_id, seller_id, urls, seller_notes):
+    imported, errors, pending = [], [], []
+    processed = 0
+
+    def flush():
+        if not pending:
+            return
+        ids = add_products(seller_id, pending)
+        imported.extend({"product_id": pid, "title": p["title"]} for pid, p in zip(ids, pending))
+        pending.clear()
+
+    try:
+        futures = {_get_executor().submit(_prepare_listing, url, seller_notes): url for url in urls}
+        for future in as_completed(futures):
+            processed += 1
+            try:
+                product, result = future.result()
+            except Exception as e:
+                errors.append({"url": futures[future], "error": str(e)})
+            else:
+                task = f"Generate questions for imported: {product['title']}"
+                if result.get("cached"):
+                    task += " (cache hit)"
+                log_ai_usage(seller_id, result["usage"], task)
+                pending.append(product)
+
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                flush()
+            update_import_job(job_id, processed, imported, errors)
+        flush()
+        update_import_job(job_id, processed, imported, errors, status="complete")
+        logger.info("Shop import %s done: %d imported, %d failed", job_id, len(imported), len(errors))
+    except Exception as e:
+        logger.error("Shop import %s failed: %s", job_id, e)
+        update_import_job(job_id, processed, imported, errors + [{"url": "", "error": str(e)}],
+                          status="failed")